@@ -0,0 +1,57 @@
+"""semantic lookup over previously generated answers
+
+an AnswerIndex keeps one ExactIndex of question embeddings per scope (for example a chapter and state) and maps
+its rows back to the ids of the stored answers. a scope is loaded lazily through the loader given to the index ,
+loader(scope) returns (ids ,matrix) of the rows already in the db. lookup returns the closest stored answer when
+it is at least min_similarity away from the asked question ,else None.
+"""
+from vector_index import ExactIndex
+import threading
+import time
+
+
+class AnswerIndex :
+
+    def __init__(self ,loader ,min_similarity):
+        self.loader = loader
+        self.min_similarity = min_similarity
+        self.__scopes = { } ##scope -> [ids ,index]
+        self.__lock = threading.Lock()
+        self.__counts = {"lookups" : 0 ,"hits" : 0 ,"lookup_time" : 0.0}
+
+    ##returns (answer id ,similarity) of the best match or None
+    def lookup(self ,scope ,query_vector):
+        start = time.perf_counter()
+        ids ,index = self.__scope(scope)
+        rows ,sims = index.search(query_vector ,k = 1 ,min_similarity = self.min_similarity)
+        match = (ids[int(rows[0])] ,float(sims[0])) if len(rows) > 0 else None
+
+        with self.__lock :
+            self.__counts["lookups"] += 1
+            self.__counts["hits"] += 1 if match else 0
+            self.__counts["lookup_time"] += time.perf_counter() - start
+        return match
+
+    def add(self ,scope ,answer_id ,vector):
+        ids ,index = self.__scope(scope)
+        with self.__lock :
+            ids.append(answer_id) ##id first so a concurrent lookup never sees a row without its id
+            index.add(vector)
+
+    def stats(self):
+        with self.__lock :
+            report = dict(self.__counts)
+            report["scopes"] = len(self.__scopes)
+        report["hit_ratio"] = round(report["hits"] / report["lookups"] ,3) if report["lookups"] else 0.0
+        report["avg_lookup_time"] = round(report["lookup_time"] / report["lookups"] ,4) if report["lookups"] else 0.0
+        return report
+
+    def __scope(self ,scope):
+        with self.__lock :
+            if scope in self.__scopes :
+                return self.__scopes[scope]
+
+        ids ,matrix = self.loader(scope) ##outside the lock ,a duplicate load is harmless
+
+        with self.__lock :
+            return self.__scopes.setdefault(scope ,[list(ids) ,ExactIndex(matrix)])
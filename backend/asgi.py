@@ -0,0 +1,236 @@
+"""asyncio front of the api ,production runs it with gunicorn -c gunicorn.conf.py (uvicorn workers)
+
+the student routes that spend their time waiting on gemini ,vertex embeddings ,imagen ,gcs and translate
+(/student/doubt ,/student/book_question ,/student/expl and /student/extract_q) and the event stream of a background
+job (/admin/jobs/<id>/events) are served here as coroutines ,a request waiting on a model holds no thread. blocking
+db and storage calls run in the default executor (ASYNC_IO_THREADS threads). every other route is the flask app of
+main.py mounted behind a2wsgi ,both halves share the same process state (mcq generation cache ,context indexes).
+explanation sessions are db rows (explanation_store) ,so /student/expl may reach any worker process.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse ,StreamingResponse
+from starlette.routing import Route ,Mount
+from a2wsgi import WSGIMiddleware
+from subtopic_explainer import SubtpcExplGen
+from solution_generator import SoltuionGenerator
+from doubt_solver import DoubtSolver
+from settings import settings
+import contextlib
+import asyncio
+import main
+import json
+import os
+
+
+def authorised(request ,role):
+    return main.check_token(auth_header = request.headers.get('Authorization' ,None) ,role = role)
+
+
+async def student_extract_q(request):
+    try:
+        if not authorised(request ,role = main.STUDENT):
+            return JSONResponse({"status" : "access_denied"} ,400)
+
+        async with request.form() as form :
+            temp_img_file = await asyncio.to_thread(main.resize_temp_img ,form['image'].file)
+
+        resp = await main.img_quest_ext.aextract(
+            path = temp_img_file
+        )
+        os.remove(temp_img_file)
+        return JSONResponse({"questions" : resp} ,200)
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)} ,400)
+
+
+async def student_book_question(request):
+    try:
+        if not authorised(request ,role = main.STUDENT):
+            return JSONResponse({"status" : "access_denied"} ,400)
+
+        data = await request.json()
+
+        ##the chapter indexes may be loaded from the db on first use
+        subtpc_exp = await asyncio.to_thread(
+            SubtpcExplGen,
+            stud_clss = data['class'],
+            state = data['state'],
+            subj = data['subj'].strip(),
+            chap = data['chap'].strip()
+        )
+
+        subtopic_exp_resp ,q_type = await subtpc_exp.acreate(
+            question = data['question']
+        )
+
+        sol_gen = await asyncio.to_thread(
+            SoltuionGenerator,
+            stud_clss = data['class'],
+            state = data['state'],
+            subj = data['subj'].strip(),
+            chap = data['chap'].strip(),
+        )
+
+        sol_resp = await sol_gen.asolution(
+            question = data['question'] ,
+            q_type = q_type
+        )
+
+        ##the explanation session is a db row ,opened and localised in the executor
+        response = await asyncio.to_thread(
+            main.book_question_response ,subtopic_exp_resp = subtopic_exp_resp ,sol_resp = sol_resp ,q_type = q_type
+        )
+
+        if data['lng'] != 'en' :
+            texts = await asyncio.to_thread(main.book_question_texts ,response)
+            translated = dict(zip(texts ,await main.translation_service.atranslate_many(texts = texts ,target = data['lng'])))
+            await asyncio.to_thread(main.localise_book_question ,response ,translated)
+
+        return JSONResponse(response ,200)
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)} ,400)
+
+
+async def student_explanation_submit(request):
+    try:
+        if not authorised(request ,role = main.STUDENT):
+            return JSONResponse({"status" : "access_denied"} ,400)
+
+        exp_trck_obj = main.exp_trck_obj
+
+        data = await request.json()
+        if data['timeout'] and await asyncio.to_thread(exp_trck_obj.end ,data['access']):
+            return JSONResponse({'status' : 'sucess'} ,200)
+
+        session = await asyncio.to_thread(exp_trck_obj.session ,data['access'])
+        if session is None:
+            return JSONResponse({"error" : "session_not_avil"} ,402)
+
+        if data['lng'] != 'en':
+            data['expl'] = await main.translation_service.atranslate(
+                text = data['expl'],
+                target = 'en'
+            )
+
+        scr ,is_win ,pnts = await exp_trck_obj.atrack(
+            session = session,
+            expl = data['expl'],
+            lng = data['lng'],
+            duration = data['duration'],
+            roll_num = data['roll_num'],
+            state = data['state'],
+            stud_clss = data['class']
+        )
+
+        return JSONResponse({'score' : int(scr) ,"is_win" : is_win ,"new_points" : pnts} ,200)
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)} ,400)
+
+
+async def student_doubt(request):
+    try:
+        if not authorised(request ,role = main.STUDENT):
+            return JSONResponse({"status" : "access_denied"} ,400)
+
+        async with request.form() as form :
+            data = json.loads(form['data'])
+
+            if data['lng'] != 'en':
+                data['question'] = await main.translation_service.atranslate(
+                    text = data['question'],
+                    target = 'en'
+                )
+
+            obj = await asyncio.to_thread(
+                DoubtSolver,
+                state =  data['state'],
+                clss = data['clss'],
+                subj = data['subj'].strip(),
+                chap = data['chap'].strip(),
+                school_id = None
+            )
+
+            temp_img_file = None
+            if data['is_img']:
+                temp_img_file = await asyncio.to_thread(main.resize_temp_img ,form['image'].file)
+                await obj.aadd_image(
+                    link = temp_img_file
+                )
+
+        resp = await obj.aresolve(question = data['question'])
+        await asyncio.to_thread(main.track_doubt ,resp)
+
+        if temp_img_file != None:
+            os.remove(temp_img_file)
+
+        if data['lng'] != 'en':
+            texts = await asyncio.to_thread(main.doubt_texts ,resp)
+            translated = dict(zip(texts ,await main.translation_service.atranslate_many(texts = texts ,target = data['lng'])))
+            await asyncio.to_thread(main.localise_doubt ,resp ,translated)
+
+        return JSONResponse(resp ,200)
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)} ,400)
+
+
+##server sent events with the job status ,a new event whenever it changes ,the stream ends with the job
+async def admin_job_events(request):
+    if not authorised(request ,role = main.ADMIN):
+        return JSONResponse({"status" : "access_denied"} ,400)
+
+    job_id = request.path_params['job_id']
+    interval = float(settings.get("JOB_EVENTS_INTERVAL" ,1))
+
+    async def events():
+        last = None
+        while True :
+            job = await asyncio.to_thread(main.job_queue.get ,job_id)
+            if job is None :
+                yield f"event: error\ndata: {json.dumps({'error' : 'job not found'})}\n\n"
+                return
+
+            body = json.dumps(job)
+            if body != last :
+                yield f"data: {body}\n\n"
+                last = body
+            if job["status"] in ("done" ,"failed") :
+                return
+            await asyncio.sleep(interval)
+
+    return StreamingResponse(events() ,media_type = "text/event-stream" ,headers = {"Cache-Control" : "no-cache"})
+
+
+##to_thread work of the whole worker shares this pool ,keep the db pool (DB_CONNECT_COUNT + 10 overflow) in line with it
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    executor = ThreadPoolExecutor(max_workers = int(settings.get("ASYNC_IO_THREADS" ,32)) ,thread_name_prefix = "asgi-io")
+    asyncio.get_running_loop().set_default_executor(executor)
+    yield
+    executor.shutdown(wait = False)
+
+
+app = Starlette(
+    routes = [
+        Route('/student/extract_q' ,student_extract_q ,methods = ["POST"]),
+        Route('/student/book_question' ,student_book_question ,methods = ["POST"]),
+        Route('/student/expl' ,student_explanation_submit ,methods = ["POST"]),
+        Route('/student/doubt' ,student_doubt ,methods = ["POST"]),
+        Route('/admin/jobs/{job_id}/events' ,admin_job_events ,methods = ["GET"]),
+
+        ##everything else is served by flask on WEB_THREADS threads
+        Mount('/' ,app = WSGIMiddleware(main.app ,workers = int(settings.get("WEB_THREADS" ,8))))
+    ],
+    lifespan = lifespan
+)
+
+
+##development server only
+if __name__ == '__main__':
+    import uvicorn
+    main.start_background()
+    uvicorn.run(app ,host = '0.0.0.0' ,port = int(settings.get("PORT" ,5000)))
@@ -1,11 +1,12 @@
 from question_bank import Question ,Options 
+from curriculum_catalog import curriculum_catalog
 from assessment_db import AssesmentSchedule ,AssesmentSubtopic ,StudentAssignment ,StudentAnalysis 
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select ,func ,case
 from feed_back_generator import FeedBackGenerator
-from user_engagement_db import StudentScore 
+from score_store import score_store
 from datetime import datetime
 from db_engine import Engine
-import random
 import pytz
 
 ##creating a session object with question bank db  
@@ -17,42 +18,11 @@ ist = pytz.timezone('Asia/Kolkata')
 class AssignmentHandler : 
 
     def __init__(self):
-        session = Session()
         self.feed_back_obj = FeedBackGenerator()
-        session.close()
         
+    ##class -> subject -> chapter -> subtopics of the common bank ,served from the catalog
     def fetch_availablity(self):
-        session = Session()
-        
-        results = session.query( 
-            Question.student_class ,Question.subject , Question.chapter, Question.suptopic
-        ).filter(
-            Question.state == "common" ,# Replace '10' with your desired class
-        ).distinct().all()
-
-        response = { }
-        
-        for obj in results : 
-            ##if class is not available adding it 
-            if obj.student_class not in response:
-                response[obj.student_class] = {}
-            
-            ##if subject is not available under the class adding it  
-            if obj.subject not in response[obj.student_class]:
-                response[obj.student_class][obj.subject] = {}
-            
-            ##if chapter is not available under the subject adding it
-            if obj.chapter not in response[obj.student_class][obj.subject]:
-                response[obj.student_class][obj.subject][obj.chapter] = []
-
-            ##if subtopic is not available under the chapter adding it
-            if obj.suptopic not in response[obj.student_class][obj.subject][obj.chapter]:
-                response[obj.student_class][obj.subject][obj.chapter].append( 
-                    obj.suptopic
-                )
-        
-        session.close()
-        return response 
+        return curriculum_catalog.teacher_view()
     
     def add_assignment(self ,student_class ,subject ,chapter ,subtopic_count ,start ,end):
         session = Session()
@@ -144,25 +114,12 @@ class AssignmentHandler :
     def assignment_analysis(self ,schedule_id):
         session = Session()
         
-        prev_assess = session.query(StudentAssignment).filter( 
-            StudentAssignment.schedule_id == schedule_id
-        ).all()
-        
-        student_assignment_ids = [obj.id for obj in prev_assess] 
-
-        prev_sub_scores = session.query(StudentAnalysis).filter(
-            StudentAnalysis.student_assignment_id.in_(student_assignment_ids)
-        )
-        
         previous_assessments = []
-        for assess_obj in prev_assess:
+        for assess_obj ,subtopic_score in self.__scores_by_assignment(session ,StudentAssignment.schedule_id == schedule_id):
             dict1 = {}
             dict1["roll_num"] = assess_obj.roll_num
             dict1["name"] = assess_obj.name
-            dict1["subtopic_score"] = {}
-            for sub_obj in prev_sub_scores: 
-                if sub_obj.student_assignment_id == assess_obj.id :
-                    dict1["subtopic_score"][sub_obj.subtopic] = sub_obj.accuracy
+            dict1["subtopic_score"] = subtopic_score
 
             previous_assessments.append(
                 dict1
@@ -171,6 +128,22 @@ class AssignmentHandler :
         session.close()
         return previous_assessments
 
+    ##assignments matching the filters with their subtopic accuracies ,one joined query grouped in a single pass
+    def __scores_by_assignment(self ,session ,*filters):
+        rows = session.query(
+            StudentAssignment ,StudentAnalysis.subtopic ,StudentAnalysis.accuracy
+        ).outerjoin(
+            StudentAnalysis ,StudentAnalysis.student_assignment_id == StudentAssignment.id
+        ).filter(*filters).order_by(StudentAssignment.id ,StudentAnalysis.id).all()
+
+        grouped = { } ##assignment id -> (assignment ,{subtopic : accuracy})
+        for assess_obj ,subtopic ,accuracy in rows:
+            entry = grouped.setdefault(assess_obj.id ,(assess_obj ,{ }))
+            if subtopic is not None:
+                entry[1][subtopic] = accuracy
+        
+        return list(grouped.values())
+
     def student_list_assigments(self ,student_class ,roll_num):        
         assert isinstance(student_class ,int) ,"student_class must be a integer"
         session = Session()
@@ -250,85 +223,71 @@ class AssignmentHandler :
             AssesmentSubtopic.schedule_id == schedule_id 
         ).all()
 
-        subtopic_list = [obj.subtopic for obj in subtopic_obj]
+        ##questions wanted per subtopic
+        quota = { }
+        for obj in subtopic_obj:
+            quota[obj.subtopic] = quota.get(obj.subtopic ,0) + obj.q_count
         
-        ##giving the regional transform made for this state in english
-        if lang == "English" :  
-            mcqs = session.query(Question).filter( 
-                Question.student_class == schedule_obj.student_class ,
-                Question.subject == schedule_obj.subject ,
-                Question.chapter == schedule_obj.chapter ,
-                Question.state == state,
-                Question.suptopic.in_(subtopic_list)
-            ).all()
-        ##else fetching the mcqs in their required language 
-        else : 
-            mcqs = session.query(Question).filter( 
-                Question.student_class == schedule_obj.student_class ,
-                Question.subject == schedule_obj.subject ,
-                Question.chapter == schedule_obj.chapter ,
-                Question.state == lang ,
-                Question.suptopic.in_(subtopic_list)
-            ).all()
+        ##giving the regional transform made for this state in english ,else the mcqs in their required language
+        target_state = state if lang == "English" else lang
+        selected_q = self.__sample_questions(session = session ,schedule_obj = schedule_obj ,state = target_state ,quota = quota)
 
         ##if mcqs is not available in either of the form fetching the common
-        if len(mcqs) == 0 :
-            mcqs = session.query(Question).filter( 
-            Question.student_class == schedule_obj.student_class ,
-            Question.subject == schedule_obj.subject ,
-            Question.chapter == schedule_obj.chapter ,
-            Question.state == "common",
-            Question.suptopic.in_(subtopic_list)
-        ).all()
-        
-        ##shuffling to make the mcq's unique  
-        random.shuffle(mcqs)
-        
-        ##selecting the questions 
-        selected_q = [ ]
-        for obj in subtopic_obj:   
-            subtopic_q = []
-            i = 0 
-            
-            while( i < len(mcqs) and len(subtopic_q) < obj.q_count):
-                if mcqs[i].suptopic == obj.subtopic :
-                    subtopic_q.append(
-                        mcqs[i]
-                    ) 
-                i = i + 1
-        
-            selected_q = selected_q + subtopic_q
+        if len(selected_q) == 0 :
+            selected_q = self.__sample_questions(session = session ,schedule_obj = schedule_obj ,state = "common" ,quota = quota)
+
+        ##keeping the subtopic order of the schedule
+        subtopic_order = {name : i for i ,name in enumerate(quota.keys())}
+        selected_q.sort(key = lambda mcq : subtopic_order[mcq.suptopic])
         
+        ##options of all the selected questions in one query ,grouped by question
         question_ids = [mcq.id for mcq in selected_q]
-        options = session.query(Options).filter( 
+        options = session.query(Options.question_id ,Options.statement).filter( 
             Options.question_id.in_(question_ids)
-        ).all()
+        ).order_by(Options.id).all()
+
+        options_by_question = { }
+        for question_id ,statement in options:
+            options_by_question.setdefault(question_id ,[ ]).append(statement)
                 
         response = [ ]
 
         for mcq in selected_q:
-            
-            subtopic = mcq.suptopic
-
-            mcq_dict = { 
+            response.append({ 
                 "question" : mcq.question , 
-                "options" : [ ] ,
+                "options" : options_by_question.get(mcq.id ,[ ]) ,
                 "correct_option" : mcq.correct_option ,
                 "why" : mcq.explanation ,
-                "subtopic" : subtopic,
+                "subtopic" : mcq.suptopic,
                 "id" : mcq.id 
-            } 
-
-            for opt in options:
-                if opt.question_id == mcq.id : 
-                    mcq_dict["options"].append(
-                        opt.statement
-                    )
-
-            response.append(mcq_dict)
+            })
         
         session.close()
         return response
+
+    ##random sample of quota[subtopic] questions per subtopic ,done in sql with a window function :-
+    ##rows of each subtopic are numbered in random order and only the first q_count of them are returned
+    def __sample_questions(self ,session ,schedule_obj ,state ,quota):
+        if len(quota) == 0:
+            return [ ]
+
+        random_order = func.rand() if Engine.dialect.name == "mysql" else func.random()
+        ranked = select(
+            Question.id,
+            Question.suptopic,
+            func.row_number().over(partition_by = Question.suptopic ,order_by = random_order).label("pick")
+        ).where(
+            Question.student_class == schedule_obj.student_class ,
+            Question.subject == schedule_obj.subject ,
+            Question.chapter == schedule_obj.chapter ,
+            Question.state == state,
+            Question.suptopic.in_(list(quota.keys()))
+        ).subquery()
+
+        ##returned in their random order ,the caller's stable sort by subtopic keeps it inside every subtopic
+        return session.query(Question).join(ranked ,Question.id == ranked.c.id).filter(
+            ranked.c.pick <= case(quota ,value = ranked.c.suptopic ,else_ = 0)
+        ).order_by(ranked.c.pick).all()
     
     def complete_assignment(self ,state ,lang ,roll_num ,name ,schedule_id ,subtopic_eval):
         session = Session()
@@ -345,39 +304,28 @@ class AssignmentHandler :
         }
 
         ##retreving previous performance in this subject  
-        prev_assess = session.query(StudentAssignment).filter( 
+        prev_assess = self.__scores_by_assignment(
+            session,
             StudentAssignment.roll_num == roll_num , 
             StudentAssignment.subject == schedule_obj.subject,
-        ).all()
-        
-        student_assignment_ids = [obj.id for obj in prev_assess] 
-
-        prev_sub_scores = session.query(StudentAnalysis).filter(
-            StudentAnalysis.student_assignment_id.in_(student_assignment_ids)
         )
         
         previous_assessments = []
         previous_assessment_avgscore = [ ] ##average assessments is average of acores in all subtopics 
 
-        for assess_obj in prev_assess:
-
-            avg_scores = [ ]
+        for assess_obj ,subtopic_score in prev_assess:
             
             dict1 = { }
             dict1["subject"] = assess_obj.subject
             dict1["chapter"] = assess_obj.chapter 
-            dict1["subtopic_score"] = {}
+            dict1["subtopic_score"] = subtopic_score
             dict1["feed_back"] = assess_obj.feed_back
-            
-            for sub_obj in prev_sub_scores: 
-                if sub_obj.student_assignment_id == assess_obj.id :
-                    dict1["subtopic_score"][sub_obj.subtopic] = sub_obj.accuracy
-                    avg_scores.append(sub_obj.accuracy)
 
             previous_assessments.append(dict1)
-            previous_assessment_avgscore.append(
-                float(sum(avg_scores)/len(avg_scores) )
-            )
+            if len(subtopic_score) > 0:
+                previous_assessment_avgscore.append(
+                    float(sum(subtopic_score.values())/len(subtopic_score) )
+                )
         
         avg_scores = []
         for scr in current_assessment["subtopic"].values():
@@ -445,7 +393,6 @@ class AssignmentHandler :
         return feed_back_dict
     
     def __compute_engament_score(self ,curr_avgscr ,prev_avgscr_list ,percentage_time_rem ,state ,student_class, roll_num ,k = 5):
-        session = Session()
         
         if len(prev_avgscr_list[-k :]) > 0 :
             scr = max(0 ,10 * ( curr_avgscr - sum(prev_avgscr_list[-k :])/len(prev_avgscr_list[-k :]) ))
@@ -456,26 +403,13 @@ class AssignmentHandler :
         scr = scr + 2 * percentage_time_rem
         scr = int(scr)
         
-        obj = session.query(StudentScore).filter(
-            StudentScore.student_class == student_class,
-            StudentScore.roll_num == roll_num,
-            StudentScore.state == state
-        ).first()
-        
-        if obj == None :
-            obj = StudentScore(
-                roll_num = roll_num ,
-                state = state,
-                student_class = student_class ,
-                score = scr
-            )
-            session.add(obj)
-            session.commit()
-        else:
-            obj.score = obj.score + scr
-            session.commit()
+        ##atomic add ,the score row is created for a first assessment
+        score_store.add(
+            student_class = int(student_class),
+            roll_num = roll_num,
+            state = state,
+            delta = scr
+        )
         
         print("score : ",scr)
-
-        session.close()
         return scr
\ No newline at end of file
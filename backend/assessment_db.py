@@ -1,11 +1,9 @@
 from sqlalchemy import create_engine
 from sqlalchemy import Column, Integer, String ,DateTime ,ForeignKey ,Text ,Float
 from sqlalchemy.orm import declarative_base
-from dotenv import load_dotenv
 from db_engine import Engine
 
 
-load_dotenv(override = True)
 ## initailising db engine # URL-encoded '@' as '%40'
 Base = declarative_base()
 
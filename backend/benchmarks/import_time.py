@@ -0,0 +1,75 @@
+"""cold start guard ,fails when importing the app and answering /health takes longer than the budget
+
+run from the backend folder with the same .env as the server :-
+    python benchmarks/import_time.py --module asgi --budget 1.0 --runs 3
+
+every run is a fresh interpreter :- it imports the module ,then sends GET /health through the flask test client
+(no server ,no network besides the db ping). the median of the runs is compared with the budget and the exit code is
+1 when it is over ,so the script can gate a deploy. on failure the slowest imports (python -X importtime) are listed ,
+a google sdk or a model load showing up there means something is built at import time again (see google_clients).
+"""
+import subprocess
+import argparse
+import json
+import sys
+import os
+
+CHILD = """
+import time ,json
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+import main
+response = main.app.test_client().get("/health") if {health} else None
+done = time.perf_counter()
+print(json.dumps({{"import" : imported - start ,"total" : done - start ,"status" : response.status_code if response else None}}))
+"""
+
+
+def run_once(module ,health):
+    result = subprocess.run(
+        [sys.executable ,"-c" ,CHILD.format(module = module ,health = health)],
+        capture_output = True ,text = True ,cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    if result.returncode != 0 :
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "child failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+##(cumulative seconds ,module) of the slowest imports ,from python -X importtime
+def slowest_imports(module ,count):
+    result = subprocess.run(
+        [sys.executable ,"-X" ,"importtime" ,"-c" ,f"import {module}"],
+        capture_output = True ,text = True ,cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    imports = [ ]
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line :
+            continue
+        parts = line.split("|")
+        imports.append((int(parts[1]) / 1e6 ,parts[2].strip()))
+    return sorted(imports ,reverse = True)[:count]
+
+
+if __name__ == "__main__" :
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module" ,default = "asgi")
+    parser.add_argument("--budget" ,type = float ,default = 1.0 ,help = "seconds for import + /health")
+    parser.add_argument("--runs" ,type = int ,default = 3)
+    parser.add_argument("--no-health" ,action = "store_true" ,help = "time the import alone")
+    args = parser.parse_args()
+
+    runs = [run_once(args.module ,not args.no_health) for i in range(args.runs)]
+    totals = sorted(run["total"] for run in runs)
+    median = totals[len(totals) // 2]
+
+    print(f"import {args.module} : " + " ,".join(f"{run['import']:.2f} s" for run in runs))
+    if not args.no_health :
+        print(f"+ /health     : " + " ,".join(f"{run['total']:.2f} s (status {run['status']})" for run in runs))
+    print(f"median {median:.2f} s ,budget {args.budget:.2f} s")
+
+    if median > args.budget :
+        print("over budget ,slowest imports :-")
+        for seconds ,name in slowest_imports(args.module ,15):
+            print(f"  {seconds:6.2f} s  {name}")
+        sys.exit(1)
@@ -0,0 +1,68 @@
+"""concurrent load test for the api ,used to compare the threaded flask server with the asyncio front
+
+run from the backend folder while the server is up :-
+    python benchmarks/load_test.py --url http://localhost:5000/student/availabilty --method POST \
+        --body '{"class" : 10}' --token <jwt> --concurrency 32 --requests 500
+
+only the standard library is used. prints throughput ,latency percentiles and the error count ,run it once
+against WEB_APP=main:app gunicorn -c gunicorn.conf.py and once against gunicorn -c gunicorn.conf.py (asgi:app)
+with the same arguments.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import urllib.request
+import urllib.error
+import argparse
+import time
+
+
+def send(url ,method ,body ,token ,timeout):
+    headers = {"Content-Type" : "application/json"}
+    if token :
+        headers["Authorization"] = f"Bearer {token}"
+
+    request = urllib.request.Request(url ,data = body.encode("utf-8") if body else None ,headers = headers ,method = method)
+    start = time.perf_counter()
+    try :
+        with urllib.request.urlopen(request ,timeout = timeout) as response :
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e :
+        status = e.code
+    except Exception :
+        status = None
+    return status ,time.perf_counter() - start
+
+
+def percentile(values ,p):
+    values = sorted(values)
+    return values[min(len(values) - 1 ,int(len(values) * p))]
+
+
+def run(url ,method ,body ,token ,concurrency ,requests ,timeout):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers = concurrency) as executor :
+        results = list(executor.map(lambda i : send(url ,method ,body ,token ,timeout) ,range(requests)))
+    duration = time.perf_counter() - start
+
+    latencies = [latency for status ,latency in results if status is not None and status < 500]
+    errors = len(results) - len(latencies)
+
+    print(f"{url} ({method}) concurrency={concurrency} requests={requests}")
+    print(f"throughput : {requests / duration:8.1f} req/s over {duration:.1f} s")
+    if latencies :
+        print(f"latency    : p50 {percentile(latencies ,0.50) * 1000:8.1f} ms  p95 {percentile(latencies ,0.95) * 1000:8.1f} ms  max {max(latencies) * 1000:8.1f} ms")
+    print(f"errors     : {errors} (timeouts ,refused connections and 5xx)")
+
+
+if __name__ == "__main__" :
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url" ,required = True)
+    parser.add_argument("--method" ,default = "GET")
+    parser.add_argument("--body" ,default = None)
+    parser.add_argument("--token" ,default = None)
+    parser.add_argument("--concurrency" ,type = int ,default = 16)
+    parser.add_argument("--requests" ,type = int ,default = 200)
+    parser.add_argument("--timeout" ,type = float ,default = 120)
+    args = parser.parse_args()
+
+    run(args.url ,args.method ,args.body ,args.token ,args.concurrency ,args.requests ,args.timeout)
@@ -0,0 +1,109 @@
+"""query plans of the hot question bank lookups ,before and after the index migrations
+
+run from the backend folder against a copy of the database :-
+    python benchmarks/query_plan_bench.py            plans and timings of the current schema
+    python benchmarks/query_plan_bench.py --apply    the same ,then pending migrations ,then again
+
+the report is written to benchmarks/reports/query_plans_<time>.md. sample filter values are taken from existing
+rows so the plans reflect real data. works with mysql (EXPLAIN) and sqlite (EXPLAIN QUERY PLAN).
+"""
+import sys
+import os
+import time
+from datetime import datetime
+
+sys.path.insert(0 ,os.path.join(os.path.dirname(os.path.abspath(__file__)) ,".."))
+
+from sqlalchemy import select ,text
+from db_engine import Engine
+from question_bank import Question ,Options
+from user_engagement_db import StudentScore
+import migrations
+
+
+def sample_values(conn):
+    question = conn.execute(select(Question).limit(1)).first()
+    score = conn.execute(select(StudentScore).limit(1)).first()
+    return {
+        "student_class" : question.student_class if question else 10,
+        "subject" : question.subject if question else "Science",
+        "chapter" : question.chapter if question else "chapter",
+        "state" : question.state if question else "common",
+        "suptopic" : question.suptopic if question else "subtopic",
+        "question_id" : question.id if question else 1,
+        "roll_num" : score.roll_num if score else "1",
+        "score_state" : score.state if score else "common",
+        "score_class" : score.student_class if score else 10
+    }
+
+
+def hot_queries(values):
+    return {
+        "attend_assignment" : select(Question).where(
+            Question.student_class == values["student_class"],
+            Question.subject == values["subject"],
+            Question.chapter == values["chapter"],
+            Question.state == values["state"],
+            Question.suptopic.in_([values["suptopic"]])
+        ),
+        "student_availabilty" : select(Question).where(Question.student_class == values["student_class"]),
+        "fetch_availablity" : select(
+            Question.student_class ,Question.subject ,Question.chapter ,Question.suptopic
+        ).where(Question.state == "common").distinct(),
+        "options_of_questions" : select(Options).where(Options.question_id.in_([values["question_id"]])),
+        "student_score" : select(StudentScore).where(
+            StudentScore.student_class == values["score_class"],
+            StudentScore.roll_num == values["roll_num"],
+            StudentScore.state == values["score_state"]
+        ),
+    }
+
+
+def explain(conn ,statement):
+    sql = str(statement.compile(dialect = Engine.dialect ,compile_kwargs = {"literal_binds" : True}))
+    prefix = "EXPLAIN QUERY PLAN " if Engine.dialect.name == "sqlite" else "EXPLAIN "
+    result = conn.execute(text(prefix + sql))
+    return list(result.keys()) ,[tuple(row) for row in result]
+
+
+def capture(repeat = 20):
+    captured = { }
+    with Engine.connect() as conn :
+        for name ,statement in hot_queries(sample_values(conn)).items():
+            columns ,plan = explain(conn ,statement)
+
+            times = [ ]
+            for _ in range(repeat):
+                start = time.perf_counter()
+                conn.execute(statement).fetchall()
+                times.append(time.perf_counter() - start)
+
+            times.sort()
+            captured[name] = {"columns" : columns ,"plan" : plan ,"median_ms" : times[len(times) // 2] * 1000}
+    return captured
+
+
+def section(title ,captured):
+    lines = [f"## {title}" ,""]
+    for name ,result in captured.items():
+        lines += [f"### {name} ({result['median_ms']:.2f} ms median)" ,"" ,"```" ," | ".join(result["columns"])]
+        lines += [" | ".join(str(value) for value in row) for row in result["plan"]]
+        lines += ["```" ,""]
+    return lines
+
+
+if __name__ == "__main__" :
+    lines = [f"# query plans ({Engine.dialect.name}) {datetime.now():%Y-%m-%d %H:%M}" ,""]
+    lines += section("before" ,capture())
+
+    if "--apply" in sys.argv :
+        migrations.migrate()
+        lines += section("after" ,capture())
+
+    report_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)) ,"reports")
+    os.makedirs(report_dir ,exist_ok = True)
+    path = os.path.join(report_dir ,f"query_plans_{datetime.now():%Y%m%d_%H%M%S}.md")
+    with open(path ,"w") as file :
+        file.write("\n".join(lines))
+    print("\n".join(lines))
+    print(f"report written to {path}")
@@ -0,0 +1,47 @@
+"""chapter load time :- json list of floats vs float32 blob
+
+run from the backend folder ,python benchmarks/vector_load_bench.py [chunks] [dim]
+only numpy is needed ,the rows are synthetic so no database or credentials are touched.
+"""
+import sys
+import os
+import json
+import time
+import numpy as np
+
+sys.path.insert(0 ,os.path.join(os.path.dirname(os.path.abspath(__file__)) ,".."))
+
+DTYPE = np.dtype("<f4") ##same layout as vector_store.DTYPE
+
+
+def bench(chunks = 2000 ,dim = 768 ,repeat = 5):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((chunks ,dim))
+
+    ##what the db driver hands back for each layout
+    json_rows = [json.dumps(vec.tolist()) for vec in vectors]
+    blob_rows = [vec.astype(DTYPE).tobytes() for vec in vectors]
+
+    json_times = [ ]
+    for _ in range(repeat):
+        start = time.perf_counter()
+        matrix_json = np.array([json.loads(row) for row in json_rows])
+        json_times.append(time.perf_counter() - start)
+
+    blob_times = [ ]
+    for _ in range(repeat):
+        start = time.perf_counter()
+        matrix_blob = np.frombuffer(b"".join(blob_rows) ,dtype = DTYPE).reshape(chunks ,-1)
+        blob_times.append(time.perf_counter() - start)
+
+    assert np.allclose(matrix_json ,matrix_blob ,atol = 1e-6)
+
+    print(f"chunks={chunks} dim={dim}")
+    print(f"json   : {min(json_times) * 1000:8.2f} ms  matrix {matrix_json.nbytes / 1e6:7.2f} MB  stored {sum(map(len ,json_rows)) / 1e6:7.2f} MB")
+    print(f"binary : {min(blob_times) * 1000:8.2f} ms  matrix {matrix_blob.nbytes / 1e6:7.2f} MB  stored {sum(map(len ,blob_rows)) / 1e6:7.2f} MB")
+    print(f"speedup : {min(json_times) / min(blob_times):.1f}x")
+
+
+if __name__ == "__main__" :
+    args = [int(arg) for arg in sys.argv[1:3]]
+    bench(*args)
@@ -0,0 +1,49 @@
+from sqlalchemy import Column ,Integer ,String ,Text ,DateTime ,UniqueConstraint ,LargeBinary
+from sqlalchemy.orm import declarative_base
+from db_engine import Engine
+
+Base = declarative_base()
+
+##content addressed store for llm responses ,key = sha256(model ,prompt ,attachments)
+class LlmResponseCache(Base):
+    __tablename__ = "LlmResponseCache"
+
+    id = Column(Integer, primary_key=True ,autoincrement=True)
+    key = Column(String(64) ,unique=True ,index=True)
+    model = Column(Text)
+    caller = Column(Text)
+    response = Column(Text(16777215)) ##mediumtext in mysql ,translated mcq batches can be large
+    created = Column(DateTime)
+    expires = Column(DateTime)
+
+##(text ,target language) -> translation memory shared by every worker
+class TranslationMemory(Base):
+    __tablename__ = "TranslationMemory"
+    __table_args__ = (UniqueConstraint("text_hash" ,"target"),)
+
+    id = Column(Integer, primary_key=True ,autoincrement=True)
+    text_hash = Column(String(64)) ##sha256 of the source text
+    target = Column(String(16))
+    text = Column(Text)
+    translation = Column(Text)
+    created = Column(DateTime)
+
+##text embedding per (text ,encoder model) ,vector stored as float32 bytes
+class EmbeddingCache(Base):
+    __tablename__ = "EmbeddingCache"
+    __table_args__ = (UniqueConstraint("text_hash" ,"model"),)
+
+    id = Column(Integer, primary_key=True ,autoincrement=True)
+    text_hash = Column(String(64)) ##sha256 of the text
+    model = Column(String(128))
+    vector = Column(LargeBinary)
+    created = Column(DateTime)
+
+if __name__ == "__main__" :
+    inp = input( "start_creating_tables(y/n) : ")
+    if inp == "y" :
+        try:
+            Base.metadata.create_all(Engine)
+            print( "Tables created succesfully")
+        except Exception as e:
+            print(f"db_creation : error occurred: {e}")
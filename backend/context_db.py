@@ -1,18 +1,29 @@
 from sqlalchemy import create_engine
-from sqlalchemy import Column ,Text ,JSON ,Integer
+from sqlalchemy import Column ,Text ,JSON ,Integer ,LargeBinary ,String ,Index
 from sqlalchemy.orm import declarative_base
 from db_engine import Engine
+import hashlib
 
 Base = declarative_base()
 
+
+def chunk_hash(chunk):
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
 #used in genertaing context aware solution for logical/theoritical questions
 class TheoryContext(Base):
     __tablename__ = "TheoryContext"
+    __table_args__ = (
+        ##a chunk is stored once per chapter ,mysql indexes only a prefix of a text column
+        Index("ix_theory_relative_chunk" ,"relative_id" ,"chunk_hash" ,unique = True ,mysql_length = {"relative_id" : 255}),
+    )
 
     id = Column(Integer, primary_key=True ,autoincrement=True)
     relative_id = Column(Text)
     chunk = Column(Text)
-    text_vector = Column(JSON)
+    chunk_hash = Column(String(64)) ##sha256 of chunk
+    text_vector = Column(JSON) ##legacy list of floats ,kept until migrated to vector_blob
+    vector_blob = Column(LargeBinary) ##float32 bytes ,see vector_store
 
 ##this context used for generating soltuions for numeric problems   
 class NumericProblemContext(Base):
@@ -22,7 +33,8 @@ class NumericProblemContext(Base):
     relative_id = Column(Text)
     question = Column(Text)
     solution = Column(Text)
-    text_vector = Column(JSON)
+    text_vector = Column(JSON) ##legacy list of floats ,kept until migrated to vector_blob
+    vector_blob = Column(LargeBinary) ##float32 bytes ,see vector_store
 
 if __name__ == "__main__" : 
     inp = input( "start_creating_tables(y/n) : ")
@@ -33,3 +45,5 @@ if __name__ == "__main__" :
         except Exception as e:
             print(f"db_creation : error occurred: {e}")
 
+    ##existing databases are upgraded with python -m migrations
+
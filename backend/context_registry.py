@@ -0,0 +1,88 @@
+from semantic_search import SimTheory ,SimNumericProblem
+from collections import OrderedDict
+from settings import settings
+import threading
+
+
+class ContextRegistry :
+    """one in-memory search index per chapter ,shared by every consumer in the process
+
+    DoubtSolver ,SubtpcExplGen ,SoltuionGenerator and the ingestion paths all ask the registry ,so a chapter's
+    embeddings are loaded once. entries are evicted least recently used first once their total size goes past
+    CONTEXT_CACHE_MAX_MB.
+    """
+
+    def __init__(self ,max_bytes = None):
+        self.max_bytes = max_bytes or int(settings.get("CONTEXT_CACHE_MAX_MB" ,512)) * 1024 * 1024
+        self.__entries = OrderedDict() ##key -> [context ,size]
+        self.__loading = { } ##key -> lock ,so a chapter is loaded by one thread only
+        self.__counts = {"hits" : 0 ,"misses" : 0 ,"evictions" : 0}
+        self.__lock = threading.Lock()
+
+    def theory(self ,stud_clss ,subj ,chap):
+        return self.__get(
+            key = ("theory" ,f"{stud_clss}_{subj}_{chap}"),
+            factory = lambda : SimTheory(stud_clss = stud_clss ,subj = subj ,chap = chap)
+        )
+
+    def numeric(self ,stud_clss ,subj ,chap ,state = "common" ,school_id = "common"):
+        return self.__get(
+            key = ("numeric" ,f"{stud_clss}_{subj}_{chap}_{state}_{school_id}"),
+            factory = lambda : SimNumericProblem(stud_clss = stud_clss ,subj = subj ,chap = chap ,state = state ,school_id = school_id)
+        )
+
+    ##re-measuring an entry after new content was added to it
+    def resize(self ,context):
+        with self.__lock :
+            for key ,entry in self.__entries.items():
+                if entry[0] is context :
+                    entry[1] = context.nbytes()
+                    break
+            self.__evict()
+
+    def stats(self):
+        with self.__lock :
+            report = dict(self.__counts)
+            report["entries"] = len(self.__entries)
+            report["bytes"] = sum(entry[1] for entry in self.__entries.values())
+            report["max_bytes"] = self.max_bytes
+            report["chapters"] = {f"{kind}:{common_id}" : entry[1] for (kind ,common_id) ,entry in self.__entries.items()}
+        return report
+
+    def __get(self ,key ,factory):
+        with self.__lock :
+            if key in self.__entries :
+                self.__counts["hits"] += 1
+                self.__entries.move_to_end(key)
+                return self.__entries[key][0]
+            load_lock = self.__loading.setdefault(key ,threading.Lock())
+
+        with load_lock :
+            with self.__lock :
+                if key in self.__entries : ##loaded by another thread while waiting
+                    self.__counts["hits"] += 1
+                    self.__entries.move_to_end(key)
+                    return self.__entries[key][0]
+
+            context = factory()
+            size = context.nbytes()
+
+            with self.__lock :
+                self.__counts["misses"] += 1
+                self.__entries[key] = [context ,size]
+                self.__loading.pop(key ,None)
+                self.__evict()
+
+        return context
+
+    ##called with the lock held ,the most recent entry is always kept
+    def __evict(self):
+        total = sum(entry[1] for entry in self.__entries.values())
+        while total > self.max_bytes and len(self.__entries) > 1 :
+            key ,entry = self.__entries.popitem(last = False)
+            total -= entry[1]
+            self.__counts["evictions"] += 1
+            print(f"context registry : evicted {key[0]}:{key[1]} ({entry[1]} bytes)")
+
+
+context_registry = ContextRegistry()
@@ -0,0 +1,165 @@
+from question_bank import Question ,CurriculumCatalog ,CatalogVersion
+from sqlalchemy import func ,update ,delete ,tuple_
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import IntegrityError
+from db_engine import Engine
+from settings import settings
+import threading
+import time
+
+Session = sessionmaker(bind = Engine)
+
+
+class CurriculumCatalogCache :
+    """class -> subject -> chapter -> subtopic tree of the question bank with question counts
+
+    the CurriculumCatalog table is updated incrementally whenever questions are stored and a version row is bumped.
+    every worker keeps the whole catalog in memory and reloads it only when that version changed ,the version row
+    is read at most once every CATALOG_VERSION_CHECK seconds.
+    """
+
+    def __init__(self):
+        self.check_interval = float(settings.get("CATALOG_VERSION_CHECK" ,5))
+        self.__rows = [ ]
+        self.__version = None
+        self.__checked = 0.0
+        self.__lock = threading.Lock()
+
+    ##counts :- {(student_class ,subject ,chapter ,state ,suptopic) : number of new questions}
+    def record(self ,counts ,retries = 3):
+        if len(counts) == 0 :
+            return
+
+        for attempt in range(retries):
+            session = Session()
+            try :
+                keys = list(counts.keys())
+                existing = session.query(CurriculumCatalog).filter(
+                    tuple_(
+                        CurriculumCatalog.student_class ,CurriculumCatalog.subject ,CurriculumCatalog.chapter,
+                        CurriculumCatalog.state ,CurriculumCatalog.suptopic
+                    ).in_(keys)
+                ).all()
+                found = set()
+                for obj in existing :
+                    key = (obj.student_class ,obj.subject ,obj.chapter ,obj.state ,obj.suptopic)
+                    found.add(key)
+                    session.execute(
+                        update(CurriculumCatalog).where(CurriculumCatalog.id == obj.id).values(
+                            q_count = CurriculumCatalog.q_count + counts[key] ##atomic increment
+                        )
+                    )
+
+                session.add_all([
+                    CurriculumCatalog(
+                        student_class = key[0],
+                        subject = key[1],
+                        chapter = key[2],
+                        state = key[3],
+                        suptopic = key[4],
+                        q_count = count
+                    ) for key ,count in counts.items() if key not in found
+                ])
+                self.__bump(session)
+                session.commit()
+                break
+
+            except IntegrityError :
+                session.rollback() ##another worker inserted the same entry meanwhile ,retrying as an update
+                if attempt == retries - 1 :
+                    raise
+            finally:
+                session.close()
+
+        self.invalidate()
+
+    ##recomputes the whole catalog from the question table
+    def rebuild(self):
+        session = Session()
+        rows = session.query(
+            Question.student_class ,Question.subject ,Question.chapter ,Question.state ,Question.suptopic ,func.count(Question.id)
+        ).group_by(
+            Question.student_class ,Question.subject ,Question.chapter ,Question.state ,Question.suptopic
+        ).order_by(func.min(Question.id)).all()
+
+        session.execute(delete(CurriculumCatalog))
+        session.add_all([
+            CurriculumCatalog(
+                student_class = row[0],
+                subject = row[1],
+                chapter = row[2],
+                state = row[3],
+                suptopic = row[4],
+                q_count = row[5]
+            ) for row in rows
+        ])
+        self.__bump(session)
+        session.commit()
+        session.close()
+
+        self.invalidate()
+        return len(rows)
+
+    def invalidate(self):
+        with self.__lock :
+            self.__checked = 0.0
+
+    ##{subject : [chapters]} of a class ,any state
+    def student_view(self ,student_class):
+        response = { }
+        for row in self.__current():
+            if row[0] != student_class :
+                continue
+            chapters = response.setdefault(row[1] ,[ ])
+            if row[2] not in chapters :
+                chapters.append(row[2])
+        return response
+
+    ##{class : {subject : {chapter : [subtopics]}}} of the common question bank
+    def teacher_view(self):
+        response = { }
+        for student_class ,subject ,chapter ,state ,suptopic ,q_count in self.__current():
+            if state != "common" :
+                continue
+            subtopics = response.setdefault(student_class ,{ }).setdefault(subject ,{ }).setdefault(chapter ,[ ])
+            if suptopic not in subtopics :
+                subtopics.append(suptopic)
+        return response
+
+    def __current(self):
+        with self.__lock :
+            if time.time() - self.__checked < self.check_interval :
+                return self.__rows
+
+        rows = None
+        session = Session()
+        try :
+            version = session.query(CatalogVersion.version).filter(CatalogVersion.id == 1).scalar()
+            if self.__newer(version) :
+                rows = session.query(
+                    CurriculumCatalog.student_class ,CurriculumCatalog.subject ,CurriculumCatalog.chapter,
+                    CurriculumCatalog.state ,CurriculumCatalog.suptopic ,CurriculumCatalog.q_count
+                ).order_by(CurriculumCatalog.id).all()
+                rows = [tuple(row) for row in rows]
+        finally:
+            session.close()
+
+        with self.__lock :
+            ##a thread that read an older snapshot meanwhile never moves the catalog back
+            if rows is not None and self.__newer(version) :
+                self.__rows = rows
+                self.__version = version
+            self.__checked = time.time()
+            return self.__rows
+
+    ##the version row only grows ,so a snapshot is taken only when it is above the one held
+    def __newer(self ,version):
+        return version is not None and (self.__version is None or version > self.__version)
+
+    def __bump(self ,session):
+        result = session.execute(update(CatalogVersion).where(CatalogVersion.id == 1).values(version = CatalogVersion.version + 1))
+        if result.rowcount == 0 :
+            session.add(CatalogVersion(id = 1 ,version = 1))
+
+
+curriculum_catalog = CurriculumCatalogCache()
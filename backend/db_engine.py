@@ -1,14 +1,43 @@
 from sqlalchemy import create_engine
-from dotenv import load_dotenv
-import os  
+from settings import settings
 
-load_dotenv(override = True) ##loading the env files 
 
 ##creating the db engine with restructed connections //set connection timeout very high
 Engine = create_engine( 
-    url = os.getenv("DATA_BASE_URL") ,
-    pool_size =  int(os.getenv("DB_CONNECT_COUNT")),
+    url = settings.get("DATA_BASE_URL") ,
+    pool_size =  int(settings.get("DB_CONNECT_COUNT")),
     max_overflow = 10,
-    pool_timeout = int(os.getenv("DB_TIMEOUT")),
+    pool_timeout = int(settings.get("DB_TIMEOUT")),
     pool_recycle = 1800  
 )
+
+
+##inserts rows (dicts) of a model ,rows whose unique keys exist already are skipped instead of failing the batch
+def insert_missing(model ,rows ,keys):
+    if len(rows) == 0 :
+        return
+
+    dialect = Engine.dialect.name
+    if dialect == "mysql" :
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(model)
+        stmt = stmt.on_duplicate_key_update({keys[0] : stmt.inserted[keys[0]]}) ##no-op ,the key stays the same
+    elif dialect in ("sqlite" ,"postgresql") :
+        if dialect == "sqlite" :
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(model).on_conflict_do_nothing(index_elements = keys)
+    else:
+        from sqlalchemy import insert
+        from sqlalchemy.exc import IntegrityError
+        for row in rows :
+            try :
+                with Engine.begin() as conn :
+                    conn.execute(insert(model).values(**row))
+            except IntegrityError : ##stored by someone else meanwhile
+                pass
+        return
+
+    with Engine.begin() as conn :
+        conn.execute(stmt ,rows)
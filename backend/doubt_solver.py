@@ -1,18 +1,19 @@
-from semantic_search import SimTheory ,SimNumericProblem
+from context_registry import context_registry
 from image_generator import ImageGenerator
+from answer_index import AnswerIndex
+from vector_store import to_blob ,DTYPE
 from question_bank import DoubtResolution
-from google.oauth2 import service_account
-from google.cloud import storage
-from dotenv import load_dotenv
-from google import genai
+from llm_gateway import llm_gateway
 from datetime import timedelta ,datetime
 from sqlalchemy.orm import sessionmaker
 from db_engine import Engine
+from google_clients import google_clients
+from settings import settings
+import numpy as np
+import asyncio
 import json
-import os
 
 
-load_dotenv(override=True)
 Session = sessionmaker(bind=Engine)
 
 prompt = prompt = """###Instruction: Using the given knowledge base, resolve the student's doubt in 4-5 lines. The explanation should be tailored for a {clss}th-grade student from a rural area in {state}, India, making it relatable to their daily life and experiences. Keep the explanation concise and easy to understand.
@@ -38,12 +39,52 @@ Then, create three multiple-choice questions (MCQs) based on the knowledge base
    ]
 }}"""
 
+mcq_prompt = """###Instruction: Create three multiple-choice questions (MCQs) based on the given explanation to check if the student's doubt has been resolved.
+
+###Explanation: {explanation}
+
+###Doubt: {question}
+
+###Output formate : [
+   {{ 
+      "question": "", 
+      "options": [ "opt1", "opt2", "opt3", "opt4" ], 
+      "correct_option": "", 
+      "why": "" 
+   }},
+]"""
+
+
+##past resolutions of a chapter for one state ,only rows carrying a question embedding take part
+def load_resolutions(scope):
+    common_id ,state = scope
+    session = Session()
+    rows = session.query(DoubtResolution.id ,DoubtResolution.q_vector).filter(
+        DoubtResolution.relative_id == common_id,
+        DoubtResolution.state == state,
+        DoubtResolution.q_vector.isnot(None)
+    ).order_by(DoubtResolution.id).all()
+    session.close()
+
+    if len(rows) == 0:
+        return [ ] ,np.zeros((0 ,0) ,dtype = DTYPE)
+    return [row.id for row in rows] ,np.frombuffer(b"".join(row.q_vector for row in rows) ,dtype = DTYPE).reshape(len(rows) ,-1)
+
+
 class DoubtSolver:
-    model = os.getenv("LANGUAGE_MODEL_ID")
-    client = genai.Client(api_key = os.getenv("GOOGLE_API_KEY"))
-    context_cache = { }
+    model = settings.get("LANGUAGE_MODEL_ID")
     Image_gen_obj = ImageGenerator()
 
+    ##answer cache :- DOUBT_CACHE=0 disables it ,DOUBT_CACHE_MCQS is stored | regenerate | none ,
+    ##DOUBT_CACHE_SHOW_MATCH=1 returns the past question the answer was given for
+    cache_enabled = settings.get("DOUBT_CACHE" ,"1") == "1"
+    cache_mcqs = settings.get("DOUBT_CACHE_MCQS" ,"stored")
+    show_match = settings.get("DOUBT_CACHE_SHOW_MATCH" ,"0") == "1"
+    answers = AnswerIndex(
+        loader = load_resolutions,
+        min_similarity = float(settings.get("DOUBT_CACHE_MIN_SIM" ,0.92))
+    )
+
     def __init__(self, state ,clss ,subj ,chap ,school_id = None):
         self.clss = clss
         self.state = state
@@ -56,52 +97,101 @@ class DoubtSolver:
             self.common_id = f"{clss}_{subj}_{chap}"
             self.q_type = "theory"
         
-        if self.common_id not in self.context_cache : 
-            if subj == "Math":
-                self.context_cache[self.common_id] = SimNumericProblem(
-                    stud_clss = clss,
-                    chap = chap,
-                    subj = subj,
-                )
-            else:
-                self.context_cache[self.common_id] = SimTheory(
-                    stud_clss = clss,
-                    subj = subj,
-                    chap = chap
-                )
+        ##chapter index shared with the other consumers through the registry
+        if subj == "Math":
+            self.context = context_registry.numeric(
+                stud_clss = clss,
+                chap = chap,
+                subj = subj,
+            )
+        else:
+            self.context = context_registry.theory(
+                stud_clss = clss,
+                subj = subj,
+                chap = chap
+            )
     
     def add_image(self ,link):
-        self.img = self.client.files.upload(file = link)
+        self.img = llm_gateway.upload(file = link ,caller = "DoubtSolver")
+
+    async def aadd_image(self ,link):
+        self.img = await llm_gateway.aupload(file = link ,caller = "DoubtSolver")
 
     def resolve(self ,question):
-        kb = self.context_cache[self.common_id].search(question)
+        ##doubts with an attached image are always answered fresh
+        q_vector = None
+        if self.img is None and self.cache_enabled:
+            q_vector = self.context.embedder.encode([question])[0]
+            cached = self.__cached(q_vector = q_vector)
+            if cached is not None:
+                if cached['mcqs'] is None:
+                    cached['mcqs'] = self.__mcqs(question = question ,explanation = cached['doubt_resolution'])
+                return cached
+
+        kb = self.context.search(question) ##the question embedding is served from the embedder cache
         if len(kb) == 0:
             return {"doubt_resolution": "No Context available", "img":"null" ,"mcqs": []}
 
-        form_prmpt = prompt.format(
-            knowledge_base = kb,
-            state = self.state,
-            clss = self.clss,
-            question = question   
+        resp = llm_gateway.generate(
+            model=self.model,
+            contents = self.__content(question = question ,kb = kb),
+            caller = "DoubtSolver.resolve"
+        )
+
+        resp = self.__extract_dict(response = resp)
+
+        img_bucket_link = self.Image_gen_obj.generate(
+            prompt = resp['image_generation_prompt'],
+            common_id = self.common_id
         )
         
-        if self.img is None:
-            content = form_prmpt
-        else:
-            content = [self.img ,form_prmpt]
+        return self.__save(question = question ,resp = resp ,img_bucket_link = img_bucket_link ,q_vector = q_vector)
 
-        resp = self.client.models.generate_content(
+    ##asyncio version of resolve ,blocking db and storage work waits in worker threads
+    async def aresolve(self ,question):
+        q_vector = None
+        if self.img is None and self.cache_enabled:
+            q_vector = (await self.context.embedder.aencode([question]))[0]
+            cached = await asyncio.to_thread(self.__cached ,q_vector = q_vector)
+            if cached is not None:
+                if cached['mcqs'] is None:
+                    cached['mcqs'] = await self.__amcqs(question = question ,explanation = cached['doubt_resolution'])
+                return cached
+
+        kb = await self.context.asearch(question)
+        if len(kb) == 0:
+            return {"doubt_resolution": "No Context available", "img":"null" ,"mcqs": []}
+
+        resp = await llm_gateway.agenerate(
             model=self.model,
-            contents = content,
-        ).text
+            contents = self.__content(question = question ,kb = kb),
+            caller = "DoubtSolver.resolve"
+        )
 
         resp = self.__extract_dict(response = resp)
 
-        img_bucket_link = self.Image_gen_obj.generate(
+        img_bucket_link = await self.Image_gen_obj.agenerate(
             prompt = resp['image_generation_prompt'],
             common_id = self.common_id
         )
+
+        return await asyncio.to_thread(self.__save ,question = question ,resp = resp ,img_bucket_link = img_bucket_link ,q_vector = q_vector)
+
+    def __content(self ,question ,kb):
+        form_prmpt = prompt.format(
+            knowledge_base = kb,
+            state = self.state,
+            clss = self.clss,
+            question = question   
+        )
         
+        if self.img is None:
+            return form_prmpt
+        return [self.img ,form_prmpt]
+
+    ##stores the new resolution and returns the response
+    def __save(self ,question ,resp ,img_bucket_link ,q_vector):
+        url = None
         if img_bucket_link != None :
             url ,expiration = self.__img_acces_url(img = img_bucket_link)
             session = Session()
@@ -113,27 +203,83 @@ class DoubtSolver:
                 q_type = self.q_type,
                 img = img_bucket_link,
                 access_url = url,
-                expiration = expiration
+                expiration = expiration,
+                state = self.state,
+                q_vector = None if q_vector is None else to_blob(q_vector),
+                mcqs = json.dumps(resp.get('mcqs' ,[]))
             )
 
             session.add(obj)
             session.commit()
+            if q_vector is not None:
+                self.answers.add(scope = (self.common_id ,self.state) ,answer_id = obj.id ,vector = q_vector)
             session.close()
         
         del resp['image_generation_prompt']
         resp['img'] = url
 
         return resp
+    
+    ##answer of a similar past doubt ,the image url is re-signed when it has expired
+    ##mcqs is None when they have to be generated again for the new question
+    def __cached(self ,q_vector):
+        match = self.answers.lookup(scope = (self.common_id ,self.state) ,query_vector = q_vector)
+        if match is None:
+            return None
+
+        session = Session()
+        obj = session.get(DoubtResolution ,match[0])
+        if obj is None:
+            session.close()
+            return None
+
+        if obj.expiration is None or obj.expiration < datetime.now():
+            url ,expiration = self.__img_acces_url(img = obj.img)
+            if url is not None:
+                obj.access_url = url
+                obj.expiration = expiration
+                session.commit()
+
+        resp = {
+            "doubt_resolution" : obj.explanation,
+            "img" : obj.access_url,
+            "mcqs" : [ ],
+            "cached" : True,
+            "similarity" : round(match[1] ,3)
+        }
+
+        if self.cache_mcqs == "stored" and obj.mcqs:
+            resp['mcqs'] = json.loads(obj.mcqs)
+        elif self.cache_mcqs != "none":
+            resp['mcqs'] = None
+
+        if self.show_match:
+            resp['matched_question'] = obj.question
+
+        session.close()
+        return resp
+
+    def __mcqs(self ,question ,explanation):
+        resp = llm_gateway.generate(
+            model=self.model,
+            contents = mcq_prompt.format(explanation = explanation ,question = question),
+            caller = "DoubtSolver.mcqs"
+        )
+        return self.__extract_list(response = resp)
+
+    async def __amcqs(self ,question ,explanation):
+        resp = await llm_gateway.agenerate(
+            model=self.model,
+            contents = mcq_prompt.format(explanation = explanation ,question = question),
+            caller = "DoubtSolver.mcqs"
+        )
+        return self.__extract_list(response = resp)
         
         
     def __img_acces_url(self ,img):
         try:
-            key_path = os.path.abspath(os.getenv("CRED_JSON_PATH"))
-            credentials = service_account.Credentials.from_service_account_file(key_path)
-            storage_client = storage.Client(credentials = credentials )
-
-            bucket = storage_client.bucket(os.getenv("BUCKET_NAME"))
-            blob = bucket.blob(img)  # Use the actual path stored in DB
+            ##service account client ,built once per process
+            blob = google_clients.signing_bucket().blob(img)  # Use the actual path stored in DB
 
             # Generate a signed URL (valid for 1 hour)
             signed_url = blob.generate_signed_url(
@@ -159,6 +305,18 @@ class DoubtSolver:
                     i2 = i 
             return json.loads( response[i1 : i2 + 1] )
 
+    def __extract_list(self ,response):
+        try:
+            return json.loads(response)
+        except:
+            i1 ,i2 = None ,None  
+            for i in range(len(response)):
+                if i1 is None and response[i] == "[" : 
+                    i1 = i 
+                elif response[i] == "]" :
+                    i2 = i 
+            return json.loads( response[i1 : i2 + 1] )
+
 
         
 
@@ -1,40 +1,194 @@
-from vertexai.language_models import TextEmbeddingModel
-from dotenv import load_dotenv
-import vertexai
+from cache_db import EmbeddingCache
+from memory_cache import LruCache
+from vector_store import to_blob ,DTYPE
+from sqlalchemy.orm import sessionmaker
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from db_engine import Engine ,insert_missing
+from google_clients import google_clients
+from settings import settings
 import numpy as np
-import os
+import threading
+import asyncio
+import weakref
+import hashlib
+import time
 
-load_dotenv(override=True)
+Session = sessionmaker(bind = Engine)
 
-##initiating vertex ai account  
-vertexai.init( 
-    project = os.getenv("GOOGLE_CLOUD_PROJECT_ID"), 
-    location = os.getenv("GOOGLE_CLOUD_REGION")
-)
+class Embedder :
+    ##shared by every Embedder instance in the process
+    memory = LruCache(max_entries = int(settings.get("EMBED_CACHE_SIZE" ,20000)))
+    counts = {"memory_hits" : 0 ,"db_hits" : 0 ,"encoded" : 0 ,"batches" : 0 ,"batch_time" : 0.0 ,"max_batch_time" : 0.0}
+    lock = threading.Lock()
+
+    ##vertex accepts 250 texts / ~20k tokens per request ,batches stay well below both
+    batch_size = int(settings.get("EMBED_BATCH_SIZE" ,100))
+    batch_chars = int(settings.get("EMBED_BATCH_CHARS" ,40000))
+    workers = int(settings.get("EMBED_WORKERS" ,4))
+    async_concurrency = int(settings.get("EMBED_ASYNC_CONCURRENCY" ,16))
+    async_slots = weakref.WeakKeyDictionary()
 
-class Embedder : 
-    
     def __init__(self):
-        self.model = TextEmbeddingModel.from_pretrained(
-            os.getenv("TEXT_ENCODER_ID")
-        )
-    
+        self.model_id = settings.get("TEXT_ENCODER_ID")
+
+    ##vertex model ,loaded on the first text that is not cached
+    @property
+    def model(self):
+        return google_clients.embedding_model(self.model_id)
+
     def encode(self ,text_list):
         assert isinstance(text_list ,list) ,"text_list should be a list"
-        
-        embeddings = self.model.get_embeddings( 
-            texts = text_list 
+
+        hashes = [self.__hash(text) for text in text_list]
+        found ,pending = self.__from_memory(text_list ,hashes)
+        if len(pending) > 0 :
+            pending = self.__from_db(pending ,found)
+
+        ##vertex for the rest ,request sized batches sent concurrently
+        if len(pending) > 0 :
+            batches = self.__batches(pending)
+            with ThreadPoolExecutor(max_workers = min(self.workers ,len(batches))) as executor :
+                results = list(executor.map(self.__encode_batch ,batches))
+            self.__keep(batches ,results ,found)
+
+        return np.array([found[key] for key in hashes] ,dtype = DTYPE)
+
+    ##asyncio version of encode ,vertex batches are awaited instead of holding a thread each
+    async def aencode(self ,text_list):
+        assert isinstance(text_list ,list) ,"text_list should be a list"
+
+        hashes = [self.__hash(text) for text in text_list]
+        found ,pending = self.__from_memory(text_list ,hashes)
+        if len(pending) > 0 :
+            pending = await asyncio.to_thread(self.__from_db ,pending ,found)
+
+        if len(pending) > 0 :
+            batches = self.__batches(pending)
+            results = await asyncio.gather(*[self.__aencode_batch(batch) for batch in batches])
+            await asyncio.to_thread(self.__keep ,batches ,results ,found)
+
+        return np.array([found[key] for key in hashes] ,dtype = DTYPE)
+
+    @classmethod
+    def stats(cls):
+        with cls.lock :
+            report = dict(cls.counts)
+        lookups = report["memory_hits"] + report["db_hits"] + report["encoded"]
+        report["hit_ratio"] = round((report["memory_hits"] + report["db_hits"]) / lookups ,3) if lookups else 0.0
+        report["avg_batch_time"] = round(report["batch_time"] / report["batches"] ,3) if report["batches"] else 0.0
+        report["memory_entries"] = len(cls.memory)
+        return report
+
+    def __batches(self ,pending):
+        batches = [[ ]]
+        chars = 0
+        for text ,key in pending :
+            if len(batches[-1]) >= self.batch_size or (len(batches[-1]) > 0 and chars + len(text) > self.batch_chars):
+                batches.append([ ])
+                chars = 0
+            batches[-1].append((text ,key))
+            chars += len(text)
+        return batches
+
+    def __encode_batch(self ,batch):
+        start = time.perf_counter()
+        embeddings = self.model.get_embeddings(
+            texts = [text for text ,key in batch]
         )
+        self.__record_batch(batch ,time.perf_counter() - start)
+
+        return [np.asarray(obj.values ,dtype = DTYPE) for obj in embeddings]
+
+    async def __aencode_batch(self ,batch):
+        async with self.__async_slot():
+            start = time.perf_counter()
+            embeddings = await self.model.get_embeddings_async(
+                texts = [text for text ,key in batch]
+            )
+            self.__record_batch(batch ,time.perf_counter() - start)
+
+        return [np.asarray(obj.values ,dtype = DTYPE) for obj in embeddings]
+
+    def __record_batch(self ,batch ,duration):
+        with self.lock :
+            self.counts["batches"] += 1
+            self.counts["encoded"] += len(batch)
+            self.counts["batch_time"] += duration
+            self.counts["max_batch_time"] = max(self.counts["max_batch_time"] ,duration)
+
+    ##one semaphore per running event loop ,caps the vertex requests in flight from async callers
+    def __async_slot(self):
+        loop = asyncio.get_running_loop()
+        with self.lock :
+            if loop not in self.async_slots :
+                self.async_slots[loop] = asyncio.Semaphore(self.async_concurrency)
+            return self.async_slots[loop]
+
+    ##memory tier ,returns (found vectors by hash ,pending (text ,hash) pairs)
+    def __from_memory(self ,text_list ,hashes):
+        found = { }
+        pending = [ ]
+        for text ,key in dict(zip(text_list ,hashes)).items():
+            vector = self.memory.get((key ,self.model_id))
+            if vector is None :
+                pending.append((text ,key))
+            else:
+                found[key] = vector
+        self.__count("memory_hits" ,len(set(hashes)) - len(pending))
+        return found ,pending
+
+    ##db tier ,fills found and returns what is still missing
+    def __from_db(self ,pending ,found):
+        stored = self.__fetch(keys = [key for text ,key in pending])
+        self.__count("db_hits" ,len(stored))
+        for key ,vector in stored.items():
+            found[key] = vector
+            self.memory.put((key ,self.model_id) ,vector)
+        return [(text ,key) for text ,key in pending if key not in stored]
+
+    ##new vectors go to both cache tiers
+    def __keep(self ,batches ,results ,found):
+        new_vectors = { }
+        for batch ,vectors in zip(batches ,results):
+            for (text ,key) ,vector in zip(batch ,vectors):
+                new_vectors[key] = vector
+                self.memory.put((key ,self.model_id) ,vector)
+        self.__store(new_vectors)
+        found.update(new_vectors)
+
+    def __fetch(self ,keys):
+        session = Session()
+        try :
+            objs = session.query(EmbeddingCache).filter(
+                EmbeddingCache.model == self.model_id,
+                EmbeddingCache.text_hash.in_(keys)
+            ).all()
+        except Exception as e:
+            print("ERROR : Embedder.fetch :-" ,e)
+            return { }
+        finally:
+            session.close()
+
+        return {obj.text_hash : np.frombuffer(obj.vector ,dtype = DTYPE) for obj in objs}
 
-        vectors = [ ]
-        for obj in embeddings:
-            vectors.append( 
-                obj.values 
-            ) 
-        
-        return np.array(vectors)
-    
+    ##vectors stored by another worker meanwhile are skipped ,the rest of the batch is still saved
+    def __store(self ,new_vectors):
+        try :
+            insert_missing(EmbeddingCache ,[
+                {
+                    "text_hash" : key,
+                    "model" : self.model_id,
+                    "vector" : to_blob(vector),
+                    "created" : datetime.now()
+                } for key ,vector in new_vectors.items()
+            ] ,keys = ["text_hash" ,"model"])
+        except Exception as e:
+            print("ERROR : Embedder.store :-" ,e)
 
+    def __hash(self ,text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-        
-    
+    def __count(self ,name ,value):
+        with self.lock :
+            self.counts[name] += value
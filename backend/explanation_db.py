@@ -0,0 +1,42 @@
+from sqlalchemy import Column ,Integer ,String ,Text ,Float ,DateTime ,LargeBinary ,Index
+from sqlalchemy.orm import declarative_base
+from db_engine import Engine
+
+Base = declarative_base()
+
+##what a student explains back after a doubt or a book question ,any worker process can continue the session
+class ExplanationSession(Base):
+    __tablename__ = "ExplanationSession"
+    __table_args__ = (
+        Index("ix_explanation_session_created" ,"created"),
+    )
+
+    access = Column(String(64) ,primary_key=True) ##access key returned with the doubt / book question response
+    target = Column(Text) ##text the explanation is compared with
+    what_to_exp = Column(Text) ##prompt shown to the student ,in the student's language
+    targ_embed = Column(LargeBinary) ##vector of target ,filled by the first explanation
+    score = Column(Float ,default=0) ##best score so far ,range from 0-100
+    created = Column(DateTime)
+
+##one explanation piece of a session ,in the order they were submitted
+class ExplanationTurn(Base):
+    __tablename__ = "ExplanationTurn"
+    __table_args__ = (
+        Index("ix_explanation_turn_access" ,"access" ,"id"),
+    )
+
+    id = Column(Integer ,primary_key=True ,autoincrement=True)
+    access = Column(String(64))
+    lng = Column(String(16))
+    expl = Column(Text)
+    duration = Column(Integer)
+    created = Column(DateTime)
+
+if __name__ == "__main__" :
+    inp = input( "start_creating_tables(y/n) : ")
+    if inp == "y" :
+        try:
+            Base.metadata.create_all(Engine)
+            print( "Tables created succesfully")
+        except Exception as e:
+            print(f"db_creation : error occurred: {e}")
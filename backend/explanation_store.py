@@ -0,0 +1,127 @@
+from explanation_db import ExplanationSession ,ExplanationTurn
+from sqlalchemy import select ,update ,insert ,delete
+from datetime import datetime ,timedelta
+from vector_store import to_blob ,DTYPE
+from db_engine import Engine
+from settings import settings
+import numpy as np
+import threading
+import time
+
+
+class ExplanationStore :
+    """explanation sessions of the students ,kept in the db so every worker process can continue any of them
+
+    a session is opened with the doubt / book question response and ends when the student wins ,gives up (timeout)
+    or after EXPL_SESSION_TTL seconds (default a day). the explanation pieces are rows of their own ,so concurrent
+    submits never overwrite each other ,the best score only grows (conditional update) and ending a session is a
+    delete :- exactly one request ends it ,so the points of a win are awarded once.
+    """
+
+    def __init__(self ,ttl = None ,prune_interval = None):
+        self.ttl = ttl or float(settings.get("EXPL_SESSION_TTL" ,86400))
+        self.prune_interval = prune_interval or float(settings.get("EXPL_PRUNE_INTERVAL" ,600))
+        self.__pruned = 0.0
+        self.__lock = threading.Lock()
+
+    def open(self ,access ,target ,what_to_exp):
+        self.__prune()
+        with Engine.begin() as conn :
+            conn.execute(insert(ExplanationSession).values(
+                access = access,
+                target = target,
+                what_to_exp = what_to_exp,
+                score = 0,
+                created = datetime.now()
+            ))
+
+    ##{"access" ,"target" ,"what_to_exp" ,"targ_embed" ,"score"} ,None once the session ended or expired
+    def get(self ,access):
+        with Engine.connect() as conn :
+            row = conn.execute(select(
+                ExplanationSession.target ,ExplanationSession.what_to_exp ,ExplanationSession.targ_embed,
+                ExplanationSession.score
+            ).where(
+                ExplanationSession.access == access,
+                ExplanationSession.created >= self.__oldest()
+            )).first()
+
+        if row is None :
+            return None
+
+        return {
+            "access" : access,
+            "target" : row.target,
+            "what_to_exp" : row.what_to_exp,
+            "targ_embed" : None if row.targ_embed is None else np.frombuffer(row.targ_embed ,dtype = DTYPE),
+            "score" : row.score or 0
+        }
+
+    def what_to_exp(self ,access):
+        session = self.get(access)
+        return None if session is None else session["what_to_exp"]
+
+    def set_what_to_exp(self ,access ,what_to_exp):
+        self.__update(access ,what_to_exp = what_to_exp)
+
+    def set_embedding(self ,access ,vector):
+        self.__update(access ,targ_embed = to_blob(vector))
+
+    ##stores one explanation piece ,returns every piece of the session so far :- [{'lng' ,'expl' ,'duration'} ,]
+    def add_turn(self ,access ,lng ,expl ,duration):
+        with Engine.begin() as conn :
+            conn.execute(insert(ExplanationTurn).values(
+                access = access,
+                lng = lng,
+                expl = expl,
+                duration = duration,
+                created = datetime.now()
+            ))
+            rows = conn.execute(select(
+                ExplanationTurn.lng ,ExplanationTurn.expl ,ExplanationTurn.duration
+            ).where(ExplanationTurn.access == access).order_by(ExplanationTurn.id)).all()
+
+        return [{'lng' : row.lng ,'expl' : row.expl ,'duration' : row.duration} for row in rows]
+
+    ##keeps the best score ,returns it (score itself when the session already ended)
+    def raise_score(self ,access ,score):
+        with Engine.begin() as conn :
+            conn.execute(update(ExplanationSession).where(
+                ExplanationSession.access == access,
+                ExplanationSession.score < score
+            ).values(score = score))
+            best = conn.execute(select(ExplanationSession.score).where(ExplanationSession.access == access)).scalar()
+
+        return score if best is None else max(best ,score)
+
+    ##ends the session ,True only for the call that removed it
+    def close(self ,access):
+        with Engine.begin() as conn :
+            result = conn.execute(delete(ExplanationSession).where(ExplanationSession.access == access))
+            conn.execute(delete(ExplanationTurn).where(ExplanationTurn.access == access))
+        return result.rowcount == 1
+
+    def __update(self ,access ,**values):
+        with Engine.begin() as conn :
+            conn.execute(update(ExplanationSession).where(ExplanationSession.access == access).values(**values))
+
+    def __oldest(self):
+        return datetime.now() - timedelta(seconds = self.ttl)
+
+    ##expired sessions and their pieces ,at most once every prune_interval seconds per process
+    def __prune(self):
+        with self.__lock :
+            if time.time() - self.__pruned < self.prune_interval :
+                return
+            self.__pruned = time.time()
+
+        try :
+            oldest = self.__oldest()
+            with Engine.begin() as conn :
+                conn.execute(delete(ExplanationSession).where(ExplanationSession.created < oldest))
+                conn.execute(delete(ExplanationTurn).where(ExplanationTurn.created < oldest))
+        except Exception as e:
+            print("ERROR : ExplanationStore.prune :-" ,e)
+
+
+explanation_store = ExplanationStore()
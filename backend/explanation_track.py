@@ -1,18 +1,13 @@
 from embedder import Embedder
-from user_engagement_db import StudentScore
+from score_store import score_store
+from explanation_store import explanation_store
+from settings import settings
 import numpy as np
-from db_engine import Engine
-from sqlalchemy.orm import sessionmaker
-from google import genai
-from dotenv import load_dotenv
-import os
+from llm_gateway import llm_gateway
 import json
+import asyncio
 
 
-load_dotenv(override = True)
-
-Session = sessionmaker(bind = Engine)
-
 combiner_prompt = """Task:
 You are given a list of explanation points written by a student about a specific topic. Your job is to combine all the relevant points into one clear and coherent paragraph that accurately conveys what the student is trying to explain.
 
@@ -35,69 +30,89 @@ Topic: {target_expl}
 Explanation List: {expl_list}"""
 
 class ExplanTrack : 
-    cache = {}
+    """scores what a student explains back against the target of the session (explanation_store)
+
+    every submit combines all the pieces of the session with gemini and compares the embedding of the result with
+    the target. the session holds no process state ,so consecutive submits may reach different worker processes.
+    """
     embedder = Embedder()
     total_scr = 100
     min_win_scr = 70 ##75% of total score 
     lng_scr = 0.1
     time_efficency_scr = 5
-    model = os.getenv("LANGUAGE_MODEL_ID")
-    client = genai.Client(api_key = os.getenv("GOOGLE_API_KEY"))
+    model = settings.get("LANGUAGE_MODEL_ID")
 
-    def is_exist(self ,access):
-        return access in self.cache
+    ##None once the session ended or expired
+    def session(self ,access):
+        return explanation_store.get(access)
 
-    def start(self ,access ,target_txt ):
-        self.cache[access] = { }
-        self.cache[access]['target'] = target_txt
-        self.cache[access]['targ_embed'] = self.embedder.encode([target_txt])[0]
-        self.cache[access]['track'] = [] ##track = [{'lng' : "" ,'expl' : "" ,'duartion':""} ,]##
-        self.cache[access]['score'] = 0 ##range from 0-100
+    ##True when this call ended the session
+    def end(self ,access):
+        return explanation_store.close(access)
 
-        ##printing the target 
-        print("Target :" ,self.cache[access]['target'] ,"\n\n")
-    
-    def track(self ,access ,expl ,lng ,duration ,stud_clss ,roll_num ,state):
-        
-        self.cache[access]['track'].append({'lng' : lng ,'expl': expl ,"duration" : int(duration)})
+    def track(self ,session ,expl ,lng ,duration ,stud_clss ,roll_num ,state):
+        targ_embed = session['targ_embed']
+        if targ_embed is None :
+            ##printing the target 
+            print("Target :" ,session['target'] ,"\n\n")
+            targ_embed = self.embedder.encode([session['target']])[0]
+            explanation_store.set_embedding(session['access'] ,targ_embed)
+
+        track = explanation_store.add_turn(session['access'] ,lng = lng ,expl = expl ,duration = int(duration))
         
         ##combining all the explanation peices made till now 
-        track_list = [dict1['expl'] for dict1 in self.cache[access]['track']]
-        combined_exp = self.__combine(track_list = track_list ,target = self.cache[access]['target'] )
+        track_list = [dict1['expl'] for dict1 in track]
+        combined_exp = self.__combine(track_list = track_list ,target = session['target'] )
         
         ####
         print( f"Explanation provide at({len(track_list)}) : " ,combined_exp)
 
+        expl_vec = self.embedder.encode([combined_exp])[0]
+        return self.__score(session['access'] ,targ_embed ,track ,expl_vec ,stud_clss ,roll_num ,state)
+
+    async def atrack(self ,session ,expl ,lng ,duration ,stud_clss ,roll_num ,state):
+        targ_embed = session['targ_embed']
+        if targ_embed is None :
+            targ_embed = (await self.embedder.aencode([session['target']]))[0]
+            await asyncio.to_thread(explanation_store.set_embedding ,session['access'] ,targ_embed)
+
+        track = await asyncio.to_thread(explanation_store.add_turn ,session['access'] ,lng = lng ,expl = expl ,duration = int(duration))
+
+        track_list = [dict1['expl'] for dict1 in track]
+        combined_exp = await self.__acombine(track_list = track_list ,target = session['target'] )
+
+        expl_vec = (await self.embedder.aencode([combined_exp]))[0]
+        return await asyncio.to_thread(self.__score ,session['access'] ,targ_embed ,track ,expl_vec ,stud_clss ,roll_num ,state)
+
+    def __score(self ,access ,targ_embed ,track ,expl_vec ,stud_clss ,roll_num ,state):
         ##computing the similarity
-        sim = self.__similarity( target_vec = self.cache[access]['targ_embed'] ,explantion = combined_exp)
+        sim = self.__similarity( target_vec = targ_embed ,expl_vec = expl_vec)
         sim = sim * self.total_scr
         
         ##seting the score value 
-        self.cache[access]['score'] = max(self.cache[access]['score'] ,sim)
+        score = explanation_store.raise_score(access ,sim)
         
-        if self.cache[access]['score'] >= self.min_win_scr :
+        ##only the submit that ends the session awards the points
+        if score >= self.min_win_scr and explanation_store.close(access) :
             ##computing a new score
-            extra_pnts = self.__compute_scr(sim ,access)
+            extra_pnts = self.__compute_scr(sim ,track)
             
             ##adding the new points in the db 
-            session = Session()
-            pnt_obj = session.query(StudentScore).filter(
-                StudentScore.roll_num == roll_num,
-                StudentScore.state == state,
-                StudentScore.student_class == stud_clss
-            ).first()
-            pnt_obj.score += extra_pnts
-            session.commit()
-            session.close()
-
-            return self.cache[access]['score'] ,True ,extra_pnts
+            score_store.add(
+                student_class = int(stud_clss),
+                roll_num = roll_num,
+                state = state,
+                delta = extra_pnts
+            )
+
+            return score ,True ,extra_pnts
         
-        return self.cache[access]['score'] ,False ,0   
+        return score ,False ,0   
     
-    def __compute_scr(self ,score ,access):
+    def __compute_scr(self ,score ,track):
         eng_time ,native_time = 0 ,0
 
-        for dict1 in self.cache[access]['track']:
+        for dict1 in track:
             if dict1['lng'] == 'en' : 
                 eng_time += dict1['duration']
             else:
@@ -108,9 +123,7 @@ class ExplanTrack :
         pnts += self.lng_scr * 2 * eng_time  ##2x score for speaking in english 
         return int(pnts) 
 
-    def __similarity(self ,explantion ,target_vec ,depr = 2):
-        expl_vec = self.embedder.encode([explantion])[0]
-        
+    def __similarity(self ,expl_vec ,target_vec ,depr = 2):
         dot_product = np.dot(expl_vec, target_vec)
         norm_vec1 = np.linalg.norm(expl_vec)
         norm_vec2 = np.linalg.norm(target_vec)
@@ -127,13 +140,26 @@ class ExplanTrack :
             target_expl = target
         )
         
-        resp_unstruct = self.client.models.generate_content(
+        resp_unstruct = llm_gateway.generate(
             model=self.model,
             contents = form_prmpt,
-        ).text 
+            caller = "ExplanTrack.combine"
+        ) 
 
         return resp_unstruct
 
+    async def __acombine(self ,track_list ,target):
+        form_prmpt = combiner_prompt.format(
+            expl_list = track_list ,
+            target_expl = target
+        )
+
+        return await llm_gateway.agenerate(
+            model=self.model,
+            contents = form_prmpt,
+            caller = "ExplanTrack.combine"
+        )
+
     
     def __extract_dict(self ,response):
         try:
@@ -1,9 +1,6 @@
-from dotenv import load_dotenv
-from google import genai
+from llm_gateway import llm_gateway
+from settings import settings
 import json
-import os
-
-load_dotenv(override=True) # Looks for a .env file by default
 
 
 deep_analysis_prompt = """###Instruction: Analyze the performance of a {age} year old student in the current assessment in comparison to their previous assessment. Provide detailed, warm, and personalized feedback that:
@@ -62,8 +59,7 @@ Make sure that you provide your response in the given ###TargetLanguage.
 
 class FeedBackGenerator : 
     def __init__(self):
-        self.model = os.getenv("LANGUAGE_MODEL_ID")
-        self.client = genai.Client(api_key = os.getenv("GOOGLE_API_KEY"))
+        self.model = settings.get("LANGUAGE_MODEL_ID")
     
     def generate(self ,lang ,age ,current_assessment ,previous_assessment ,state):
         
@@ -75,10 +71,12 @@ class FeedBackGenerator :
             prev_assess = previous_assessment ,
         )
 
-        response = self.client.models.generate_content(
+        response = llm_gateway.generate(
             model=self.model,
             contents = formated_prompt,
-        ).text    
+            caller = "FeedBackGenerator.analysis",
+            cache_ttl = 24 * 3600
+        )    
         
         response = self.__extract_dict(response)
         
@@ -88,10 +86,12 @@ class FeedBackGenerator :
             lang = lang
         )
         
-        response["summary"] =  self.client.models.generate_content(
+        response["summary"] =  llm_gateway.generate(
             model=self.model,
             contents = formated_prompt,
-        ).text
+            caller = "FeedBackGenerator.summary",
+            cache_ttl = 24 * 3600
+        )
 
         return response
       
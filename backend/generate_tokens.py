@@ -1,13 +1,11 @@
-from dotenv import load_dotenv
+from settings import settings
 import datetime
 import jwt
-import os
 
-load_dotenv(override=True)  # Load the .env file
 
 # Your secret key
-SECRET_KEY = os.getenv("ENCRYPT_KEY")
-EXP_DAYS = int(os.getenv("ENCRYPT_KEY_EXP", 1))  # Default to 1 day if not set
+SECRET_KEY = settings.get("ENCRYPT_KEY")
+EXP_DAYS = int(settings.get("ENCRYPT_KEY_EXP", 1))  # Default to 1 day if not set
 
 role_list = ["admin", "teacher", "student", "all"]
 
@@ -19,7 +17,7 @@ for role in role_list:
         "role": role,
         "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=EXP_DAYS)
     }
-    token = jwt.encode(payload, SECRET_KEY, algorithm=os.getenv("ENCRYPT_ALGO"))
+    token = jwt.encode(payload, SECRET_KEY, algorithm=settings.get("ENCRYPT_ALGO"))
     tokens[role] = token
     print(f"{role} token:\n{token}\n")
 
@@ -0,0 +1,91 @@
+from settings import settings
+import threading
+import os
+
+
+class GoogleClients :
+    """google clients of the process ,each one is built on first use and then shared by every thread
+
+    nothing here runs while the app is imported :- the sdk imports ,vertexai.init ,the model lookups and the
+    credential loading wait for the first request (or job) that needs them ,so a worker is ready as soon as flask is.
+    with preload_app the clients are also built after the fork ,in the worker that uses them.
+    """
+
+    def __init__(self):
+        self.__built = { }
+        self.__lock = threading.RLock() ##a client may build the ones it depends on (vertex) inside the lock
+
+    ##vertexai.init once per process ,before the first vertex model is loaded
+    def vertex(self):
+        return self.__get("vertex" ,self.__init_vertex)
+
+    ##gemini ,shared by llm_gateway
+    def genai(self):
+        return self.__get("genai" ,self.__genai)
+
+    def translate(self):
+        return self.__get("translate" ,self.__translate)
+
+    ##bucket of the generated images ,default credentials
+    def bucket(self):
+        return self.__get("bucket" ,self.__bucket)
+
+    ##same bucket with the service account of CRED_JSON_PATH ,it can sign urls
+    def signing_bucket(self):
+        return self.__get("signing_bucket" ,self.__signing_bucket)
+
+    def image_model(self):
+        return self.__get("image_model" ,self.__image_model)
+
+    def embedding_model(self ,model_id):
+        return self.__get(f"embedding_model:{model_id}" ,lambda : self.__embedding_model(model_id))
+
+    ##names of the clients built so far ,reported by /health
+    def built(self):
+        return sorted(self.__built.keys())
+
+    def __get(self ,name ,factory):
+        client = self.__built.get(name)
+        if client is None :
+            with self.__lock :
+                client = self.__built.get(name)
+                if client is None :
+                    client = factory()
+                    self.__built[name] = client
+        return client
+
+    def __init_vertex(self):
+        import vertexai
+        vertexai.init(project = settings.get("GOOGLE_CLOUD_PROJECT_ID") ,location = settings.get("GOOGLE_CLOUD_REGION"))
+        return True
+
+    def __genai(self):
+        from google import genai
+        return genai.Client(api_key = settings.get("GOOGLE_API_KEY"))
+
+    def __translate(self):
+        from google.cloud import translate_v2 as translate
+        return translate.Client()
+
+    def __bucket(self):
+        from google.cloud import storage
+        return storage.Client().bucket(settings.get("BUCKET_NAME"))
+
+    def __signing_bucket(self):
+        from google.oauth2 import service_account
+        from google.cloud import storage
+        credentials = service_account.Credentials.from_service_account_file(os.path.abspath(settings.get("CRED_JSON_PATH")))
+        return storage.Client(credentials = credentials).bucket(settings.get("BUCKET_NAME"))
+
+    def __image_model(self):
+        self.vertex()
+        from vertexai.preview.vision_models import ImageGenerationModel
+        return ImageGenerationModel.from_pretrained(settings.get("IMAGE_GENERATOR_ID"))
+
+    def __embedding_model(self ,model_id):
+        self.vertex()
+        from vertexai.language_models import TextEmbeddingModel
+        return TextEmbeddingModel.from_pretrained(model_id)
+
+
+google_clients = GoogleClients()
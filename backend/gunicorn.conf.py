@@ -0,0 +1,43 @@
+"""gunicorn settings for production ,run from the backend folder :- gunicorn -c gunicorn.conf.py
+
+requests spend most of their time waiting on vertex ,gemini ,imagen and the db. by default every worker process
+runs asgi:app on an event loop (uvicorn worker) ,the model bound student routes are coroutines and the rest of the
+flask app runs on WEB_THREADS threads inside it. WEB_APP=main:app serves flask alone on gthread workers instead.
+the app is imported once in the master (preload) and forked ,each worker then resets its db pool and starts its
+own background threads in post_fork. see README.md for the whole concurrency model.
+"""
+import os
+
+##grpc clients (vertex ,translate ,storage) are built after the fork (google_clients) ,fork support stays on in case
+##one is built in the master
+os.environ.setdefault("GRPC_ENABLE_FORK_SUPPORT" ,"true")
+os.environ.setdefault("GRPC_POLL_STRATEGY" ,"poll")
+
+bind = f"0.0.0.0:{os.getenv('PORT' ,5000)}"
+wsgi_app = os.getenv("WEB_APP" ,"asgi:app")
+worker_class = "gthread" if wsgi_app == "main:app" else "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_WORKERS" ,2))
+threads = int(os.getenv("WEB_THREADS" ,8)) ##gthread request threads ,or the flask threads of asgi:app
+
+##a worker silent for this long is restarted ,mcq generation runs as a background job (job_queue) so no request comes close
+timeout = int(os.getenv("WEB_TIMEOUT" ,600))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT" ,60))
+keepalive = 5
+
+##workers are recycled after a while so slow leaks never pile up ,jitter keeps them from restarting together
+max_requests = int(os.getenv("WEB_MAX_REQUESTS" ,2000))
+max_requests_jitter = int(os.getenv("WEB_MAX_REQUESTS_JITTER" ,200))
+
+preload_app = os.getenv("WEB_PRELOAD" ,"1") == "1"
+
+accesslog = "-"
+errorlog = "-"
+
+
+def post_fork(server ,worker):
+    ##pooled connections of the master must not be shared with the children
+    from db_engine import Engine
+    Engine.dispose(close = False)
+
+    import main
+    main.start_background()
@@ -1,31 +1,23 @@
-from vertexai.preview.vision_models import ImageGenerationModel
 from PIL import ImageOps as PIL_ImageOps
 from PIL import Image as PIL_Image
-import vertexai
+from google_clients import google_clients
+from settings import settings
 import typing
 import io
-from dotenv import load_dotenv
-from google.cloud import storage
-import os  
 import time 
 import random
-
-load_dotenv(override = True)
-
-vertexai.init(project = os.getenv("GOOGLE_CLOUD_PROJECT_ID"), location = os.getenv("GOOGLE_CLOUD_REGION"))
+import asyncio
 
 class ImageGenerator :
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(os.getenv("BUCKET_NAME"))
+    ##the imagen model and the bucket are loaded on the first generation ,see google_clients
 
     def __init__(self):
-        self.model = ImageGenerationModel.from_pretrained(os.getenv("IMAGE_GENERATOR_ID"))
         self.num_images = 1
         self.aspect_ratio = "1:1" 
         self.negative_prompt = "text, words, letters, numbers, sentences, writing, signature, watermark, logo, labels, typography, blurry"
     
     def generate(self ,prompt ,common_id):
-        images = self.model.generate_images(
+        images = google_clients.image_model().generate_images(
             prompt=prompt ,number_of_images = self.num_images,
             aspect_ratio = self.aspect_ratio ,negative_prompt = self.negative_prompt,
             person_generation="" ,safety_filter_level="",
@@ -33,7 +25,7 @@ class ImageGenerator :
         ).images
         
         ##generating file path for each generated image 
-        generated_img_dir = os.getenv("GENERATED_IMG_DIR")
+        generated_img_dir = settings.get("GENERATED_IMG_DIR")
         blob_name_list = [f"{generated_img_dir}/{common_id}_{random.randint(0,99999)}_{int(time.time())}_{i}.jpg" for i in range(len(images))]
        
         ##finding which generated image most suits the prompt  
@@ -53,6 +45,10 @@ class ImageGenerator :
 
         return None  
 
+    ##imagen and gcs have no asyncio clients ,the whole generation waits in a worker thread
+    async def agenerate(self ,prompt ,common_id):
+        return await asyncio.to_thread(self.generate ,prompt = prompt ,common_id = common_id)
+
 
     ##purpose is to save the image  
     def __store(self ,image ,blob_name ,max_width: int = 1024 ,max_height: int = 1024) -> bytes:
@@ -71,7 +67,7 @@ class ImageGenerator :
         img_byte_arr.seek(0)
 
         # Upload to Google Cloud Storage
-        blob = self.bucket.blob(blob_name)
+        blob = google_clients.bucket().blob(blob_name)
         blob.upload_from_file(img_byte_arr, content_type="image/jpeg")
         
         ##waiting untill image uploaded 
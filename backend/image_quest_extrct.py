@@ -1,9 +1,7 @@
-from dotenv import load_dotenv
-from google import genai
+from llm_gateway import llm_gateway
+from settings import settings
 import json
-import os
 
-load_dotenv(override=True)
 
 image_q_extrct_prmpt = """### Instruction: Fetch the questions alone from the given image. Do not modify, add, or remove anything from the original content—just extract the questions from the image.
 
@@ -16,20 +14,32 @@ If a question contains options, a hint, or any other information related to the
 ]"""  
 
 class ExtractQuestion :
-    llm_model = os.getenv("LANGUAGE_MODEL_ID")
-    client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+    llm_model = settings.get("LANGUAGE_MODEL_ID")
     
     def extract(self ,path):
         """Uses an LLM to extract questions from the image."""
-        client_file = self.client.files.upload(file=path) 
+        client_file = llm_gateway.upload(file=path ,caller="ExtractQuestion") 
         content = [client_file, image_q_extrct_prmpt]
         
-        response = self.client.models.generate_content(
+        response = llm_gateway.generate(
             model=self.llm_model,
             contents=content,
-        ).text
+            caller="ExtractQuestion.extract"
+        )
         
         return self.extract_list(response)
+
+    async def aextract(self ,path):
+        client_file = await llm_gateway.aupload(file=path ,caller="ExtractQuestion")
+        content = [client_file, image_q_extrct_prmpt]
+
+        response = await llm_gateway.agenerate(
+            model=self.llm_model,
+            contents=content,
+            caller="ExtractQuestion.extract"
+        )
+
+        return self.extract_list(response)
     
     def extract_list(self ,response):
         try:
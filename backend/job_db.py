@@ -0,0 +1,38 @@
+from sqlalchemy import Column ,Integer ,String ,Text ,DateTime ,Index
+from sqlalchemy.orm import declarative_base
+from db_engine import Engine
+
+Base = declarative_base()
+
+##long running admin work (mcq generation ,...) ,the table is the queue shared by every worker process
+class Job(Base):
+    __tablename__ = "Job"
+    __table_args__ = (
+        Index("ix_job_queue" ,"status" ,"created"),
+        Index("uq_job_key" ,"kind" ,"key" ,unique=True), ##a content hash is queued once ,released keys are NULL
+    )
+
+    id = Column(String(32) ,primary_key=True) ##uuid4 hex
+    kind = Column(String(64))
+    key = Column(String(191)) ##access key of an mcq generation ,content hash of an ingested file
+    status = Column(String(16)) ##queued | running | done | failed
+    stage = Column(String(64))
+    progress = Column(Text) ##json ,{stage : {"status" : "running" | "done" | "failed" ,"items" : {}}}
+    payload = Column(Text(4294967295)) ##longtext in mysql ,carries the uploaded pdf
+    result = Column(Text(4294967295))
+    error = Column(Text)
+    attempts = Column(Integer ,default=0)
+    worker = Column(String(128)) ##host:pid of the process running it
+    created = Column(DateTime)
+    started = Column(DateTime)
+    updated = Column(DateTime) ##heartbeat ,touched on every progress update
+    finished = Column(DateTime)
+
+if __name__ == "__main__" :
+    inp = input( "start_creating_tables(y/n) : ")
+    if inp == "y" :
+        try:
+            Base.metadata.create_all(Engine)
+            print( "Tables created succesfully")
+        except Exception as e:
+            print(f"db_creation : error occurred: {e}")
@@ -0,0 +1,261 @@
+from job_db import Job
+from sqlalchemy import select ,update ,insert ,func ,or_ ,and_
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime ,timedelta
+from db_engine import Engine
+from settings import settings
+import threading
+import socket
+import uuid
+import json
+import os
+
+
+class JobProgress :
+    """per stage progress of one running job ,every change is written to the job row and doubles as its heartbeat"""
+
+    def __init__(self ,job_id):
+        self.job_id = job_id
+        self.current = None
+        self.stages = { }
+        self.__lock = threading.Lock()
+
+    ##moves the job to the next stage ,the previous one is marked done
+    def stage(self ,name):
+        with self.__lock :
+            if self.current is not None :
+                self.stages[self.current]["status"] = "done"
+            self.current = name
+            self.stages[name] = {"status" : "running" ,"items" : { }}
+            self.__save()
+
+    ##progress of one item inside a stage ,e.g. every state of the regional stage
+    def item(self ,name ,key ,value):
+        with self.__lock :
+            self.stages.setdefault(name ,{"status" : "running" ,"items" : { }})["items"][key] = value
+            self.__save()
+
+    ##json of the final progress ,the current stage ends with status
+    def close(self ,status):
+        with self.__lock :
+            if self.current is not None :
+                self.stages[self.current]["status"] = status
+            return json.dumps(self.stages)
+
+    def __save(self):
+        with Engine.begin() as conn :
+            conn.execute(update(Job).where(Job.id == self.job_id).values(
+                stage = self.current,
+                progress = json.dumps(self.stages),
+                updated = datetime.now()
+            ))
+
+
+class JobQueue :
+    """database backed job queue ,the Job table is the queue so any worker process can run or report any job
+
+    handler(payload ,progress) is registered per kind and returns a json serialisable dict :- result["response"]
+    is what the clients get from get() ,result["access"] when present is kept as the job key so the result can be
+    looked up by it (see McqGenerationCache) ,anything else stays on the server.
+
+    every process runs JOB_WORKERS threads claiming queued jobs with an atomic update. a running job whose worker sent
+    no heartbeat for JOB_STALE_AFTER seconds (worker restarted or killed) is queued again ,up to JOB_MAX_ATTEMPTS runs.
+    """
+
+    def __init__(self ,workers = None ,poll_interval = None):
+        self.workers = workers or int(settings.get("JOB_WORKERS" ,2))
+        self.poll_interval = poll_interval or float(settings.get("JOB_POLL_INTERVAL" ,2))
+        self.stale_after = float(settings.get("JOB_STALE_AFTER" ,1800))
+        self.max_attempts = int(settings.get("JOB_MAX_ATTEMPTS" ,2))
+        self.handlers = { }
+        self.__threads = [ ]
+        self.__wake = threading.Event()
+        self.__counts = {"submitted" : 0 ,"done" : 0 ,"failed" : 0 ,"requeued" : 0}
+        self.__lock = threading.Lock()
+
+    def register(self ,kind ,handler):
+        self.handlers[kind] = handler
+
+    ##returns the job id at once ,the job runs on whichever worker claims it first
+    ##with a key the job is idempotent :- while a job of the same kind and key is queued ,running or done its id is
+    ##returned instead ,a failed job gives its key up so the work can be submitted again
+    def submit(self ,kind ,payload ,key = None):
+        if key is not None :
+            existing = self.__by_key(kind ,key)
+            if existing is not None :
+                return existing
+
+        job_id = uuid.uuid4().hex
+        try :
+            with Engine.begin() as conn :
+                conn.execute(insert(Job).values(
+                    id = job_id,
+                    kind = kind,
+                    key = key,
+                    status = "queued",
+                    progress = "{}",
+                    payload = json.dumps(payload),
+                    attempts = 0,
+                    created = datetime.now()
+                ))
+        except IntegrityError :
+            existing = self.__by_key(kind ,key) if key is not None else None ##submitted by someone else meanwhile
+            if existing is None :
+                raise
+            return existing
+
+        with self.__lock :
+            self.__counts["submitted"] += 1
+        self.start() ##started on first use ,so every forked worker runs its own
+        self.__wake.set()
+        return job_id
+
+    ##status ,progress and response of a job ,None when it does not exist
+    def get(self ,job_id):
+        with Engine.connect() as conn :
+            row = conn.execute(select(
+                Job.id ,Job.kind ,Job.status ,Job.stage ,Job.progress ,Job.result ,Job.error ,Job.attempts,
+                Job.created ,Job.started ,Job.finished
+            ).where(Job.id == job_id)).first()
+
+        if row is None :
+            return None
+
+        return {
+            "job_id" : row.id,
+            "kind" : row.kind,
+            "status" : row.status,
+            "stage" : row.stage,
+            "progress" : json.loads(row.progress or "{}"),
+            "result" : json.loads(row.result).get("response") if row.result else None,
+            "error" : row.error,
+            "attempts" : row.attempts,
+            "created" : self.__time(row.created),
+            "started" : self.__time(row.started),
+            "finished" : self.__time(row.finished)
+        }
+
+    ##whole result of a finished job by its key ,max_age in seconds since it finished
+    def result(self ,kind ,key ,max_age = None):
+        query = select(Job.result).where(Job.kind == kind ,Job.key == key ,Job.status == "done")
+        if max_age is not None :
+            query = query.where(Job.finished >= datetime.now() - timedelta(seconds = max_age))
+
+        with Engine.connect() as conn :
+            result = conn.execute(query.order_by(Job.finished.desc())).scalar()
+        return json.loads(result) if result else None
+
+    ##the key stops pointing at the result ,once it is used up. True only for the one caller that released it ,so it
+    ##doubles as a claim :- pass conn to release inside the caller's transaction ,a rollback then restores the key
+    def release(self ,kind ,key ,conn = None):
+        if conn is None :
+            with Engine.begin() as conn :
+                return self.release(kind ,key ,conn = conn)
+        return conn.execute(update(Job).where(Job.kind == kind ,Job.key == key).values(key = None)).rowcount == 1
+
+    def start(self):
+        with self.__lock :
+            self.__threads = [thread for thread in self.__threads if thread.is_alive()]
+            for i in range(len(self.__threads) ,self.workers):
+                thread = threading.Thread(target = self.__loop ,daemon = True ,name = f"job-worker-{i}")
+                thread.start()
+                self.__threads.append(thread)
+
+    def stats(self):
+        with self.__lock :
+            report = dict(self.__counts)
+            report["workers"] = len([thread for thread in self.__threads if thread.is_alive()])
+
+        with Engine.connect() as conn :
+            rows = conn.execute(select(Job.status ,func.count(Job.id)).group_by(Job.status)).all()
+        report["jobs"] = {status : count for status ,count in rows}
+        return report
+
+    def __loop(self):
+        while True :
+            try :
+                job = self.__claim()
+            except Exception as e:
+                print("ERROR : JobQueue.claim :-" ,e)
+                job = None
+
+            if job is None :
+                self.__wake.wait(self.poll_interval)
+                self.__wake.clear()
+                continue
+
+            self.__run(*job)
+
+    ##oldest runnable job of a kind this process can run ,the conditional update lets exactly one worker win it
+    def __claim(self):
+        if len(self.handlers) == 0 :
+            return None
+
+        now = datetime.now()
+        stale = now - timedelta(seconds = self.stale_after)
+        runnable = or_(Job.status == "queued" ,and_(Job.status == "running" ,Job.updated < stale))
+
+        with Engine.connect() as conn :
+            candidates = conn.execute(
+                select(Job.id ,Job.status).where(Job.kind.in_(list(self.handlers.keys())) ,runnable).order_by(Job.created).limit(self.workers)
+            ).all()
+
+        for job_id ,status in candidates :
+            with Engine.begin() as conn :
+                claimed = conn.execute(update(Job).where(Job.id == job_id ,runnable).values(
+                    status = "running",
+                    worker = f"{socket.gethostname()}:{os.getpid()}",
+                    attempts = Job.attempts + 1,
+                    started = now,
+                    updated = now
+                )).rowcount
+                if claimed == 1 :
+                    row = conn.execute(select(Job.kind ,Job.payload ,Job.attempts).where(Job.id == job_id)).first()
+
+            if claimed == 1 :
+                if status == "running" :
+                    with self.__lock :
+                        self.__counts["requeued"] += 1
+                return job_id ,row.kind ,row.payload ,row.attempts
+        return None
+
+    def __run(self ,job_id ,kind ,payload ,attempts):
+        progress = JobProgress(job_id)
+        try :
+            if attempts > self.max_attempts :
+                raise RuntimeError(f"gave up after {self.max_attempts} attempts ,the worker running it stopped")
+
+            result = self.handlers[kind](json.loads(payload) ,progress)
+            values = {
+                "status" : "done",
+                "result" : json.dumps(result),
+                "progress" : progress.close("done")
+            }
+            if "access" in result :
+                values["key"] = result["access"]
+        except Exception as e:
+            print(f"ERROR : JobQueue.{kind} :-" ,e)
+            values = {
+                "status" : "failed",
+                "key" : None,
+                "error" : str(e),
+                "progress" : progress.close("failed")
+            }
+
+        values["stage"] = progress.current
+        values["finished"] = values["updated"] = datetime.now()
+        with Engine.begin() as conn :
+            conn.execute(update(Job).where(Job.id == job_id).values(**values))
+
+        with self.__lock :
+            self.__counts[values["status"]] += 1
+
+    def __by_key(self ,kind ,key):
+        with Engine.connect() as conn :
+            return conn.execute(select(Job.id).where(Job.kind == kind ,Job.key == key)).scalar()
+
+    def __time(self ,value):
+        return value.isoformat() if value is not None else None
+
+
+job_queue = JobQueue()
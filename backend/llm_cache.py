@@ -0,0 +1,134 @@
+from cache_db import LlmResponseCache
+from memory_cache import LruCache
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime ,timedelta
+from db_engine import Engine
+from settings import settings
+import threading
+import hashlib
+import time
+
+Session = sessionmaker(bind = Engine)
+
+
+class LlmCache :
+    """two tier cache for llm responses ,an in-memory lru in front of the LlmResponseCache table
+
+    entries are keyed by a hash of the model id ,the prompt text and the content hash of every attachment ,so the
+    same generation asked from any worker is served without calling the model again.
+    """
+
+    def __init__(self ,max_entries = None):
+        self.memory = LruCache(max_entries = max_entries or int(settings.get("LLM_CACHE_SIZE" ,512)))
+        self.__counts = {"memory_hits" : 0 ,"db_hits" : 0 ,"misses" : 0 ,"uncacheable" : 0}
+        ##uploaded file name -> sha256 of the local file content ,gemini deletes uploads after 48 hours
+        self.__file_hashes = LruCache(max_entries = int(settings.get("LLM_FILE_HASHES" ,1024)))
+        self.__lock = threading.Lock()
+
+    ##remembering content hash of an uploaded attachment so prompts referring to it can be keyed
+    def register_file(self ,uploaded ,path):
+        sha = hashlib.sha256()
+        with open(path ,"rb") as f :
+            for block in iter(lambda : f.read(1 << 20) ,b""):
+                sha.update(block)
+
+        self.__file_hashes.put(uploaded.name ,sha.hexdigest() ,expires = time.time() + 48 * 3600)
+
+    ##returns None when the contents can not be addressed (eg. an attachment that was not registered)
+    def key(self ,model ,contents):
+        if not isinstance(contents ,list):
+            contents = [contents]
+
+        sha = hashlib.sha256(f"model:{model}".encode("utf-8"))
+        for part in contents :
+            if isinstance(part ,str):
+                sha.update(b"\x00text:" + part.encode("utf-8"))
+            else:
+                file_hash = self.__file_hashes.get(part.name) if isinstance(getattr(part ,"name" ,None) ,str) else None
+                if file_hash is None :
+                    self.__count("uncacheable")
+                    return None
+                sha.update(b"\x00file:" + file_hash.encode("utf-8"))
+
+        return sha.hexdigest()
+
+    def get(self ,key):
+        response = self.memory.get(key)
+        if response is not None :
+            self.__count("memory_hits")
+            return response
+
+        session = Session()
+        try :
+            obj = session.query(LlmResponseCache).filter(LlmResponseCache.key == key).first()
+        except Exception as e:
+            print("ERROR : LlmCache.get :-" ,e)
+            obj = None
+        finally:
+            session.close()
+
+        if obj is None or (obj.expires is not None and obj.expires < datetime.now()):
+            self.__count("misses")
+            return None
+
+        self.__count("db_hits")
+        self.memory.put(key ,obj.response ,expires = self.__to_unix(obj.expires))
+        return obj.response
+
+    def put(self ,key ,model ,response ,ttl ,caller = None):
+        expires = datetime.now() + timedelta(seconds = ttl)
+        self.memory.put(key ,response ,expires = self.__to_unix(expires))
+
+        session = Session()
+        try :
+            obj = session.query(LlmResponseCache).filter(LlmResponseCache.key == key).first()
+            if obj is None :
+                session.add(
+                    LlmResponseCache(
+                        key = key,
+                        model = model,
+                        caller = caller,
+                        response = response,
+                        created = datetime.now(),
+                        expires = expires
+                    )
+                )
+            else:
+                obj.response = response
+                obj.expires = expires
+            session.commit()
+        except IntegrityError :
+            session.rollback() ##another worker stored the same key first
+        except Exception as e:
+            print("ERROR : LlmCache.put :-" ,e)
+        finally:
+            session.close()
+
+    def purge_expired(self):
+        session = Session()
+        count = session.query(LlmResponseCache).filter(LlmResponseCache.expires < datetime.now()).delete()
+        session.commit()
+        session.close()
+        return count
+
+    def stats(self):
+        with self.__lock :
+            report = dict(self.__counts)
+        lookups = report["memory_hits"] + report["db_hits"] + report["misses"]
+        report["hit_ratio"] = round((report["memory_hits"] + report["db_hits"]) / lookups ,3) if lookups else 0.0
+        report["memory_entries"] = len(self.memory)
+        return report
+
+    def __count(self ,name):
+        with self.__lock :
+            self.__counts[name] += 1
+
+    def __to_unix(self ,dt):
+        return time.mktime(dt.timetuple()) if dt is not None else None
+
+
+if __name__ == "__main__" :
+    inp = input( "purge_expired_llm_cache(y/n) : ")
+    if inp == "y" :
+        print( "removed entries :" ,LlmCache().purge_expired())
@@ -0,0 +1,148 @@
+from google_clients import google_clients
+from settings import settings
+from llm_cache import LlmCache
+import threading
+import asyncio
+import weakref
+import time
+
+
+class LlmGateway :
+    """process wide access point for gemini ,every generator in the backend calls through this object
+
+    one genai.Client is shared by all the callers so the underlying http connection pool is reused instead of
+    every class opening its own TLS session. number of in-flight calls is capped by LLM_MAX_CONCURRENCY and
+    latency is recorded per caller name. callers passing cache_ttl (seconds) are served from the response cache
+    when the same model ,prompt and attachments were generated before.
+    """
+
+    def __init__(self ,max_concurrency = None):
+        self.model = settings.get("LANGUAGE_MODEL_ID")
+        self.max_concurrency = max_concurrency or int(settings.get("LLM_MAX_CONCURRENCY" ,8))
+        self.cache = LlmCache()
+
+        self.__slots = threading.BoundedSemaphore(self.max_concurrency) ##cap for the thread based callers
+        self.__async_slots = weakref.WeakKeyDictionary() ##one asyncio semaphore per running event loop
+        self.__stats = { }
+        self.__lock = threading.Lock()
+
+    ##genai client ,created on the first call
+    @property
+    def client(self):
+        return google_clients.genai()
+
+    ##blocking entry point
+    def generate(self ,contents ,model = None ,caller = "unknown" ,cache_ttl = None):
+        model = model or self.model
+        key = self.cache.key(model = model ,contents = contents) if cache_ttl else None
+        if key is not None :
+            response = self.cache.get(key)
+            if response is not None :
+                return response
+
+        start = time.perf_counter()
+        is_ok = False
+
+        with self.__slots :
+            try :
+                response = self.client.models.generate_content(
+                    model = model,
+                    contents = contents,
+                ).text
+                is_ok = True
+            finally:
+                self.__record(caller = caller ,duration = time.perf_counter() - start ,is_ok = is_ok)
+
+        if key is not None and response :
+            self.cache.put(key ,model = model ,response = response ,ttl = cache_ttl ,caller = caller)
+        return response
+
+    ##asyncio entry point
+    async def agenerate(self ,contents ,model = None ,caller = "unknown" ,cache_ttl = None):
+        model = model or self.model
+        key = self.cache.key(model = model ,contents = contents) if cache_ttl else None
+        if key is not None :
+            response = await asyncio.to_thread(self.cache.get ,key)
+            if response is not None :
+                return response
+
+        start = time.perf_counter()
+        is_ok = False
+
+        async with self.__async_slot() :
+            try :
+                response = (await self.client.aio.models.generate_content(
+                    model = model,
+                    contents = contents,
+                )).text
+                is_ok = True
+            finally:
+                self.__record(caller = caller ,duration = time.perf_counter() - start ,is_ok = is_ok)
+
+        if key is not None and response :
+            await asyncio.to_thread(self.cache.put ,key ,model = model ,response = response ,ttl = cache_ttl ,caller = caller)
+        return response
+
+    def upload(self ,file ,caller = "unknown"):
+        start = time.perf_counter()
+        is_ok = False
+
+        with self.__slots :
+            try :
+                uploaded = self.client.files.upload(file = file)
+                is_ok = True
+            finally:
+                self.__record(caller = f"{caller}.upload" ,duration = time.perf_counter() - start ,is_ok = is_ok)
+
+        self.cache.register_file(uploaded ,path = file)
+
+        return uploaded
+
+    async def aupload(self ,file ,caller = "unknown"):
+        start = time.perf_counter()
+        is_ok = False
+
+        async with self.__async_slot() :
+            try :
+                uploaded = await self.client.aio.files.upload(file = file)
+                is_ok = True
+            finally:
+                self.__record(caller = f"{caller}.upload" ,duration = time.perf_counter() - start ,is_ok = is_ok)
+
+        await asyncio.to_thread(self.cache.register_file ,uploaded ,path = file)
+
+        return uploaded
+
+    ##per caller latency report
+    def stats(self):
+        with self.__lock :
+            report = { }
+            for caller ,dict1 in self.__stats.items():
+                report[caller] = {
+                    "calls" : dict1["calls"],
+                    "errors" : dict1["errors"],
+                    "avg_latency" : round(dict1["total"] / dict1["calls"] ,3),
+                    "max_latency" : round(dict1["max"] ,3)
+                }
+            return report
+
+    def __async_slot(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self.__async_slots :
+            self.__async_slots[loop] = asyncio.Semaphore(self.max_concurrency)
+        return self.__async_slots[loop]
+
+    def __record(self ,caller ,duration ,is_ok):
+        with self.__lock :
+            if caller not in self.__stats :
+                self.__stats[caller] = {"calls" : 0 ,"errors" : 0 ,"total" : 0.0 ,"max" : 0.0}
+
+            dict1 = self.__stats[caller]
+            dict1["calls"] += 1
+            dict1["total"] += duration
+            dict1["max"] = max(dict1["max"] ,duration)
+            if not is_ok :
+                dict1["errors"] += 1
+
+
+llm_gateway = LlmGateway()
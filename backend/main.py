@@ -1,24 +1,30 @@
-from mcq_generation_cache import McqGenerationCache
+from mcq_generation_cache import McqGenerationCache ,MCQ_GENERATION_JOB
 from base_mcq_generater import BaseMcqGenerator
-from regional.interface import RegionalInterface
+from regional.pipeline import RegionalPipeline
+from regional.profile_store import regional_profile_store
 from subtopics_generate import SubtopicGenerator
 from assesment_handler import AssignmentHandler
-from google.cloud import translate_v2 as translate
 from flask import Flask, request, jsonify
-from sqlalchemy.orm import sessionmaker
-from user_engagement_db import StudentScore
 from solution_generator import SoltuionGenerator
 from subtopic_explainer import SubtpcExplGen
 from explanation_track import ExplanTrack
+from explanation_store import explanation_store
 from regional.interface import state_language
-from dotenv import load_dotenv
-from db_engine import Engine
 from doubt_solver import DoubtSolver
 from image_quest_extrct import ExtractQuestion
-from numeric_prob_extracter import NumericProbExtractor
-from semantic_search import SimNumericProblem
-from question_bank import Question
+from numeric_prob_extracter import extract_pdf ,NUMERIC_INGEST_JOB
+from context_registry import context_registry
+from embedder import Embedder
+from curriculum_catalog import curriculum_catalog
+from score_store import score_store
+from job_queue import job_queue
+from llm_gateway import llm_gateway
+from translation_service import TranslationService
+from google_clients import google_clients
+from db_engine import Engine
+from sqlalchemy import text
 from PIL import Image
+from settings import settings
 import json
 import copy 
 import time 
@@ -27,28 +33,21 @@ import io
 import os
 import jwt
 import random
+import base64
+import hashlib
 
 
-##loadin the env file  
-load_dotenv(override=True)
-
+##nothing below dials google or queries the db ,clients and caches are built on first use (see google_clients)
 app = Flask(__name__)
 subtopic_generator_obj = SubtopicGenerator()
-time.sleep(2)
 mcq_gen_cache = McqGenerationCache( )
 assigment_handler = AssignmentHandler()
 
 ##question extractor
 img_quest_ext = ExtractQuestion()
 
-##friendly explanation
-response_cache = {}
-
-##creating a session object with question bank db  
-Session = sessionmaker(bind=Engine)
-
-##translation api
-translate_client = translate.Client() 
+##translation api ,batched with a shared translation memory
+translation_service = TranslationService()
 
 ##explanation track obj
 exp_trck_obj = ExplanTrack()
@@ -62,6 +61,17 @@ ADMIN = "admin"
 TEACHER = "teacher"
 STUDENT = "student"
 
+##load balancer / container probe ,answers as soon as the app is imported and the db is reachable
+@app.route('/health', methods=['GET'])
+def health():
+    try:
+        with Engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return jsonify({"status" : "ok" ,"clients" : google_clients.built()}) ,200
+    
+    except Exception as e:
+        return jsonify({"status" : "unavailable" ,"error" : str(e)}) ,503
+
 @app.route('/authorise', methods=['POST'])
 def user_authentication():
     try:
@@ -125,97 +135,109 @@ def generate_mcq():
             return jsonify({"error": "No selected file"}), 400
 
         if file and file.filename.endswith('.pdf'):
-            # Process PDF in-memory
-            file_stream = io.BytesIO(file.read())
-
-            # retriving the text from the pdf in memory 
-            doc = fitz.open(stream=file_stream, filetype='pdf')
-            text = ""
-            for page in doc:
-                text += page.get_text()
-            
             ##extracting the json part
             data = json.loads( request.form.get('data') )
-            
-            mcq_dict = {}
-            
-            ##generating the base mcqs
-            base_mcq_generator_obj = BaseMcqGenerator( 
-                document_text = text , 
-                subtpc_count = data["subtopic_q_count"],
-                age = 9 + (data["class"] - 4) ,##as the base class is 4th  
-                exmpl_percentage = data["example_percentage"], 
-                stud_clss = data['class'] ,
-                subj = data['subject'].strip(),
-                chap = data['chapter'].strip() 
-            )
-
-            resp = base_mcq_generator_obj.generate()
-            mcq_dict["common"] = resp["example"] + resp["normal"]
-            
-            ##breaking if no base mcq 
-            if len(mcq_dict["common"]) == 0:
-                return jsonify(mcq_dict)
-
-            ##generating for each state 
-            data["choose_regions"].remove("common")
 
-            ##generating for 
-            for state in data["choose_regions"] :
-                
-                state_converter = RegionalInterface( 
-                    state = state ,
-                    age = 9 + (data["class"] - 4) ,##as the base class is 4th  
-                )
-                
-                ##if regional transformation needed (only for example based questions)
-                if data["is_region_transform"] and len(resp["example"]) > 0 :
-                    state_exmp = state_converter.transform( 
-                        mcqs = resp["example"] ,
-                        subtopics = list(data["subtopic_q_count"].keys())
-                    )
-                else:
-                    state_exmp = resp["example"]
-                
-                ##state transformed mcqs in english 
-                mcq_dict[state] = state_exmp + copy.deepcopy(resp["normal"])
-                
-                ##translating regional language and storing it   
-                lang = state_language[state]
-                mcq_dict[lang] = state_converter.translate(
-                    mcqs = mcq_dict[state],
-                    subtopics = list(data["subtopic_q_count"].keys())
-                )
-                
-            ##creating access key
-            access = f"{random.randint(0,99999)}--{random.randint(0,99999)}--{time.time()}"
-
-            ##adding the data to the cache
-            mcq_gen_cache.add( 
-                access = access , 
-                stdent_class = data["class"] ,
-                subject = data["subject"].strip() ,
-                chapter = data["chapter"].strip() ,
-                created_time_stamp = time.time() ,
-                mcq_dict = copy.deepcopy(mcq_dict) 
+            ##generation runs as a background job ,the client polls /admin/jobs/<job_id> for progress and the result
+            job_id = job_queue.submit(
+                kind = MCQ_GENERATION_JOB,
+                payload = {"data" : data ,"pdf" : base64.b64encode(file.read()).decode("ascii")}
             )
-            
-            ##adding access to response 
-            mcq_dict["access"] = access
-            
-            ##forming respopnse dict
-            response_dict = {}
-            response_dict["access"] = access
-            for k ,v in mcq_dict.items() :
-                if k == "common" or k in state_language.keys():
-                    response_dict[k] = v
-
-            return jsonify(response_dict) ,200
+            return jsonify({"job_id" : job_id ,"status" : "queued"}) ,202
        
         return jsonify({"error": "Invalid file type"}), 400
     
     except Exception as e:
         return jsonify({"error": str(e)}), 400
+
+##job handler of /admin/mcq_generation ,runs on a job worker thread of any process
+def run_mcq_generation(payload ,progress):
+    data = payload["data"]
+
+    # retriving the text from the pdf 
+    progress.stage("pdf_text")
+    doc = fitz.open(stream = base64.b64decode(payload["pdf"]) ,filetype = 'pdf')
+    text = ""
+    for page in doc:
+        text += page.get_text()
+    
+    mcq_dict = {}
+    
+    ##generating the base mcqs
+    base_mcq_generator_obj = BaseMcqGenerator( 
+        document_text = text , 
+        subtpc_count = data["subtopic_q_count"],
+        age = 9 + (data["class"] - 4) ,##as the base class is 4th  
+        exmpl_percentage = data["example_percentage"], 
+        stud_clss = data['class'] ,
+        subj = data['subject'].strip(),
+        chap = data['chapter'].strip() ,
+        on_progress = progress.stage
+    )
+
+    progress.stage("mcq_generation")
+    resp = base_mcq_generator_obj.generate()
+    mcq_dict["common"] = resp["example"] + resp["normal"]
+    
+    ##breaking if no base mcq 
+    if len(mcq_dict["common"]) == 0:
+        return {"response" : mcq_dict}
+
+    ##generating for each state in parallel ,a failing state is reported and left out
+    progress.stage("regional")
+    regional_pipeline = RegionalPipeline(
+        age = 9 + (data["class"] - 4) ,##as the base class is 4th  
+        subtopics = list(data["subtopic_q_count"].keys()),
+        is_region_transform = data["is_region_transform"]
+    )
+    state_mcq_dict ,failed_regions = regional_pipeline.run(
+        states = data["choose_regions"],
+        example_mcqs = resp["example"],
+        normal_mcqs = resp["normal"],
+        on_progress = lambda state ,stage : progress.item("regional" ,state ,stage)
+    )
+    mcq_dict.update(state_mcq_dict)
+        
+    ##creating access key
+    access = f"{random.randint(0,99999)}--{random.randint(0,99999)}--{time.time()}"
+
+    ##adding the data to the cache ,the job result keeps a copy for the other worker processes
+    cache_entry = {
+        "access" : access,
+        "stdent_class" : data["class"],
+        "subject" : data["subject"].strip(),
+        "chapter" : data["chapter"].strip(),
+        "created_time_stamp" : time.time(),
+        "mcq_dict" : copy.deepcopy(mcq_dict)
+    }
+    mcq_gen_cache.add(**copy.deepcopy(cache_entry))
+    
+    ##forming respopnse dict
+    response_dict = {}
+    response_dict["access"] = access
+    for k ,v in mcq_dict.items() :
+        if k == "common" or k in state_language.keys():
+            response_dict[k] = v
+    response_dict["failed_regions"] = failed_regions
+
+    return {"access" : access ,"response" : response_dict ,"cache" : cache_entry}
+
+job_queue.register(MCQ_GENERATION_JOB ,run_mcq_generation)
+
+@app.route('/admin/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    try:
+        if not authoris(role = ADMIN):
+            return jsonify({"status" : "access_denied"}),400
+        
+        job = job_queue.get(job_id)
+        if job is None:
+            return jsonify({"error" : "job not found"}) ,404
+        
+        return jsonify(job) ,200
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
     
 @app.route('/admin/mcq_generation/submit', methods=['POST'])
 def store_mcq():
@@ -243,6 +265,27 @@ def store_mcq():
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+@app.route('/admin/stats', methods=['GET'])
+def runtime_stats():
+    try:
+        if not authoris(role = ADMIN):
+            return jsonify({"status" : "access_denied"}),400
+        
+        return jsonify({
+            "llm" : llm_gateway.stats(),
+            "llm_cache" : llm_gateway.cache.stats(),
+            "translation" : translation_service.stats(),
+            "context_registry" : context_registry.stats(),
+            "embedding" : Embedder.stats(),
+            "doubt_cache" : DoubtSolver.answers.stats(),
+            "solution_cache" : SoltuionGenerator.stats(),
+            "scores" : score_store.stats(),
+            "jobs" : job_queue.stats()
+        }) ,200
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
 @app.route('/teacher/mcq_availability', methods=['GET'])
 def mcq_availabilty_info():
     try:
@@ -283,10 +326,11 @@ def teacher_assignment_list():
         if data['lng'] == 'en':
             return jsonify(response) ,200 
         
-        for k1 in response.keys():
-            for dict1 in response[k1]:
-                dict1['subject'] =  translate_text(target = data['lng'] ,text = dict1['subject'] )
-                dict1['chapter'] =  translate_text(target = data['lng'] ,text = dict1['chapter'] )
+        translate_fields(
+            records = [dict1 for k1 in response.keys() for dict1 in response[k1]],
+            fields = ['subject' ,'chapter'],
+            target = data['lng']
+        )
                 
         return jsonify(response) ,200
     
@@ -306,17 +350,18 @@ def teacher_assignment_analysis():
 
         ###performing translation
         if data['lng'] != 'en':
-            trans_resp = []
+            texts = [dict1['name'] for dict1 in resp] + [sub_nme for dict1 in resp for sub_nme in dict1['subtopic_score'].keys()]
+            translated = dict(zip(texts ,translation_service.translate_many(texts = texts ,target = data['lng'])))
             
+            trans_resp = []
             for i in range(len(resp)):
                 trans_resp.append({})
                 
-                trans_resp[i]['name'] = translate_text(target = data['lng'] ,text = resp[i]['name'])
+                trans_resp[i]['name'] = translated[resp[i]['name']]
                 trans_resp[i]['subtopic_score'] = {}
 
                 for sub_nme in resp[i]['subtopic_score'].keys():
-                    trans_sub_nme = translate_text(target = data['lng'] ,text = sub_nme)
-                    trans_resp[i]['subtopic_score'][trans_sub_nme] = resp[i]['subtopic_score'][sub_nme]
+                    trans_resp[i]['subtopic_score'][translated[sub_nme]] = resp[i]['subtopic_score'][sub_nme]
             
             return jsonify(trans_resp),200
          
@@ -336,74 +381,87 @@ def teacher_numericprob_submiting():
 
 
         if pdf_file.filename.endswith('.pdf'):
-            ##if pdf file exist ,temperarly saving it 
-            uniq_pth = f"{data['class']}_{data['subj'].strip()}_{data['chap'].strip()}_{random.randint(0,9999)}.pdf"
-            path = os.path.join(TEMP_PDF_FILE ,uniq_pth)
-            pdf_file.save(path)
-
-            ###
-            extract_obj = NumericProbExtractor(file_link = path)
-            resp_list = extract_obj.extract()
-
-            new_problems = [dict1['question'] for dict1 in resp_list]
-            new_solutions = [dict1['explained_solution'] for dict1 in resp_list]
-
-            sim_obj = SimNumericProblem(
-                stud_clss = data['class'],
-                subj = data['subj'].strip(),
-                chap = data['chap'].strip(), 
+            pdf = pdf_file.read()
+            scope = f"{data['class']}_{data['subj'].strip()}_{data['chap'].strip()}"
+
+            ##ingestion runs as a background job ,the same file uploaded again to the chapter gets the job of the
+            ##first upload back instead of adding its problems twice
+            job_id = job_queue.submit(
+                kind = NUMERIC_INGEST_JOB,
+                payload = {"data" : data ,"pdf" : base64.b64encode(pdf).decode("ascii")},
+                key = hashlib.sha256(scope.encode("utf-8") + b"\n" + pdf).hexdigest()
             )
+            job = job_queue.get(job_id)
+            return jsonify({"job_id" : job_id ,"status" : job["status"]}) ,202
+        
+        return jsonify({"error" : "file type not supported"}) ,400
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
-            sim_obj.add(
-                new_questions = new_problems,
-                new_soltutions = new_solutions
-            )
-            
-            ##removing temparoryly stored files 
-            os.remove(path = path)
+##job handler of /teacher/numericprob
+def run_numeric_ingest(payload ,progress):
+    data = payload["data"]
+
+    progress.stage("extract")
+    resp_list = extract_pdf(
+        pdf_bytes = base64.b64decode(payload["pdf"]),
+        folder = TEMP_PDF_FILE,
+        on_progress = lambda part ,stage : progress.item("extract" ,part ,stage)
+    )
+
+    ##a problem repeated across page ranges is kept once
+    problems = {}
+    for dict1 in resp_list:
+        problems.setdefault(dict1['question'] ,dict1['explained_solution'])
+
+    progress.stage("semantic_ingest")
+    if len(problems) > 0:
+        sim_obj = context_registry.numeric(
+            stud_clss = data['class'],
+            subj = data['subj'].strip(),
+            chap = data['chap'].strip(), 
+        )
 
-            return jsonify({"status" : "success"}) ,200
+        sim_obj.add(
+            new_questions = list(problems.keys()),
+            new_soltutions = list(problems.values())
+        )
+        context_registry.resize(sim_obj)
+
+    return {"response" : {"status" : "success" ,"problems" : len(problems)}}
+
+job_queue.register(NUMERIC_INGEST_JOB ,run_numeric_ingest)
+
+@app.route('/teacher/numericprob/<job_id>' ,methods = ["GET"] )
+def teacher_numericprob_status(job_id):
+    try:
+        if not authoris(role = TEACHER):
+            return jsonify({"status" : "access_denied"}),400
         
-        return jsonify({"error" : "file type not supported"}) ,400
+        job = job_queue.get(job_id)
+        if job is None or job["kind"] != NUMERIC_INGEST_JOB:
+            return jsonify({"error" : "job not found"}) ,404
         
+        return jsonify(job) ,200
+    
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 @app.route('/student/my_score' ,methods = ["POST"] )
 def student_score():
     try:
-        session = Session()
-
         if not authoris(role = STUDENT):
             return jsonify({"status" : "access_denied"}),400
         data = request.get_json()
         
-        ##trying to fetch prexisting student_score 
-        score_obj = session.query(StudentScore).filter(
-            StudentScore.student_class == data["class"] ,
-            StudentScore.roll_num == data["roll_num"] ,
-            StudentScore.state == data["state"] 
-        ).first()
-        
-        ##score obj for the student exist
-        if score_obj != None:
-            src = score_obj.score
-            session.close()
-            return jsonify({"score" : src })
-        
-        ##if object donot exist means creating anew student-score object 
-        score_obj = StudentScore(
-            student_class = data["class"],
+        ##fetching the student score ,a new student starts with 0 points
+        src = score_store.get(
+            student_class = int(data["class"]),
             roll_num = data["roll_num"],
-            state = data["state"],
-            score = 0
+            state = data["state"]
         )
-        
-        session.add(score_obj)
-        session.commit()
-        session.close()
-
-        return jsonify({"score" : 0}),200
+        return jsonify({"score" : src }),200
     
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -416,20 +474,17 @@ def student_update_score():
         
         data = request.get_json()
         
-        session = Session() 
-        score_obj = session.query(StudentScore).filter(
-            StudentScore.student_class == data["class"] ,
-            StudentScore.roll_num == data["roll_num"] ,
-            StudentScore.state == data["state"] 
-        ).first()
+        ##atomic increment ,only for students who already have a score
+        updated = score_store.add(
+            student_class = int(data["class"]),
+            roll_num = data["roll_num"],
+            state = data["state"],
+            delta = int(data['score']),
+            create = False
+        )
         
-        if score_obj is None:
-            session.close()
+        if not updated:
             return jsonify({"status" : "student data not avilable"}),400
-        
-        score_obj.score += data['score']
-        session.commit()
-        session.close() 
 
         return jsonify({"status" : 'success' }),200
     
@@ -452,11 +507,11 @@ def student_list_assignment():
             return jsonify(response) ,200 
         
         ##converting the response to native language
-        data = request.get_json()
-        for k1 in response.keys():
-            for dict1 in response[k1]:
-                dict1['subject'] =  translate_text(target = data['lng'] ,text = dict1['subject'] )
-                dict1['chapter'] =  translate_text(target = data['lng'] ,text = dict1['chapter'] )
+        translate_fields(
+            records = [dict1 for k1 in response.keys() for dict1 in response[k1]],
+            fields = ['subject' ,'chapter'],
+            target = data['lng']
+        )
                 
         return jsonify(response) ,200    
     except Exception as e:
@@ -512,23 +567,8 @@ def student_availabilty():
         
         data = request.get_json()
 
-        session = Session()
-        t1 = time.time()
-        objs = session.query(Question).filter(Question.student_class ==  data['class'])
-        t2 = time.time()
-
-        respons = {}
-        for obj in objs:
-            
-            if obj.subject not in respons:
-                respons[obj.subject] = []
-            
-            if obj.chapter not in respons[obj.subject]:
-                respons[obj.subject].append(
-                    obj.chapter
-                )
-        session.close()
-        print("Time taken for mysqldb : " ,t2-t1)
+        ##subjects and chapters of the class from the catalog
+        respons = curriculum_catalog.student_view(student_class = int(data['class']))
         return jsonify(respons) ,200
     
     except Exception as e:
@@ -582,59 +622,13 @@ def student_book_question():
             q_type = q_type
         )
 
-        ##translating subtopic explanations response 
-        sub_exp_var = copy.deepcopy(subtopic_exp_resp)
-        if data['lng'] != 'en':
-            translated_subtopic_exp_resp = {}
-            
-            for sub_nme  in subtopic_exp_resp.keys():    
-                trans_nme = translate_text(target = data['lng'] ,text = sub_nme)
-                translated_subtopic_exp_resp[trans_nme] = {}
+        response = book_question_response(subtopic_exp_resp = subtopic_exp_resp ,sol_resp = sol_resp ,q_type = q_type)
 
-                translated_subtopic_exp_resp[trans_nme]['explanation'] = translate_text(
-                    target = data['lng'],
-                    text = subtopic_exp_resp[sub_nme]['explanation']
-                )
-
-                translated_subtopic_exp_resp[trans_nme]['img'] = subtopic_exp_resp[sub_nme]['img']
-
-            subtopic_exp_resp = translated_subtopic_exp_resp
-        
-        response = { 
-            "subtopic" : subtopic_exp_resp,
-            "solution" : translate_text(target = data['lng'] ,text = sol_resp['solution']),
-            "explanation" : translate_text(target = data['lng'] ,text = sol_resp['explanation']),
-            'q_type' : q_type
-        }
-        
-        access = f"question_expl:{time.time()}_{random.randint(0, 99999)}_{random.randint(0, 99999)}"
-        response['access'] =  access
-        
-        ##caching for explanation tracking 
-        response_cache[access] = {}
-        if q_type == "theory":
-            
-            ##if solution is very small explain the explanation provided 
-            if len(sol_resp['solution'].split(" ")) <= 30:
-                response_cache[access]['target'] = sol_resp['explanation']
-                response_cache[access]['what_to_exp'] = "Help me understand the solution!" 
-            
-            ##else the solution it self 
-            else:
-                response_cache[access]['target'] = sol_resp['solution']
-                response_cache[access]['what_to_exp'] = "I need help with how to answer that question."
-        
-        else:
-            sub_exp = "\n\n".join([dict1['explanation'] for dict1 in sub_exp_var.values()])
-            response_cache[access]['target'] = sub_exp
-            response_cache[access]['what_to_exp'] = "Can you help me understand the topics related to that solution?"
-        
+        ##translating the whole response in one batch
         if data['lng'] != 'en' :
-            ##translating what to explain
-            response_cache[access]['what_to_exp'] = translate_text(
-                target = data['lng'],
-                text = response_cache[access]['what_to_exp']
-            ) 
+            texts = book_question_texts(response)
+            translated = dict(zip(texts ,translation_service.translate_many(texts = texts ,target = data['lng'])))
+            localise_book_question(response ,translated)
 
         return jsonify(response) ,200
     
@@ -648,8 +642,9 @@ def student_what_to_expl():
             return jsonify({"status" : "access_denied"}),400
         
         data = request.get_json()
-        if data['access'] in response_cache:
-            return jsonify({"what_to_exp" :response_cache[data['access']]['what_to_exp']}) ,200
+        what_to_exp = explanation_store.what_to_exp(data['access'])
+        if what_to_exp is not None:
+            return jsonify({"what_to_exp" :what_to_exp}) ,200
         
         return jsonify({"error" :"session not available"}) ,402
     
@@ -663,21 +658,13 @@ def student_explanation_submit():
             return jsonify({"status" : "access_denied"}),400
         
         data = request.get_json()
-        if data['timeout'] and data['access'] in exp_trck_obj.cache:
-            del exp_trck_obj.cache[data['access']]
-            del response_cache[data['access']]
+        if data['timeout'] and exp_trck_obj.end(data['access']):
             return jsonify({'status' : 'sucess'}) ,200
 
-        if not exp_trck_obj.is_exist(data['access']):
-            
-            if data['access'] in response_cache:
-                exp_trck_obj.start(
-                    access = data['access'],
-                    target_txt = response_cache[data['access']]['target']
-                )
-            
-            else:
-                return jsonify({"error" : "session_not_avil"}) ,402
+        ##the session may have been opened by another worker process
+        session = exp_trck_obj.session(data['access'])
+        if session is None:
+            return jsonify({"error" : "session_not_avil"}) ,402
 
         if data['lng'] != 'en':
             data['expl'] = translate_text(
@@ -685,8 +672,9 @@ def student_explanation_submit():
                 text = data['expl']
             )
         
+        ##a win ends the session
         scr ,is_win ,pnts = exp_trck_obj.track(
-            access = data['access'],
+            session = session,
             expl = data['expl'],
             lng = data['lng'],
             duration = data['duration'],
@@ -695,10 +683,6 @@ def student_explanation_submit():
             stud_clss = data['class']
         )
 
-        if is_win :
-            del exp_trck_obj.cache[data['access']]
-            del response_cache[data['access']] 
-
         return jsonify({'score' : int(scr) ,"is_win" : is_win ,"new_points" : pnts}) ,200
     
     except Exception as e:
@@ -741,43 +725,18 @@ def student_doubt():
 
         ###doubt resolution
         resp = obj.resolve(question = data['question'])
-        access = f"doubt_expl:{time.time()}_{random.randint(0, 9999)}_{random.randint(0, 99999)}"
-        resp['access'] = access
-
-        
-        ##caching for explanation tracking 
-        response_cache[access] = {}
-        response_cache[access]['target'] = resp['doubt_resolution']
-        response_cache[access]['what_to_exp'] = "I have the same doubt. Please help me."
-
-        ##translating what to explain
-        if data['lng'] != 'en' :
-            response_cache[access]['what_to_exp'] = translate_text(
-                target = data['lng'],
-                text = response_cache[access]['what_to_exp']
-            ) 
+        track_doubt(resp)
 
         ###deleting temp saved image 
         if temp_img_file != None:
             os.remove(temp_img_file)
         
         
-        ###translating the response 
+        ###translating the response and what to explain in one batch
         if data['lng'] != 'en':
-            mcq_list = resp['mcqs']
-            
-            for i in range(len(mcq_list)):
-                mcq_list[i]['question'] = translate_text(target = data['lng'] ,text = mcq_list[i]['question'])
-                
-                option_dict = dict.fromkeys(mcq_list[i]['options'])
-                for opt in option_dict.keys():
-                    option_dict[opt] = translate_text(target = data['lng'] ,text = opt)
-                
-                mcq_list[i]['options'] = list(option_dict.values())
-                mcq_list[i]['correct_option'] = option_dict[mcq_list[i]['correct_option']]
-            
-            resp['mcqs'] = mcq_list
-            resp['doubt_resolution'] = translate_text(target = data['lng'] ,text = resp['doubt_resolution'])
+            texts = doubt_texts(resp)
+            translated = dict(zip(texts ,translation_service.translate_many(texts = texts ,target = data['lng'])))
+            localise_doubt(resp ,translated)
        
         print(resp)
 
@@ -786,8 +745,100 @@ def student_doubt():
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+##opens the explanation tracking session of a book question response ,sets response['access']
+def book_question_response(subtopic_exp_resp ,sol_resp ,q_type):
+    response = { 
+        "subtopic" : subtopic_exp_resp,
+        "solution" : sol_resp['solution'],
+        "explanation" : sol_resp['explanation'],
+        'q_type' : q_type
+    }
+    
+    access = f"question_expl:{time.time()}_{random.randint(0, 99999)}_{random.randint(0, 99999)}"
+    response['access'] =  access
+    
+    ##opening the explanation tracking session
+    if q_type == "theory":
+        
+        ##if solution is very small explain the explanation provided 
+        if len(sol_resp['solution'].split(" ")) <= 30:
+            target = sol_resp['explanation']
+            what_to_exp = "Help me understand the solution!" 
+        
+        ##else the solution it self 
+        else:
+            target = sol_resp['solution']
+            what_to_exp = "I need help with how to answer that question."
+    
+    else:
+        target = "\n\n".join([dict1['explanation'] for dict1 in subtopic_exp_resp.values()])
+        what_to_exp = "Can you help me understand the topics related to that solution?"
+
+    explanation_store.open(access = access ,target = target ,what_to_exp = what_to_exp)
+    return response
+
+##strings of a book question response shown to the student
+def book_question_texts(response):
+    texts = [response['solution'] ,response['explanation'] ,explanation_store.what_to_exp(response['access'])]
+    for sub_nme ,dict1 in response['subtopic'].items():
+        texts = texts + [sub_nme ,dict1['explanation']]
+    return texts
+
+##translated :- {english text : translation}
+def localise_book_question(response ,translated):
+    translated_subtopic_exp_resp = {}
+    for sub_nme ,dict1 in response['subtopic'].items():
+        translated_subtopic_exp_resp[translated[sub_nme]] = {
+            'explanation' : translated[dict1['explanation']],
+            'img' : dict1['img']
+        }
+
+    response['subtopic'] = translated_subtopic_exp_resp
+    response['solution'] = translated[response['solution']]
+    response['explanation'] = translated[response['explanation']]
+    what_to_exp = explanation_store.what_to_exp(response['access'])
+    explanation_store.set_what_to_exp(response['access'] ,translated[what_to_exp])
+
+##opens the explanation tracking session of a doubt resolution ,sets resp['access']
+def track_doubt(resp):
+    access = f"doubt_expl:{time.time()}_{random.randint(0, 9999)}_{random.randint(0, 99999)}"
+    resp['access'] = access
+
+    explanation_store.open(
+        access = access,
+        target = resp['doubt_resolution'],
+        what_to_exp = "I have the same doubt. Please help me."
+    )
+
+##strings of a doubt resolution shown to the student
+def doubt_texts(resp):
+    texts = [resp['doubt_resolution'] ,explanation_store.what_to_exp(resp['access'])]
+    for mcq in resp['mcqs']:
+        texts = texts + [mcq['question']] + mcq['options']
+    return texts
+
+def localise_doubt(resp ,translated):
+    mcq_list = resp['mcqs']
+    for i in range(len(mcq_list)):
+        mcq_list[i]['question'] = translated[mcq_list[i]['question']]
+        
+        option_dict = dict.fromkeys(mcq_list[i]['options'])
+        for opt in option_dict.keys():
+            option_dict[opt] = translated[opt]
+        
+        mcq_list[i]['options'] = list(option_dict.values())
+        mcq_list[i]['correct_option'] = option_dict[mcq_list[i]['correct_option']]
+    
+    resp['mcqs'] = mcq_list
+    resp['doubt_resolution'] = translated[resp['doubt_resolution']]
+    what_to_exp = explanation_store.what_to_exp(resp['access'])
+    explanation_store.set_what_to_exp(resp['access'] ,translated[what_to_exp])
+
 def save_temp_img():
-    img = request.files['image']
+    return resize_temp_img(request.files['image'])
+
+##img :- uploaded file object ,flask FileStorage or the file of a starlette UploadFile
+def resize_temp_img(img):
     file_name = f"{random.randint(0, 9999)}_{random.randint(0, 9999)}_{random.randint(0, 99999)}.jpg"
     img_path = os.path.join(TEMP_IMG_UPLOAD_FOLDER ,file_name)
     print(img_path)
@@ -801,18 +852,24 @@ def save_temp_img():
     return img_path
 
 def authoris(role ,is_any = False):
+    return check_token(
+        auth_header = request.headers.get('Authorization', None),
+        role = role,
+        is_any = is_any
+    )
+
+##shared by the flask routes and the asyncio routes of asgi.py
+def check_token(auth_header ,role ,is_any = False):
     ##clearing the timed out cache in mcq_cahe system
     mcq_gen_cache.remove_timout_data()
     
     ##authoraisation token 
-    auth_header = request.headers.get('Authorization', None)
-    
     if not auth_header:
         return False
     try:
         # The token should be in the format: "Bearer <token>"
         token = auth_header.split(" ")[1]
-        decoded = jwt.decode(token, os.getenv("ENCRYPT_KEY"), algorithms=[os.getenv("ENCRYPT_ALGO")])
+        decoded = jwt.decode(token, settings.get("ENCRYPT_KEY"), algorithms=[settings.get("ENCRYPT_ALGO")])
         if is_any :
             return True
         if decoded["role"] == role or decoded["role"] == "all" :
@@ -824,12 +881,25 @@ def authoris(role ,is_any = False):
         print("error",2)
         return False
 
-def translate_text(target: str, text: str) -> dict:
-    if isinstance(text, bytes):
-        text = text.decode("utf-8")
-    result = translate_client.translate(text, target_language=target)
-    return result["translatedText"]
+def translate_text(target: str, text: str) -> str:
+    return translation_service.translate(text = text ,target = target)
+
+##translating the given fields of every record in place with a single batched call
+def translate_fields(records ,fields ,target):
+    texts = [dict1[field] for dict1 in records for field in fields]
+    translated = dict(zip(texts ,translation_service.translate_many(texts = texts ,target = target)))
+    for dict1 in records:
+        for field in fields:
+            dict1[field] = translated[dict1[field]]
+
+
+##background work of a serving process ,gunicorn calls it in every worker after the fork (see gunicorn.conf.py)
+def start_background():
+    regional_profile_store.start_refresher()
+    job_queue.start()
 
 
+##development server only ,production runs gunicorn -c gunicorn.conf.py main:app
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    start_background()
+    app.run(host='0.0.0.0', port=int(settings.get("PORT" ,5000)), debug=settings.get("FLASK_DEBUG" ,"0") == "1")
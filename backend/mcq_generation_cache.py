@@ -1,11 +1,14 @@
 from question_bank import Question ,Options  
-from sqlalchemy.orm import sessionmaker
+from curriculum_catalog import curriculum_catalog
+from job_queue import job_queue
+from sqlalchemy import insert ,select ,text
+from settings import settings
 import time  
 from regional.interface import state_language
 from db_engine import Engine
 
-##creating a session object with question bank db  
-Session = sessionmaker(bind=Engine)
+##job kind of /admin/mcq_generation ,its result carries the cache entry under "cache"
+MCQ_GENERATION_JOB = "mcq_generation"
 
 """
 {  
@@ -38,11 +41,11 @@ single mcq formate
 class McqGenerationCache:
     ##max_limit represents maximum number of cache at a time  
     def __init__(self ):
-        session = Session()
         self.data_list = []
         self.timeoutgap = 30 * 60 ## in seconds  
-        self.total_q_count = session.query(Question).count()
-        session.close()
+        self.chunk_size = int(settings.get("MCQ_STORE_CHUNK_SIZE" ,1000)) ##questions per insert statement
+        self.autoinc_step = None
+        self.last_store = None
 
     def add(self ,access ,stdent_class ,subject ,chapter ,created_time_stamp ,mcq_dict):
         assert isinstance(mcq_dict ,dict) ,"mcq is must be dict ,containing all the states mcq's as key - values pairs"
@@ -69,69 +72,129 @@ class McqGenerationCache:
                 )
         del incache
     
-    ##storing the cached data to question db and clearing the cache  
+    ##storing the cached data to question db and clearing the cache ,False when the access key is unknown ,timed out or
+    ##already used (by this or any other worker)
     def store(self ,access):
-        session = Session()
+        data = self.__find(access)
+        if data is None :
+            return False
 
-        for data in self.data_list : 
-            
-            if data["access"] == access:
-                option_obj_list = [ ]
-                
-                for state ,mcq_list in data["mcq_dict"].items():
-                    question_obj_list = []
-
-                    for mcq in mcq_list:
-                        ##store question ,correct option ,explanation...
-                        subtopic_translated = ""
-                        if state != "common" and state in state_language.values():
-                            subtopic_translated = mcq["subtopic_translated"] 
-                        
-                        question_obj_list.append(
-                                Question(  
-                                state = state,
-                                student_class = data["stdent_class"],
-                                subject = data["subject"],
-                                chapter = data["chapter"],
-                                question = mcq["question"],
-                                correct_option = mcq["correct_option"],
-                                explanation = mcq["why"],
-                                suptopic = mcq["subtopic"],
-                                subtopic_translated = subtopic_translated,
-                                q_type = mcq["type"]
-                            )
-                        )
-                        
-                    ##flushing the q_obj to get the id 
-                    session.add_all(question_obj_list)
-                    session.flush()
-                    
-                    for i,mcq in enumerate(mcq_list):
-                        q_obj = question_obj_list[i]
-                        
-                        ##store the options 
-                        for option in mcq["options"]:
-                            option_obj_list.append(
-                                Options( 
-                                    statement = option,
-                                    question_id = q_obj.id,
-                                )
-                           )
-                
-                session.add_all(option_obj_list)
-                session.commit()
-                
-                session.close()
-                return True
+        question_rows = [ ]
+        option_lists = [ ]
         
-        session.close()
-        return False
+        for state ,mcq_list in data["mcq_dict"].items():
+            for mcq in mcq_list:
+                ##store question ,correct option ,explanation...
+                subtopic_translated = ""
+                if state != "common" and state in state_language.values():
+                    subtopic_translated = mcq["subtopic_translated"] 
+
+                question_rows.append({
+                    "state" : state,
+                    "student_class" : data["stdent_class"],
+                    "subject" : data["subject"],
+                    "chapter" : data["chapter"],
+                    "question" : mcq["question"],
+                    "correct_option" : mcq["correct_option"],
+                    "explanation" : mcq["why"],
+                    "suptopic" : mcq["subtopic"],
+                    "subtopic_translated" : subtopic_translated,
+                    "q_type" : mcq["type"]
+                })
+                option_lists.append(mcq["options"])
+
+        stored = self.__bulk_store(access = access ,question_rows = question_rows ,option_lists = option_lists)
+        self.__forget(access) ##claimed now ,or used up by another worker
+        return stored
+
+    ##entry of this worker ,else the result of the generation job when another worker process ran it.
+    ##either way it is stored only after the job key is claimed (see __bulk_store)
+    def __find(self ,access):
+        for data in self.data_list :
+            if data["access"] == access:
+                return data
+
+        result = job_queue.result(kind = MCQ_GENERATION_JOB ,key = access ,max_age = self.timeoutgap)
+        if result is not None :
+            return result["cache"]
+        return None
+
+    ##questions and their options go in with core inserts ,chunk by chunk inside one transaction that first claims the
+    ##job key :- a key already claimed stores nothing ,and a failing chunk rolls back the claim and every earlier chunk
+    ##so the submit can simply be retried
+    def __bulk_store(self ,access ,question_rows ,option_lists):
+        start = time.perf_counter()
+        stored_questions ,stored_options = 0 ,0
+        catalog_counts = { }
+
+        with Engine.begin() as conn :
+            if not job_queue.release(kind = MCQ_GENERATION_JOB ,key = access ,conn = conn):
+                return False
+
+            for i in range(0 ,len(question_rows) ,self.chunk_size):
+                rows = question_rows[i : i + self.chunk_size]
+                ids = self.__insert_questions(conn ,rows)
+                option_rows = [
+                    {"statement" : option ,"question_id" : q_id}
+                    for q_id ,options in zip(ids ,option_lists[i : i + self.chunk_size]) for option in options
+                ]
+                if len(option_rows) > 0 :
+                    conn.execute(insert(Options) ,option_rows) ##executemany
+
+                stored_questions += len(rows)
+                stored_options += len(option_rows)
+                for row in rows :
+                    catalog_key = (row["student_class"] ,row["subject"] ,row["chapter"] ,row["state"] ,row["suptopic"])
+                    catalog_counts[catalog_key] = catalog_counts.get(catalog_key ,0) + 1
+
+        ##keeping the availability catalog in step once the questions are committed
+        curriculum_catalog.record(counts = catalog_counts)
+
+        duration = time.perf_counter() - start
+        self.last_store = {
+            "questions" : stored_questions,
+            "options" : stored_options,
+            "seconds" : round(duration ,3),
+            "rows_per_sec" : round((stored_questions + stored_options) / duration ,1) if duration > 0 else 0.0
+        }
+        print("mcq store :" ,self.last_store)
+        return True
+
+    ##returns the ids of the inserted rows in the same order
+    def __insert_questions(self ,conn ,rows):
+        if Engine.dialect.insert_executemany_returning_sort_by_parameter_order :
+            result = conn.execute(insert(Question).returning(Question.id ,sort_by_parameter_order = True) ,rows)
+            return [row[0] for row in result]
+
+        ##mysql :- one multi row INSERT is a "simple insert" ,innodb hands it a consecutive block of auto increment
+        ##values in every innodb_autoinc_lock_mode ,lastrowid is the first of them
+        result = conn.execute(insert(Question).values(rows))
+        step = self.__autoinc_step(conn)
+        ids = [result.lastrowid + j * step for j in range(len(rows))]
+
+        ##cheap guard against a server set up differently ,the whole store is rolled back
+        last = conn.execute(select(Question.question).where(Question.id == ids[-1])).scalar()
+        if last != rows[-1]["question"] :
+            raise RuntimeError("question ids of the bulk insert are not consecutive")
+        return ids
+
+    def __autoinc_step(self ,conn):
+        if self.autoinc_step is None :
+            step = 1
+            if Engine.dialect.name == "mysql" :
+                step = conn.execute(text("SELECT @@auto_increment_increment")).scalar() or 1
+            self.autoinc_step = int(step)
+        return self.autoinc_step
     
     def remove_data(self, access):
+        self.__forget(access)
+        job_queue.release(kind = MCQ_GENERATION_JOB ,key = access)
+
+    def __forget(self ,access):
         for data in self.data_list:
             if data["access"] == access: 
                 self.data_list.remove(data)
-                return
+                break
 
 
         
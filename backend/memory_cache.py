@@ -0,0 +1,40 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class LruCache :
+    """thread safe in-memory lru ,entries can carry their own expiry time (unix seconds ,None = never expires)"""
+
+    def __init__(self ,max_entries):
+        self.max_entries = max_entries
+        self.__data = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self ,key):
+        with self.__lock :
+            if key not in self.__data :
+                return None
+
+            value ,expires = self.__data[key]
+            if expires is not None and expires < time.time():
+                del self.__data[key]
+                return None
+
+            self.__data.move_to_end(key)
+            return value
+
+    def put(self ,key ,value ,expires = None):
+        with self.__lock :
+            self.__data[key] = (value ,expires)
+            self.__data.move_to_end(key)
+
+            while len(self.__data) > self.max_entries :
+                self.__data.popitem(last = False)
+
+    def remove(self ,key):
+        with self.__lock :
+            self.__data.pop(key ,None)
+
+    def __len__(self):
+        return len(self.__data)
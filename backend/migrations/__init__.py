@@ -0,0 +1,65 @@
+"""versioned schema migrations
+
+every migration in versions.MIGRATIONS runs once ,in order ,and is recorded in the SchemaVersion table. migrations
+are written to be safe on a database that was set up by hand before this existed (columns and indexes are only
+added when missing) ,so the first run simply brings an old database up to date.
+
+run from the backend folder :- python -m migrations
+"""
+from sqlalchemy import Column ,Integer ,String ,DateTime ,inspect
+from sqlalchemy.orm import declarative_base ,sessionmaker
+from datetime import datetime
+from db_engine import Engine
+
+Base = declarative_base()
+Session = sessionmaker(bind = Engine)
+
+
+class SchemaVersion(Base):
+    __tablename__ = "SchemaVersion"
+
+    version = Column(Integer, primary_key=True ,autoincrement=False)
+    name = Column(String(128))
+    applied = Column(DateTime)
+
+
+def applied_versions():
+    Base.metadata.create_all(Engine)
+    session = Session()
+    versions = set(version for (version,) in session.query(SchemaVersion.version).all())
+    session.close()
+    return versions
+
+
+def pending():
+    from .versions import MIGRATIONS
+    done = applied_versions()
+    return [(version ,name ,step) for version ,name ,step in MIGRATIONS if version not in done]
+
+
+def migrate(target = None):
+    for version ,name ,step in pending():
+        if target is not None and version > target :
+            break
+
+        print(f"migration {version:04d} {name} : running")
+        step()
+
+        session = Session()
+        session.add(SchemaVersion(version = version ,name = name ,applied = datetime.now()))
+        session.commit()
+        session.close()
+        print(f"migration {version:04d} {name} : done")
+
+
+##creates an index unless one with the same name or the same leading columns is there already
+##(mysql adds an index for every foreign key on its own)
+def create_index(index):
+    table = index.table.name
+    columns = [column.name for column in index.columns]
+    for existing in inspect(Engine).get_indexes(table):
+        if existing["name"] == index.name or existing["column_names"][:len(columns)] == columns :
+            return False
+
+    index.create(Engine)
+    return True
@@ -0,0 +1,13 @@
+from . import pending ,migrate
+
+if __name__ == "__main__" :
+    steps = pending()
+    if len(steps) == 0 :
+        print("schema is up to date")
+    else:
+        for version ,name ,step in steps :
+            print(f"pending : {version:04d} {name}")
+
+        inp = input( "apply_migrations(y/n) : ")
+        if inp == "y" :
+            migrate()
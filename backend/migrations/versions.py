@@ -0,0 +1,183 @@
+from sqlalchemy import Text ,String ,LargeBinary ,Index ,inspect ,select ,update ,delete
+from sqlalchemy.orm import sessionmaker
+from vector_store import add_column ,migrate_json_vectors ,migrate_chunk_hashes
+from db_engine import Engine
+from . import create_index
+
+Session = sessionmaker(bind = Engine)
+
+
+##tables of every module ,create_all skips the ones that exist
+def baseline():
+    import question_bank ,assessment_db ,user_engagement_db ,context_db ,cache_db
+    from regional import profile_db
+
+    for module in [question_bank ,assessment_db ,user_engagement_db ,context_db ,cache_db ,profile_db]:
+        module.Base.metadata.create_all(Engine)
+
+
+def context_vector_blobs():
+    from context_db import TheoryContext ,NumericProblemContext
+    for model in [TheoryContext ,NumericProblemContext]:
+        print(f"{model.__tablename__} : {migrate_json_vectors(model)} rows migrated")
+
+
+def theory_chunk_hashes():
+    from context_db import TheoryContext
+    print(f"{TheoryContext.__tablename__} : {migrate_chunk_hashes(TheoryContext)} duplicate chunks removed")
+
+
+def doubt_cache_columns():
+    from question_bank import DoubtResolution
+    add_column(DoubtResolution.__tablename__ ,"state" ,Text())
+    add_column(DoubtResolution.__tablename__ ,"q_vector" ,LargeBinary())
+    add_column(DoubtResolution.__tablename__ ,"mcqs" ,Text())
+
+
+##the hash is filled here ,vectors of old rows need vertex (python question_bank.py)
+def solution_question_hash():
+    from question_bank import Solution ,question_hash
+
+    add_column(Solution.__tablename__ ,"question_hash" ,String(64))
+    add_column(Solution.__tablename__ ,"q_vector" ,LargeBinary())
+
+    session = Session()
+    while True :
+        objs = session.query(Solution).filter(Solution.question_hash.is_(None)).limit(500).all()
+        if len(objs) == 0 :
+            break
+        for obj in objs :
+            obj.question_hash = question_hash(obj.question or "")
+        session.commit()
+    session.close()
+
+    for index in Solution.__table__.indexes :
+        create_index(index)
+
+
+##composite indexes of the hot question bank and score lookups
+def question_bank_indexes():
+    from question_bank import Question ,Options
+    from user_engagement_db import StudentScore
+
+    for model in [Question ,Options ,StudentScore]:
+        for index in model.__table__.indexes :
+            if index.unique : ##unique ones need their duplicates merged first ,see student_score_unique
+                continue
+            created = create_index(index)
+            print(f"{model.__tablename__} : {index.name} {'created' if created else 'already covered'}")
+
+
+##availability catalog ,filled once from the question bank and kept up to date by McqGenerationCache.store
+def curriculum_catalog():
+    import question_bank
+    from curriculum_catalog import curriculum_catalog as catalog
+
+    question_bank.Base.metadata.create_all(Engine)
+    print(f"CurriculumCatalog : {catalog.rebuild()} entries")
+
+
+##merges duplicate score rows of a student (points are summed into the oldest row) ,then makes the key unique
+def student_score_unique():
+    from user_engagement_db import StudentScore
+    table = StudentScore.__table__
+
+    existing = [index["name"] for index in inspect(Engine).get_indexes(table.name)]
+    if "uq_student_score" in existing :
+        return
+
+    keep = { } ##key -> (id ,score)
+    merged = set()
+    duplicates = [ ]
+    with Engine.connect() as conn :
+        rows = conn.execute(select(
+            StudentScore.id ,StudentScore.student_class ,StudentScore.roll_num ,StudentScore.state ,StudentScore.score
+        ).order_by(StudentScore.id)).all()
+    for row_id ,student_class ,roll_num ,state ,score in rows :
+        key = (student_class ,roll_num ,state)
+        if key in keep :
+            keep[key] = (keep[key][0] ,keep[key][1] + (score or 0))
+            merged.add(key)
+            duplicates.append(row_id)
+        else:
+            keep[key] = (row_id ,score or 0)
+
+    if len(duplicates) > 0 :
+        with Engine.begin() as conn :
+            for row_id ,score in [keep[key] for key in merged]:
+                conn.execute(update(StudentScore).where(StudentScore.id == row_id).values(score = score))
+            conn.execute(delete(StudentScore).where(StudentScore.id.in_(duplicates)))
+    print(f"{table.name} : {len(duplicates)} duplicate rows merged")
+
+    ##the plain lookup index of migration 6 is replaced by the unique one
+    if "ix_student_score_lookup" in existing :
+        lookup = Index("ix_student_score_lookup" ,table.c.student_class ,table.c.roll_num ,table.c.state)
+        table.indexes.discard(lookup) ##not part of the model any more
+        lookup.drop(Engine)
+    for index in table.indexes :
+        if index.name == "uq_student_score" :
+            index.create(Engine)
+
+
+##queue table of the background jobs (job_queue)
+def jobs():
+    import job_db
+    job_db.Base.metadata.create_all(Engine)
+
+
+##a job key can be queued once ,makes file ingestion idempotent on its content hash
+def job_key_unique():
+    from job_db import Job
+    table = Job.__table__
+
+    existing = [index["name"] for index in inspect(Engine).get_indexes(table.name)]
+    if "ix_job_key" in existing :
+        lookup = Index("ix_job_key" ,table.c.kind ,table.c.key)
+        table.indexes.discard(lookup) ##not part of the model any more
+        lookup.drop(Engine)
+    for index in table.indexes :
+        if index.name == "uq_job_key" and index.name not in existing :
+            index.create(Engine)
+
+
+##question_hash no longer drops operators and signs ,every stored solution is hashed again
+def solution_question_rehash():
+    from question_bank import Solution ,question_hash
+
+    session = Session()
+    last_id ,changed = 0 ,0
+    while True :
+        objs = session.query(Solution).filter(Solution.id > last_id).order_by(Solution.id).limit(500).all()
+        if len(objs) == 0 :
+            break
+        for obj in objs :
+            new_hash = question_hash(obj.question or "")
+            if obj.question_hash != new_hash :
+                obj.question_hash = new_hash
+                changed += 1
+        last_id = objs[-1].id
+        session.commit()
+    session.close()
+    print(f"{Solution.__tablename__} : {changed} question hashes updated")
+
+
+##explanation tracking sessions ,shared by every worker process (explanation_store)
+def explanation_sessions():
+    import explanation_db
+    explanation_db.Base.metadata.create_all(Engine)
+
+
+MIGRATIONS = [
+    (1 ,"baseline" ,baseline),
+    (2 ,"context_vector_blobs" ,context_vector_blobs),
+    (3 ,"theory_chunk_hashes" ,theory_chunk_hashes),
+    (4 ,"doubt_cache_columns" ,doubt_cache_columns),
+    (5 ,"solution_question_hash" ,solution_question_hash),
+    (6 ,"question_bank_indexes" ,question_bank_indexes),
+    (7 ,"curriculum_catalog" ,curriculum_catalog),
+    (8 ,"student_score_unique" ,student_score_unique),
+    (9 ,"jobs" ,jobs),
+    (10 ,"job_key_unique" ,job_key_unique),
+    (11 ,"solution_question_rehash" ,solution_question_rehash),
+    (12 ,"explanation_sessions" ,explanation_sessions),
+]
@@ -1,9 +1,14 @@
-from dotenv import load_dotenv
-from google import genai
+from concurrent.futures import ThreadPoolExecutor
+from llm_gateway import llm_gateway
+from settings import settings
+import fitz
+import uuid
 import json
 import os
 
-load_dotenv(override=True) # Looks for a .env file by default
+
+##job kind of the /teacher/numericprob ingestion
+NUMERIC_INGEST_JOB = "numeric_ingest"
 
 raw_cont_extract_prmpt = """Extract all the contents from the attached file and provide the response exactly as it provided in the file. Do not modify, add, or remove anything from the original content."""
 
@@ -24,11 +29,10 @@ Do not modify, add, or remove anything from the original content ,just explain t
 
 
 class NumericProbExtractor : 
-    client = genai.Client(api_key = os.getenv("GOOGLE_API_KEY"))
-    model = os.getenv("LANGUAGE_MODEL_ID")
+    model = settings.get("LANGUAGE_MODEL_ID")
 
     def __init__(self ,file_link):
-        self.file = self.client.files.upload(file = file_link)
+        self.file = llm_gateway.upload(file = file_link ,caller = "NumericProbExtractor")
     
     def extract(self):
         raw_cnt = self.__extract_raw_content()
@@ -36,18 +40,20 @@ class NumericProbExtractor :
 
     def __extract_raw_content(self):
         content = [self.file ,raw_cont_extract_prmpt]
-        result = self.client.models.generate_content(
+        result = llm_gateway.generate(
             model = self.model,
-            contents =content
-        ).text
+            contents =content,
+            caller = "NumericProbExtractor.raw_content"
+        )
         return result
     
     def __unstruct_to_struct(self ,raw_cont):
         prmpt = unstruct_to_struct_prmpt.format(unstructured_data = raw_cont)
-        result = self.client.models.generate_content(
+        result = llm_gateway.generate(
             model = self.model,
-            contents = prmpt
-        ).text
+            contents = prmpt,
+            caller = "NumericProbExtractor.structure"
+        )
         return self.__extract_list(response = result)
         
     def __extract_list(self ,response):
@@ -63,13 +69,49 @@ class NumericProbExtractor :
             return json.loads( response[i1 : i2 + 1] )
 
 
-        
-
-
-
-        
-        
-
-
-       
-    
\ No newline at end of file
+##(first ,last) page of every range ,0 based and inclusive
+def page_ranges(page_count ,pages_per_range):
+    return [(first ,min(first + pages_per_range ,page_count) - 1) for first in range(0 ,page_count ,pages_per_range)]
+
+
+##problems of a whole pdf ,large pdfs are split into ranges of NUMERIC_PAGES_PER_RANGE pages that are uploaded and
+##extracted in parallel (NUMERIC_INGEST_WORKERS at a time). on_progress(range ,stage) reports every range ,a failing
+##range fails the whole pdf so nothing is stored half done. a problem running over a range boundary is cut in two.
+def extract_pdf(pdf_bytes ,folder ,on_progress = None):
+    pages_per_range = int(settings.get("NUMERIC_PAGES_PER_RANGE" ,10))
+    workers = int(settings.get("NUMERIC_INGEST_WORKERS" ,4))
+    progress = on_progress or (lambda part ,stage : None)
+
+    ##splitting up front ,fitz documents are not shared between threads
+    parts = [ ]
+    doc = fitz.open(stream = pdf_bytes ,filetype = "pdf")
+    try :
+        for first ,last in page_ranges(doc.page_count ,pages_per_range):
+            part = fitz.open()
+            part.insert_pdf(doc ,from_page = first ,to_page = last)
+            path = os.path.join(folder ,f"numeric_{uuid.uuid4().hex}.pdf")
+            part.save(path)
+            part.close()
+            parts.append((f"pages {first + 1}-{last + 1}" ,path))
+            progress(parts[-1][0] ,"queued")
+    finally :
+        doc.close()
+
+    def run(label ,path):
+        progress(label ,"extracting")
+        try :
+            problems = NumericProbExtractor(file_link = path).extract()
+        except Exception :
+            progress(label ,"failed")
+            raise
+        progress(label ,"done")
+        return problems
+
+    try :
+        with ThreadPoolExecutor(max_workers = max(1 ,min(workers ,len(parts)))) as executor :
+            results = list(executor.map(lambda part : run(*part) ,parts))
+    finally :
+        for label ,path in parts :
+            os.remove(path)
+
+    return [problem for problems in results for problem in problems]
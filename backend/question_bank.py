@@ -1,16 +1,33 @@
 from sqlalchemy import create_engine
-from sqlalchemy import Column, Integer, String ,Text ,ForeignKey ,DATETIME
+from sqlalchemy import Column, Integer, String ,Text ,ForeignKey ,DATETIME ,LargeBinary ,Index ,UniqueConstraint
 from sqlalchemy.orm import declarative_base
-from dotenv import load_dotenv
 from db_engine import Engine
-import os
+import hashlib
+import re
 
-load_dotenv(override = True)
 Base = declarative_base()
 
 
+##ocr output differs in case ,spacing and the closing punctuation ,none of which changes the question.
+##operators ,signs and brackets are kept :- "2x = -4" and "2x = 4" are different problems
+def normalise_question(question):
+    question = " ".join(question.lower().split())
+    return re.sub(r"[\s.?!,;:]+$" ,"" ,question)
+
+
+def question_hash(question):
+    return hashlib.sha256(normalise_question(question).encode("utf-8")).hexdigest()
+
+
 class Question(Base): 
     __tablename__ = "Question"    
+    __table_args__ = (
+        ##attend_assignment and student_availabilty ,mysql indexes only a prefix of text columns
+        Index("ix_question_lookup" ,"student_class" ,"subject" ,"chapter" ,"state" ,"suptopic",
+              mysql_length = {"subject" : 64 ,"chapter" : 191 ,"state" : 64 ,"suptopic" : 191}),
+        ##fetch_availablity filters on state alone
+        Index("ix_question_state" ,"state" ,"student_class" ,mysql_length = {"state" : 64}),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     state = Column(Text)
@@ -26,11 +43,34 @@ class Question(Base):
 
 class Options(Base):
     __tablename__ = "Options"
+    __table_args__ = (
+        Index("ix_options_question" ,"question_id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     statement = Column(Text)  # Changed to Text to accommodate longer option text
     question_id = Column(Integer, ForeignKey('Question.id'))
 
+##question counts per class ,subject ,chapter ,state and subtopic ,maintained by McqGenerationCache.store
+class CurriculumCatalog(Base):
+    __tablename__ = "CurriculumCatalog"
+    __table_args__ = (UniqueConstraint("student_class" ,"subject" ,"chapter" ,"state" ,"suptopic"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    student_class = Column(Integer)
+    subject = Column(String(128))
+    chapter = Column(String(255))
+    state = Column(String(64))
+    suptopic = Column(String(255))
+    q_count = Column(Integer)
+
+##single row ,bumped on every catalog change so each worker knows when to reload its copy
+class CatalogVersion(Base):
+    __tablename__ = "CatalogVersion"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer)
+
 class SubtopicDescribe(Base):
     __tablename__ = "SuptopicDescribe"
     
@@ -53,6 +93,9 @@ class SubtopicExplainer(Base):
 
 class Solution(Base):
     __tablename__ = "Solution"
+    __table_args__ = (
+        Index("ix_solution_question_hash" ,"question_hash"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     relative_id = Column(Text) ##{class}_{subj}_{chap}
@@ -60,6 +103,8 @@ class Solution(Base):
     solution = Column(Text)
     explanation = Column(Text)
     q_type = Column(Text)
+    question_hash = Column(String(64)) ##sha256 of the normalised question
+    q_vector = Column(LargeBinary) ##float32 embedding of question ,used for near duplicate matching
 
 
 class DoubtResolution(Base):
@@ -73,6 +118,9 @@ class DoubtResolution(Base):
     img = Column(Text)
     access_url = Column(Text)
     expiration = Column(DATETIME)
+    state = Column(Text) ##explanations are tailored per state
+    q_vector = Column(LargeBinary) ##float32 embedding of question ,used by the doubt answer cache
+    mcqs = Column(Text) ##json list of the mcqs generated with the explanation
 
 
 
@@ -84,3 +132,9 @@ if __name__ == "__main__":
             print( "Tables created succesfully")
         except Exception as e:
             print(f"db_creation : error occurred: {e}")
+
+    ##existing databases are upgraded with python -m migrations ,embedding old solutions calls vertex so it stays a separate step
+    inp = input( "embed_existing_solutions(y/n) : ")
+    if inp == "y" :
+        from solution_generator import index_solutions
+        print( f"Solution : {index_solutions()} rows indexed")
@@ -1,42 +1,9 @@
 from .language_translator import Language_translor 
 from .regional_transformer import RegionalTransformer
+from .states import state_language
 import copy
 import json
 
-##state to mother tongue mapping  
-state_language = {
-    "Andhra Pradesh": "Telugu",
-    "Arunachal Pradesh": "English",
-    "Assam": "Assamese",
-    "Bihar": "Hindi",
-    "Chhattisgarh": "Hindi",
-    "Goa": "Konkani",
-    "Gujarat": "Gujarati",
-    "Haryana": "Hindi",
-    "Himachal Pradesh": "Hindi",
-    "Jharkhand": "Hindi",
-    "Karnataka": "Kannada",
-    "Kerala": "Malayalam",
-    "Madhya Pradesh": "Hindi",
-    "Maharashtra": "Marathi",
-    "Manipur": "Manipuri",
-    "Meghalaya": "English",
-    "Mizoram": "Mizo",
-    "Nagaland": "English",
-    "Odisha": "Odia",
-    "Punjab": "Punjabi",
-    "Rajasthan": "Hindi",
-    "Sikkim": "Nepali",
-    "Tamil Nadu": "Tamil",
-    "Telangana": "Telugu",
-    "Tripura": "Bengali", 
-    "Uttar Pradesh": "Hindi",
-    "Uttarakhand": "Hindi",
-    "West Bengal": "Bengali",
-    "Delhi": "Hindi",
-    "Jammu and Kashmir": "Kashmiri" 
-}
-
 class RegionalInterface : 
     def __init__(self ,state ,age):
         assert state in state_language.keys() ,"the state is not supported by the system"
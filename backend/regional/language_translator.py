@@ -1,23 +1,15 @@
 from langdetect import detect
-from google import genai
+from llm_gateway import llm_gateway
+from settings import settings
 import pycountry
-from pathlib import Path
-from dotenv import load_dotenv
-import os 
-
-# Always relative to the script location
-dotenv_path = Path(__file__).resolve().parent / ".." / ".env"
-load_dotenv(dotenv_path=dotenv_path.resolve())
 
 
 class Language_translor: 
 
   def __init__(self):
-    self.api_key = os.getenv("GOOGLE_API_KEY")
-    self.model = os.getenv("LANGUAGE_MODEL_ID")
+    self.model = settings.get("LANGUAGE_MODEL_ID")
     self.max_output_tokens = 150
     self.__set_prompt_format() 
-    self.client = genai.Client(api_key = self.api_key )
     self.max_cycles = 5
     
   def __set_prompt_format(self):
@@ -38,10 +30,12 @@ Translate the provided input text from the specified source language to the targ
   def translate(self ,source ,target ,inp ,output_format):
     response = None    
     formated_prompt = self.prompt.format(source ,target ,output_format ,inp)
-    response = self.client.models.generate_content(
+    response = llm_gateway.generate(
         model=self.model,
         contents = formated_prompt,
-    ).text
+        caller = "Language_translor.translate",
+        cache_ttl = 30 * 24 * 3600 ##identical batches translate identically
+    )
     return response 
       
       
@@ -0,0 +1,79 @@
+from .interface import RegionalInterface ,state_language
+from concurrent.futures import ThreadPoolExecutor
+from settings import settings
+import copy
+
+
+class RegionalPipeline :
+    """runs regional transform + translation for many states in parallel ,each state succeeds or fails on its own"""
+
+    def __init__(self ,age ,subtopics ,is_region_transform ,max_workers = None):
+        assert isinstance(subtopics ,list) ,"subtopics shoudl be a list data type"
+        self.age = age
+        self.subtopics = subtopics
+        self.is_region_transform = is_region_transform
+        self.max_workers = max_workers or int(settings.get("REGION_PIPELINE_WORKERS" ,6))
+
+    ##on_progress(state ,stage) is called as every state moves through its stages
+    def run(self ,states ,example_mcqs ,normal_mcqs ,on_progress = None):
+        states = [state for state in states if state != "common"]
+        if len(states) == 0:
+            return { } ,{ }
+
+        with ThreadPoolExecutor(max_workers = min(self.max_workers ,len(states))) as executor :
+            futures = [
+                executor.submit(self.__run_state ,state ,example_mcqs ,normal_mcqs ,on_progress) for state in states
+            ]
+
+        mcq_dict = { }
+        failed = { }
+        for state ,future in zip(states ,futures):
+            try :
+                state_mcqs ,lang_mcqs = future.result()
+                mcq_dict[state] = state_mcqs
+                mcq_dict[state_language[state]] = lang_mcqs
+            except Exception as e:
+                print(f"ERROR : RegionalPipeline.{state} :-" ,e)
+                self.__progress(on_progress ,state ,"failed")
+                failed[state] = str(e)
+
+        return mcq_dict ,failed
+
+    def __run_state(self ,state ,example_mcqs ,normal_mcqs ,on_progress):
+        self.__progress(on_progress ,state ,"regional_content")
+        state_converter = RegionalInterface(
+            state = state ,
+            age = self.age ,
+        )
+
+        ##if regional transformation needed (only for example based questions)
+        if self.is_region_transform and len(example_mcqs) > 0 :
+            self.__progress(on_progress ,state ,"transform")
+            state_exmp = state_converter.transform(
+                mcqs = example_mcqs ,
+                subtopics = self.subtopics
+            )
+            if len(state_exmp) == 0 :
+                raise RuntimeError("regional transformation failed")
+        else:
+            state_exmp = copy.deepcopy(example_mcqs)
+
+        ##state transformed mcqs in english
+        state_mcqs = state_exmp + copy.deepcopy(normal_mcqs)
+
+        ##translating to regional language
+        self.__progress(on_progress ,state ,"translate")
+        lang_mcqs = state_converter.translate(
+            mcqs = state_mcqs,
+            subtopics = self.subtopics
+        )
+        if len(state_mcqs) > 0 and len(lang_mcqs) == 0 :
+            raise RuntimeError("regional translation failed")
+
+        self.__progress(on_progress ,state ,"done")
+        return state_mcqs ,lang_mcqs
+
+    def __progress(self ,on_progress ,state ,stage):
+        print(f"regional pipeline : {state} -> {stage}")
+        if on_progress is not None :
+            on_progress(state ,stage)
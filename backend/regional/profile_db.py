@@ -0,0 +1,25 @@
+from sqlalchemy import Column ,Integer ,String ,Text ,DateTime ,UniqueConstraint
+from sqlalchemy.orm import declarative_base
+from db_engine import Engine
+
+Base = declarative_base()
+
+##lifestyle profile of children in a state ,used as reference by the regional transformer
+class RegionalProfile(Base):
+    __tablename__ = "RegionalProfile"
+    __table_args__ = (UniqueConstraint("state" ,"version"),)
+
+    id = Column(Integer, primary_key=True ,autoincrement=True)
+    state = Column(String(64))
+    version = Column(Integer) ##bumped whenever the profile prompt changes
+    content = Column(Text)
+    created = Column(DateTime)
+
+if __name__ == "__main__" :
+    inp = input( "start_creating_tables(y/n) : ")
+    if inp == "y" :
+        try:
+            Base.metadata.create_all(Engine)
+            print( "Tables created succesfully")
+        except Exception as e:
+            print(f"db_creation : error occurred: {e}")
@@ -0,0 +1,187 @@
+from .profile_db import RegionalProfile
+from .regional_content import RegionalContentGenerator
+from .states import state_language
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select ,update
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime ,timedelta
+from db_engine import Engine
+from settings import settings
+import threading
+
+Session = sessionmaker(bind = Engine)
+
+
+class RegionalProfileStore :
+    """one regional lifestyle profile per state ,generated once and served from memory
+
+    profiles are filled by warm_up (python -m regional.profile_store) ,loaded lazily from the RegionalProfile table and
+    regenerated by a background thread once they are older than REGION_PROFILE_MAX_AGE_DAYS. a state that was never
+    warmed up is generated on first use and stored for everyone else.
+
+    a stale row is claimed with a conditional update on its created time before it is regenerated ,so one worker
+    calls the llm and the others reload the row.
+    """
+    version = 1 ##bump when RegionalContentGenerator's prompt changes ,old rows are then ignored
+
+    def __init__(self):
+        self.generator = RegionalContentGenerator()
+        self.max_age = timedelta(days = int(settings.get("REGION_PROFILE_MAX_AGE_DAYS" ,30)))
+        self.__profiles = { } ##state -> (content ,created)
+        self.__is_loaded = False
+        self.__refresher = None
+        self.__stop = threading.Event()
+        self.__lock = threading.Lock()
+
+    def get(self ,state):
+        assert state in state_language.keys() ,"the state is not supported by the system"
+        self.__load()
+
+        if state not in self.__profiles :
+            self.refresh(state = state)
+        return self.__profiles[state][0]
+
+    ##regenerating the profile of a state and storing it
+    def refresh(self ,state):
+        content = self.generator.generate(state = state)
+        created = datetime.now()
+
+        session = Session()
+        try :
+            obj = session.query(RegionalProfile).filter(
+                RegionalProfile.state == state,
+                RegionalProfile.version == self.version
+            ).first()
+
+            if obj is None :
+                session.add(RegionalProfile(state = state ,version = self.version ,content = content ,created = created))
+            else:
+                obj.content = content
+                obj.created = created
+            session.commit()
+        except IntegrityError :
+            session.rollback() ##another worker stored this state first
+        finally:
+            session.close()
+
+        with self.__lock :
+            self.__profiles[state] = (content ,created)
+        return content
+
+    ##generating every missing or stale profile in parallel
+    def warm_up(self ,states = None ,max_workers = 6):
+        self.__load()
+        states = states or list(state_language.keys())
+        pending = [state for state in states if self.__is_stale(state)]
+
+        if len(pending) > 0 :
+            with ThreadPoolExecutor(max_workers = max_workers) as executor :
+                list(executor.map(self.refresh_stale ,pending))
+        return pending
+
+    ##regenerating the profile of a state unless another worker did it or is doing it
+    def refresh_stale(self ,state):
+        row = self.__row(state)
+        if row is None :
+            return self.refresh(state = state)
+        if datetime.now() - row.created <= self.max_age :
+            return self.__keep(state ,row.content ,row.created)
+
+        ##mysql datetime keeps whole seconds ,the claim must compare equal once stored
+        claimed_at = datetime.now().replace(microsecond = 0)
+        with Engine.begin() as conn :
+            claimed = conn.execute(update(RegionalProfile).where(
+                RegionalProfile.id == row.id,
+                RegionalProfile.created == row.created
+            ).values(created = claimed_at)).rowcount
+
+        if claimed != 1 :
+            row = self.__row(state) ##regenerated (or being regenerated) by another worker
+            return self.__keep(state ,row.content ,row.created)
+
+        try :
+            content = self.generator.generate(state = state)
+        except Exception :
+            ##giving the claim back so the next round retries
+            with Engine.begin() as conn :
+                conn.execute(update(RegionalProfile).where(
+                    RegionalProfile.id == row.id,
+                    RegionalProfile.created == claimed_at
+                ).values(created = row.created))
+            raise
+
+        created = datetime.now()
+        with Engine.begin() as conn :
+            conn.execute(update(RegionalProfile).where(RegionalProfile.id == row.id).values(content = content ,created = created))
+        return self.__keep(state ,content ,created)
+
+    ##daemon thread regenerating profiles that went stale
+    def start_refresher(self ,interval = None):
+        interval = interval or int(settings.get("REGION_PROFILE_REFRESH_INTERVAL" ,6 * 3600))
+
+        with self.__lock :
+            if self.__refresher is not None and self.__refresher.is_alive():
+                return
+            self.__stop.clear()
+            self.__refresher = threading.Thread(target = self.__refresh_loop ,args = (interval ,) ,daemon = True)
+            self.__refresher.start()
+
+    def stop(self ,timeout = None):
+        self.__stop.set()
+        with self.__lock :
+            refresher = self.__refresher
+        if refresher is not None :
+            refresher.join(timeout)
+
+    def __refresh_loop(self ,interval):
+        while not self.__stop.wait(interval):
+            try :
+                self.__load()
+                stale = [state for state in list(self.__profiles.keys()) if self.__is_stale(state)]
+                for state in stale :
+                    if self.__stop.is_set():
+                        return
+                    self.refresh_stale(state = state)
+            except Exception as e:
+                print("ERROR : RegionalProfileStore.refresh :-" ,e)
+
+    def __row(self ,state):
+        with Engine.connect() as conn :
+            return conn.execute(select(RegionalProfile.id ,RegionalProfile.content ,RegionalProfile.created).where(
+                RegionalProfile.state == state,
+                RegionalProfile.version == self.version
+            )).first()
+
+    def __keep(self ,state ,content ,created):
+        with self.__lock :
+            self.__profiles[state] = (content ,created)
+        return content
+
+    def __is_stale(self ,state):
+        if state not in self.__profiles :
+            return True
+        return datetime.now() - self.__profiles[state][1] > self.max_age
+
+    def __load(self):
+        if self.__is_loaded :
+            return
+
+        session = Session()
+        objs = session.query(RegionalProfile).filter(RegionalProfile.version == self.version).all()
+        session.close()
+
+        with self.__lock :
+            for obj in objs :
+                self.__profiles[obj.state] = (obj.content ,obj.created)
+            self.__is_loaded = True
+
+
+regional_profile_store = RegionalProfileStore()
+
+
+if __name__ == "__main__" :
+    inp = input( "warm_up_regional_profiles(y/n) : ")
+    if inp == "y" :
+        generated = regional_profile_store.warm_up()
+        print( "profiles generated for :" ,generated)
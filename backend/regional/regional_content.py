@@ -1,29 +1,21 @@
-from google import genai
-from pathlib import Path
-from dotenv import load_dotenv
-import os 
-
-# Always relative to the script location
-dotenv_path = Path(__file__).resolve().parent / ".." / ".env"
-load_dotenv(dotenv_path=dotenv_path.resolve())
+from llm_gateway import llm_gateway
+from settings import settings
 
 
 class RegionalContentGenerator : 
 
     def __init__(self):
-        ##google gemini api access  
-        self.model = os.getenv("LANGUAGE_MODEL_ID")
-        self.client = genai.Client(
-            api_key = os.getenv("GOOGLE_API_KEY")
-        )
+        ##google gemini model ,calls go through the shared gateway
+        self.model = settings.get("LANGUAGE_MODEL_ID")
     
     def generate(self ,state):
         formated_prompt = self.__prompt(state = state)
         
-        response = self.client.models.generate_content(
+        response = llm_gateway.generate(
             model=self.model,
             contents = formated_prompt,
-        ).text
+            caller = "RegionalContentGenerator.generate"
+        )
 
         return response 
         
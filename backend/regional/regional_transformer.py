@@ -1,25 +1,16 @@
-from .regional_content import RegionalContentGenerator
-from google import genai
+from .profile_store import regional_profile_store
+from llm_gateway import llm_gateway
+from settings import settings
 import json
-from pathlib import Path
-from dotenv import load_dotenv
-import os 
 
-# Always relative to the script location
-dotenv_path = Path(__file__).resolve().parent / ".." / ".env"
-load_dotenv(dotenv_path=dotenv_path.resolve())
-
-
-regional_cnt_generator = RegionalContentGenerator()
 
 class RegionalTransformer : 
 
     def __init__(self ,state ,age):
         self.state = state  
         self.age = age 
-        self.model = os.getenv("LANGUAGE_MODEL_ID")
-        self.client = genai.Client(api_key = os.getenv("GOOGLE_API_KEY"))
-        self.regional_data = regional_cnt_generator.generate(state = state)
+        self.model = settings.get("LANGUAGE_MODEL_ID")
+        self.regional_data = regional_profile_store.get(state = state) ##served from memory ,see profile_store
 
     
     def transform( self ,mcq_list ): 
@@ -29,10 +20,12 @@ class RegionalTransformer :
         formted_prompt = self.__prompt(mcq_list = mcq_list)
                 
         ##perform convertion
-        response = self.client.models.generate_content(
+        response = llm_gateway.generate(
             model=self.model,
             contents = formted_prompt,
-        ).text
+            caller = "RegionalTransformer.transform",
+            cache_ttl = 7 * 24 * 3600
+        )
 
         response = self.__extract_list(response = response)
         n = min(len(response) ,len(mcq_list))
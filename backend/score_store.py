@@ -0,0 +1,163 @@
+from user_engagement_db import StudentScore
+from sqlalchemy import select ,update ,insert
+from sqlalchemy.exc import IntegrityError
+from db_engine import Engine
+from settings import settings
+import threading
+import atexit
+
+
+class ScoreStore :
+    """engagement points of students
+
+    every change is a single atomic UPDATE score = score + delta ,a missing row is created with an upsert on the
+    unique (student_class ,roll_num ,state) key ,so concurrent awards never overwrite each other.
+
+    with SCORE_WRITE_BEHIND=1 awards are only added to an in-memory buffer ,increments of the same student are
+    coalesced and written every SCORE_FLUSH_INTERVAL seconds (and at exit). reads include the buffered points of
+    this process ,points buffered by other worker processes show up after their next flush.
+    """
+
+    def __init__(self ,write_behind = None ,flush_interval = None):
+        self.write_behind = write_behind if write_behind is not None else settings.get("SCORE_WRITE_BEHIND" ,"0") == "1"
+        self.flush_interval = flush_interval or float(settings.get("SCORE_FLUSH_INTERVAL" ,5))
+        self.__pending = { } ##(student_class ,roll_num ,state) -> delta
+        self.__known = set() ##keys known to have a row
+        self.__counts = {"awards" : 0 ,"flushes" : 0 ,"rows_flushed" : 0}
+        self.__lock = threading.Lock()
+        self.__flusher = None
+        self.__exit_hook = False
+
+    ##current score ,the row is created with 0 points when create is set
+    def get(self ,student_class ,roll_num ,state ,create = True):
+        key = (student_class ,roll_num ,state)
+        with Engine.connect() as conn :
+            score = conn.execute(select(StudentScore.score).where(*self.__match(key))).scalar()
+
+        if score is None :
+            if not create :
+                return None
+            self.__upsert(key ,0)
+            score = 0
+
+        with self.__lock :
+            self.__known.add(key)
+            return score + self.__pending.get(key ,0)
+
+    ##returns False when the student has no row and create is not set
+    def add(self ,student_class ,roll_num ,state ,delta ,create = True):
+        key = (student_class ,roll_num ,state)
+        with self.__lock :
+            self.__counts["awards"] += 1
+            known = key in self.__known
+
+        if self.write_behind :
+            self.start_flusher() ##started on first use ,so every forked worker runs its own
+            if not known and not create and self.get(student_class ,roll_num ,state ,create = False) is None :
+                return False
+            with self.__lock :
+                self.__pending[key] = self.__pending.get(key ,0) + delta
+            return True
+
+        with Engine.begin() as conn :
+            updated = conn.execute(
+                update(StudentScore).where(*self.__match(key)).values(score = StudentScore.score + delta)
+            ).rowcount
+
+        if updated == 0 :
+            if not create :
+                return False
+            self.__upsert(key ,delta)
+
+        with self.__lock :
+            self.__known.add(key)
+        return True
+
+    ##writes the buffered increments ,one atomic update per student
+    def flush(self):
+        with self.__lock :
+            pending ,self.__pending = self.__pending ,{ }
+
+        failed = { }
+        for key ,delta in pending.items():
+            try :
+                with Engine.begin() as conn :
+                    updated = conn.execute(
+                        update(StudentScore).where(*self.__match(key)).values(score = StudentScore.score + delta)
+                    ).rowcount
+                if updated == 0 :
+                    self.__upsert(key ,delta)
+            except Exception as e :
+                print("ERROR : ScoreStore.flush :-" ,e)
+                failed[key] = delta
+
+        with self.__lock :
+            for key ,delta in failed.items(): ##kept for the next flush
+                self.__pending[key] = self.__pending.get(key ,0) + delta
+            self.__counts["flushes"] += 1
+            self.__counts["rows_flushed"] += len(pending) - len(failed)
+
+    def start_flusher(self):
+        with self.__lock :
+            if self.__flusher is not None and self.__flusher.is_alive():
+                return
+
+            stop = threading.Event()
+
+            def loop():
+                while not stop.wait(self.flush_interval):
+                    self.flush()
+
+            self.__flusher = threading.Thread(target = loop ,daemon = True ,name = "score-flusher")
+            self.__flusher.start()
+            if not self.__exit_hook :
+                atexit.register(self.flush)
+                self.__exit_hook = True
+
+    def stats(self):
+        with self.__lock :
+            report = dict(self.__counts)
+            report["pending"] = len(self.__pending)
+        report["write_behind"] = self.write_behind
+        return report
+
+    def __match(self ,key):
+        return (
+            StudentScore.student_class == key[0],
+            StudentScore.roll_num == key[1],
+            StudentScore.state == key[2]
+        )
+
+    ##insert or add on the unique (student_class ,roll_num ,state) key
+    def __upsert(self ,key ,delta):
+        values = {"student_class" : key[0] ,"roll_num" : key[1] ,"state" : key[2] ,"score" : delta}
+        dialect = Engine.dialect.name
+
+        if dialect == "mysql" :
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+            stmt = mysql_insert(StudentScore).values(**values)
+            stmt = stmt.on_duplicate_key_update(score = StudentScore.score + stmt.inserted.score)
+        elif dialect in ("sqlite" ,"postgresql") :
+            if dialect == "sqlite" :
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            stmt = dialect_insert(StudentScore).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements = ["student_class" ,"roll_num" ,"state"],
+                set_ = {"score" : StudentScore.score + stmt.excluded.score}
+            )
+        else:
+            try :
+                with Engine.begin() as conn :
+                    conn.execute(insert(StudentScore).values(**values))
+            except IntegrityError : ##created by someone else meanwhile
+                with Engine.begin() as conn :
+                    conn.execute(update(StudentScore).where(*self.__match(key)).values(score = StudentScore.score + delta))
+            return
+
+        with Engine.begin() as conn :
+            conn.execute(stmt)
+
+
+score_store = ScoreStore()
@@ -1,10 +1,13 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter # type: ignore ## split the document into smaller chunks 
-from sklearn.metrics.pairwise import cosine_similarity
 from sqlalchemy.orm import sessionmaker
 from embedder import Embedder
-from context_db import TheoryContext ,NumericProblemContext
+from context_db import TheoryContext ,NumericProblemContext ,chunk_hash
+from vector_store import to_blob ,load_matrix
+from vector_index import build_index
+from sqlalchemy.exc import IntegrityError
 from db_engine import Engine
-import numpy as np 
+import functools
+import threading
+import sys
 
 Session = sessionmaker(bind=Engine)
 
@@ -12,74 +15,135 @@ class SemanticSearch:
     embedder = Embedder()
     min_similarity = 0.50
     k = 5
+
+    ##vectors live only inside the index (exact or ann ,see vector_index)
+    def _build_index(self ,objs):
+        self.index = build_index(load_matrix(objs))
     
+    ##for every query ,(row ,similarity) pairs of the k closest rows above min_similarity
+    ##all the queries are embedded in one request and scored together
+    def _nearest_many(self ,queries):
+        if len(queries) == 0 :
+            return [ ]
+        return self._nearest_vectors(self.embedder.encode(list(queries)))
 
-class SimTheory(SemanticSearch):
-    text_spliter = RecursiveCharacterTextSplitter(
+    def _nearest_vectors(self ,query_embeddings):
+        results = self.index.search_many(query_embeddings ,k = self.k ,min_similarity = self.min_similarity)
+        return [list(zip(rows.tolist() ,sims.tolist())) for rows ,sims in results]
+
+    def search(self ,query):
+        return self.search_many([query])[0]
+
+    def search_many(self ,queries):
+        if len(self.index) == 0:
+            return [self._result([ ]) for query in queries]
+        return [self._result(nearest) for nearest in self._nearest_many(queries)]
+
+    ##asyncio versions ,only the embedding request is awaited ,the index lookup itself is in memory
+    async def asearch(self ,query):
+        return (await self.asearch_many([query]))[0]
+
+    async def asearch_many(self ,queries):
+        if len(self.index) == 0 or len(queries) == 0:
+            return [self._result([ ]) for query in queries]
+        query_embeddings = await self.embedder.aencode(list(queries))
+        return [self._result(nearest) for nearest in self._nearest_vectors(query_embeddings)]
+
+    ##approximate resident size ,used by the context registry for eviction
+    def nbytes(self):
+        return self.index.nbytes + sum(sys.getsizeof(txt) for txt in self._texts())
+    
+
+## split the document into smaller chunks ,langchain is imported when the first chapter is added
+@functools.lru_cache(maxsize = None)
+def text_spliter():
+    from langchain_text_splitters import RecursiveCharacterTextSplitter # type: ignore
+    return RecursiveCharacterTextSplitter(
         separators=["\n\n", "\n", "."],
         chunk_size=500,
         chunk_overlap=100
     )
 
+
+class SimTheory(SemanticSearch):
+
     def __init__(self, stud_clss, subj, chap):
         self.common_id = f"{stud_clss}_{subj}_{chap}"
         session = Session()
-        self.objs = session.query(TheoryContext).filter(TheoryContext.relative_id == self.common_id).all()
-        self.chunks = [obj.chunk for obj in self.objs]
-        self.embeddings = np.array([obj.text_vector for obj in self.objs])
+        objs = session.query(TheoryContext).filter(TheoryContext.relative_id == self.common_id).all()
+        self.chunks = [obj.chunk for obj in objs]
+        self.hashes = set(obj.chunk_hash or chunk_hash(obj.chunk) for obj in objs)
+        self._build_index(objs) ##rows are not kept ,the index holds the vectors
         session.close()
+        self.__add_lock = threading.Lock()
+
+    def _texts(self):
+        return self.chunks
     
+    ##incremental :- only chunks not stored for this chapter yet are embedded and inserted
     def add(self, text):
         assert isinstance(text, str), "text should be a string"
-         
-        if len(self.objs) > 0:
-            print(f"{self.common_id} already exists")
 
-        new_chunks = self.text_spliter.split_text(text=text)
-        new_embeddings = self.embedder.encode(new_chunks).tolist()
-        
-        self.objs += self.__store(new_chunks, new_embeddings)
-        self.chunks += new_chunks
+        with self.__add_lock :
+            chunks = {chunk_hash(chunk) : chunk for chunk in text_spliter().split_text(text=text)}
+            new_hashes = [key for key in chunks if key not in self.hashes]
+
+            if len(new_hashes) == 0:
+                print(f"{self.common_id} already exists")
+                return
 
-        old_embeddings = self.embeddings.tolist()
-        self.embeddings = np.array(old_embeddings + new_embeddings)
+            print(f"{self.common_id} : {len(new_hashes)} new chunks of {len(chunks)}")
+            new_chunks = [chunks[key] for key in new_hashes]
+            new_embeddings = self.embedder.encode(new_chunks)
+            
+            ##chunks inserted by another worker meanwhile are indexed too ,same text and encoder give the same vector
+            self.__store(new_chunks, new_hashes, new_embeddings)
+
+            self.hashes.update(new_hashes)
+            self.chunks += new_chunks ##texts first so a concurrent search never sees an index row without its chunk
+            self.index.add(new_embeddings)
         
-    def __store(self, new_chunks, new_embeddings):
+    ##returns positions of the chunks inserted by this call
+    def __store(self, new_chunks, new_hashes, new_embeddings):
         objs = [
             TheoryContext(
                 relative_id=self.common_id,
                 chunk=new_chunks[i],
-                text_vector=new_embeddings[i]
+                chunk_hash=new_hashes[i],
+                vector_blob=to_blob(new_embeddings[i])
             ) for i in range(len(new_chunks))
         ]
         
         session = Session()
-        session.add_all(objs)
-        session.commit()
-        session.close()
-        
-        return objs
-
-    def search(self, query):
-        if len(self.embeddings) == 0:
-            return ""
-        
-        print("Query type :" ,type(query))
-        print("Embedding_shape :" ,self.embeddings.shape) 
-        query_embedding = self.embedder.encode([query])[0]
-        if query_embedding.ndim == 1:
-            print("Reshaping the query vector")
-            query_embedding = query_embedding.reshape(1, -1)
-        print("Query shape" ,query_embedding.shape)
-
-        similarities = cosine_similarity(query_embedding, self.embeddings)[0]
-        print("Similarities :" ,similarities)
-        ranked_results = sorted(
-            zip(self.chunks, similarities), key=lambda x: x[1], reverse=True
-        )
-        
-        selected_chunks = [chunk for chunk, sim in ranked_results][:self.k]
-        return "/n".join(selected_chunks)
+        try:
+            session.add_all(objs)
+            session.commit()
+            stored = list(range(len(objs)))
+        except IntegrityError:
+            ##another worker ingested part of this chapter meanwhile ,inserting only what is still missing
+            session.rollback()
+            existing = set(key for (key,) in session.query(TheoryContext.chunk_hash).filter(
+                TheoryContext.relative_id == self.common_id,
+                TheoryContext.chunk_hash.in_(new_hashes)
+            ).all())
+            stored = [i for i in range(len(objs)) if new_hashes[i] not in existing]
+            session.add_all([
+                TheoryContext(
+                    relative_id=self.common_id,
+                    chunk=new_chunks[i],
+                    chunk_hash=new_hashes[i],
+                    vector_blob=to_blob(new_embeddings[i])
+                ) for i in stored
+            ])
+            session.commit()
+        finally:
+            session.close()
+        
+        return stored
+
+    ##knowledge base text of one query
+    def _result(self ,nearest):
+        return "/n".join([self.chunks[row] for row ,sim in nearest])
 
 
 class SimNumericProblem(SemanticSearch):
@@ -88,33 +152,39 @@ class SimNumericProblem(SemanticSearch):
         self.common_id = f"{stud_clss}_{subj}_{chap}_{state}_{school_id}"
         session = Session()
         
-        self.objs = session.query(NumericProblemContext).filter(
+        objs = session.query(NumericProblemContext).filter(
             NumericProblemContext.relative_id == self.common_id 
         ).all()
         
-        self.questions = [obj.question for obj in self.objs]
-        self.solutons = [obj.solution for obj in self.objs]
-        self.embeddings = np.array([obj.text_vector for obj in self.objs])
+        self.questions = [obj.question for obj in objs]
+        self.solutons = [obj.solution for obj in objs]
+        self._build_index(objs)
+        session.close()
+        self.__add_lock = threading.Lock()
+
+    def _texts(self):
+        return self.questions + self.solutons
     
+    ##one add at a time per chapter ,ingest jobs share this object (context_registry) across job threads
     def add(self ,new_questions ,new_soltutions):
         assert len(new_questions) == len(new_soltutions) ,"there is mismatch in number of questions and solutions"
         
-        if len(self.objs) > 0:
-            print(f"{self.common_id}-numeric problems already exists")
-
-        new_embeddings = self.embedder.encode(new_questions)
-        
-        new_objs = self.__store(
-            new_questions = new_questions , 
-            new_soltutions = new_soltutions,
-            new_embeddings = new_embeddings.tolist()
-        )
-        
-        print(new_objs ,self.objs)
-        self.objs += new_objs
-        self.questions += new_questions
-        self.solutons += new_soltutions
-        self.embeddings = np.array(self.embeddings.tolist() + new_embeddings.tolist())
+        with self.__add_lock :
+            if len(self.index) > 0:
+                print(f"{self.common_id}-numeric problems already exists")
+
+            new_embeddings = self.embedder.encode(new_questions)
+            
+            self.__store(
+                new_questions = new_questions , 
+                new_soltutions = new_soltutions,
+                new_embeddings = new_embeddings
+            )
+            
+            ##texts first so a concurrent search never sees an index row without its problem
+            self.questions += new_questions
+            self.solutons += new_soltutions
+            self.index.add(new_embeddings)
     
     def __store(self ,new_questions ,new_soltutions ,new_embeddings):
         session = Session()
@@ -123,7 +193,7 @@ class SimNumericProblem(SemanticSearch):
                 relative_id = self.common_id, 
                 question = new_questions[i],
                 solution  = new_soltutions[i],
-                text_vector = new_embeddings[i]
+                vector_blob = to_blob(new_embeddings[i])
             ) for i in range(len(new_questions))
         ]
         session.add_all(new_objs)
@@ -131,26 +201,13 @@ class SimNumericProblem(SemanticSearch):
         session.close()
         return new_objs
 
-    def search(self, query):
-        if len(self.embeddings) == 0:
-            return [ ]
-        
-        query_embedding = self.embedder.encode([query])
-        if query_embedding.ndim == 1:
-            query_embedding = query_embedding.reshape(1, -1)
-
-        similarities = cosine_similarity(query_embedding, self.embeddings)[0]
-        ranked_results = sorted(
-            zip(self.questions, self.solutons ,similarities), key=lambda x: x[2], reverse=True
-        )
-        
-        selected_q = [{
-            "question" : quest,
-            "solution" : sol,
+    ##similar solved problems of one query
+    def _result(self ,nearest):
+        return [{
+            "question" : self.questions[row],
+            "solution" : self.solutons[row],
             "sim" : sim
-        } for quest ,sol ,sim in ranked_results][:self.k]
-        
-        return selected_q
+        } for row ,sim in nearest]
 
         
 
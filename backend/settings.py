@@ -0,0 +1,19 @@
+from dotenv import load_dotenv
+import os
+
+
+class Settings :
+    """configuration of the backend ,the .env file is read once ,by the first module importing settings
+
+    every module reads its configuration through settings.get (same contract as os.getenv) instead of loading the
+    .env file again. values set in the .env file win over the environment ,as they always did.
+    """
+
+    def __init__(self):
+        load_dotenv(override = True)
+
+    def get(self ,name ,default = None):
+        return os.getenv(name ,default)
+
+
+settings = Settings()
@@ -1,14 +1,18 @@
-from dotenv import load_dotenv
-from google import genai
-from semantic_search import SimNumericProblem ,SimTheory
+from llm_gateway import llm_gateway
+from context_registry import context_registry
+from answer_index import AnswerIndex
+from vector_store import to_blob ,DTYPE
+from settings import settings
+import numpy as np
+import threading
+import asyncio
 import json
-import os
+import re
 import time
-from question_bank import Solution
+from question_bank import Solution ,question_hash
 from db_engine import Engine
 from sqlalchemy.orm import sessionmaker
 
-load_dotenv(override=True) # Looks for a .env file by default
 Session = sessionmaker(bind = Engine)
 
 
@@ -92,10 +96,65 @@ error_check_prmpt = """
 
 """
 
+
+##signed numbers and operators of a question in order ,matching numeric problems must still agree on them
+def question_numbers(question):
+    return re.findall(r"-?\d+(?:\.\d+)?|[-+*/=<>^()]" ,question)
+
+
+##a stored numeric solution answers the question only when the numbers and operators agree
+def same_problem(stored ,question ,q_type):
+    return q_type != "numeric" or question_numbers(stored) == question_numbers(question)
+
+
+##stored solutions of a chapter for one question type ,only rows carrying a question embedding take part
+def load_solutions(scope):
+    common_id ,q_type = scope
+    session = Session()
+    rows = session.query(Solution.id ,Solution.q_vector).filter(
+        Solution.relative_id == common_id,
+        Solution.q_type == q_type,
+        Solution.q_vector.isnot(None)
+    ).order_by(Solution.id).all()
+    session.close()
+
+    if len(rows) == 0:
+        return [ ] ,np.zeros((0 ,0) ,dtype = DTYPE)
+    return [row.id for row in rows] ,np.frombuffer(b"".join(row.q_vector for row in rows) ,dtype = DTYPE).reshape(len(rows) ,-1)
+
+
+##fills question_hash and q_vector of solutions stored before near duplicate matching existed
+def index_solutions(batch_size = 100):
+    from embedder import Embedder
+    embedder = Embedder()
+
+    indexed = 0
+    session = Session()
+    while True:
+        objs = session.query(Solution).filter(Solution.q_vector.is_(None)).limit(batch_size).all()
+        if len(objs) == 0:
+            break
+
+        vectors = embedder.encode([obj.question or "" for obj in objs])
+        for obj ,vector in zip(objs ,vectors):
+            obj.question_hash = question_hash(obj.question or "")
+            obj.q_vector = to_blob(vector)
+        session.commit()
+        indexed += len(objs)
+        print(f"Solution : indexed {indexed} questions")
+
+    session.close()
+    return indexed
+
+
 class SoltuionGenerator:
-    context_cache = {}
-    model = os.getenv("LANGUAGE_MODEL_ID")
-    client = genai.Client(api_key = os.getenv("GOOGLE_API_KEY"))
+    model = settings.get("LANGUAGE_MODEL_ID")
+    answers = AnswerIndex(
+        loader = load_solutions,
+        min_similarity = float(settings.get("SOLUTION_CACHE_MIN_SIM" ,0.95))
+    )
+    counts = {"exact_hits" : 0 ,"semantic_hits" : 0 ,"misses" : 0 ,"check_time" : 0.0}
+    lock = threading.Lock()
 
     def __init__(self ,stud_clss ,subj ,chap ,state ,school_id = None):
         self.stud_clss = stud_clss
@@ -111,20 +170,18 @@ class SoltuionGenerator:
         self.common_id['theory'] = f"{self.stud_clss}_{self.subj}_{self.chap}"
         self.common_id['numeric'] = f"{self.stud_clss}_{self.subj}_{self.chap}_{self.state}_{self.school_id}"
 
-        ##when the context is not cached 
-        if self.common_id['theory'] not in self.context_cache:
-            self.context_cache[ self.common_id['theory'] ] = SimTheory(self.stud_clss ,self.subj ,self.chap)
-        
-        if self.common_id['numeric'] not in self.context_cache:
-            self.context_cache[ self.common_id['numeric'] ] = SimNumericProblem(
-                stud_clss = self.stud_clss,
-                subj = self.subj,
-                chap = self.chap
-            )
+        ##chapter indexes shared with the other consumers through the registry
+        self.context = { }
+        self.context['theory'] = context_registry.theory(self.stud_clss ,self.subj ,self.chap)
+        self.context['numeric'] = context_registry.numeric(
+            stud_clss = self.stud_clss,
+            subj = self.subj,
+            chap = self.chap
+        )
         
     def solution(self ,question ,q_type):
         ##checking if solution already available in the db  
-        obj = self.__check_avail(question ,q_type)
+        obj ,q_vector = self.__check_avail(question ,q_type)
         if obj : 
             return {
                 "solution" : obj.solution,
@@ -132,63 +189,154 @@ class SoltuionGenerator:
             }
 
         ###else generating 
-        kb = self.context_cache[ self.common_id[q_type] ].search(query = question)
+        kb = self.context[q_type].search(query = question)
         
         ##if no context is available
         if len(kb) == 0:
             return {"solution" : "No context available" ,"explanation" : "No context available" }
         
+        resp = self.__generate(prmpt = self.__prompt(question = question ,q_type = q_type ,kb = kb))
+        self.__store(question = question ,q_type = q_type ,resp = resp ,q_vector = q_vector)
+
+        return resp
+
+    ##asyncio version of solution
+    async def asolution(self ,question ,q_type):
+        obj ,q_vector = await self.__acheck_avail(question ,q_type)
+        if obj : 
+            return {
+                "solution" : obj.solution,
+                "explanation" : obj.explanation
+            }
+
+        kb = await self.context[q_type].asearch(query = question)
+        if len(kb) == 0:
+            return {"solution" : "No context available" ,"explanation" : "No context available" }
+
+        resp = await self.__agenerate(prmpt = self.__prompt(question = question ,q_type = q_type ,kb = kb))
+        await asyncio.to_thread(self.__store ,question = question ,q_type = q_type ,resp = resp ,q_vector = q_vector)
+
+        return resp
+
+    def __prompt(self ,question ,q_type ,kb):
         if q_type == "theory" : 
-            prmpt = theory_prmpt.format(
+            return theory_prmpt.format(
                 stud_class = self.stud_clss, 
                 state = self.state,
                 knowledge_base = kb,
                 question = question
             )
         
-        else:
-            prmpt = numeric_prmpt.format(
-                knowledge_base = kb,
-                question = question
-            )
-        
-        resp = self.__generate(prmpt = prmpt)
-        
-        ##adding the generated response to the db 
+        return numeric_prmpt.format(
+            knowledge_base = kb,
+            question = question
+        )
+
+    ##adding the generated response to the db 
+    def __store(self ,question ,q_type ,resp ,q_vector):
         obj = Solution(
             relative_id = self.common_id[q_type],
             question = question,
             solution = resp['solution'],
             explanation = resp['explanation'],
-            q_type = q_type
+            q_type = q_type,
+            question_hash = question_hash(question),
+            q_vector = to_blob(q_vector)
         )
 
         session = Session()
         session.add(obj)
         session.commit()
+        self.answers.add(scope = (self.common_id[q_type] ,q_type) ,answer_id = obj.id ,vector = q_vector)
         session.close()
 
-        return resp
+    @classmethod
+    def stats(cls):
+        with cls.lock :
+            report = dict(cls.counts)
+        checks = report["exact_hits"] + report["semantic_hits"] + report["misses"]
+        report["hit_ratio"] = round((report["exact_hits"] + report["semantic_hits"]) / checks ,3) if checks else 0.0
+        report["avg_check_time"] = round(report["check_time"] / checks ,4) if checks else 0.0
+        report["index"] = cls.answers.stats()
+        return report
     
+    ##returns (stored solution or None ,question embedding or None)
     def __check_avail(self ,question ,q_type):
+        start = time.perf_counter()
+
+        obj = self.__exact(question ,q_type)
+        if obj :
+            self.__count("exact_hits" ,start)
+            return obj ,None
+
+        q_vector = self.context[q_type].embedder.encode([question])[0]
+        obj = self.__similar(question ,q_type ,q_vector)
+        self.__count("semantic_hits" if obj else "misses" ,start)
+        return obj ,q_vector
+
+    async def __acheck_avail(self ,question ,q_type):
+        start = time.perf_counter()
+
+        obj = await asyncio.to_thread(self.__exact ,question ,q_type)
+        if obj :
+            self.__count("exact_hits" ,start)
+            return obj ,None
+
+        q_vector = (await self.context[q_type].embedder.aencode([question]))[0]
+        obj = await asyncio.to_thread(self.__similar ,question ,q_type ,q_vector)
+        self.__count("semantic_hits" if obj else "misses" ,start)
+        return obj ,q_vector
+
+    ##fast path :- same question after normalising case ,spacing and closing punctuation
+    def __exact(self ,question ,q_type):
         session = Session()
         obj = session.query(Solution).filter(
+            Solution.question_hash == question_hash(question),
             Solution.relative_id == self.common_id[q_type],
-            Solution.question == question,
             Solution.q_type == q_type
         ).first()
         session.close()
-        return obj 
+        if obj and same_problem(obj.question ,question ,q_type):
+            return obj
+        return None
+
+    ##near duplicate :- closest stored question of this chapter by embedding
+    def __similar(self ,question ,q_type ,q_vector):
+        match = self.answers.lookup(scope = (self.common_id[q_type] ,q_type) ,query_vector = q_vector)
+        if match is None :
+            return None
+
+        session = Session()
+        obj = session.get(Solution ,match[0])
+        session.close()
+        if obj and same_problem(obj.question ,question ,q_type):
+            return obj
+        return None
+
+    def __count(self ,name ,start):
+        with self.lock :
+            self.counts[name] += 1
+            self.counts["check_time"] += time.perf_counter() - start
     
 
     def __generate(self ,prmpt):        
-        response = self.client.models.generate_content(
+        response = llm_gateway.generate(
             model=self.model,
             contents = prmpt,
-        ).text    
+            caller = "SoltuionGenerator.solution"
+        )    
         
         return self.__extract_dict(response)
 
+    async def __agenerate(self ,prmpt):
+        response = await llm_gateway.agenerate(
+            model=self.model,
+            contents = prmpt,
+            caller = "SoltuionGenerator.solution"
+        )
+
+        return self.__extract_dict(response)
+
     def __extract_dict(self ,response):
         try:
             return json.loads(response)
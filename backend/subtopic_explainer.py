@@ -1,17 +1,15 @@
 from question_bank import SubtopicDescribe ,SubtopicExplainer
-from google.oauth2 import service_account
-from google.cloud import storage
 from datetime import timedelta ,datetime
 from image_generator import ImageGenerator
-from semantic_search import SimTheory
+from context_registry import context_registry
 from sqlalchemy.orm import sessionmaker
 from db_engine import Engine
-from dotenv import load_dotenv
-from google import genai
+from llm_gateway import llm_gateway
+from google_clients import google_clients
+from settings import settings
+import asyncio
 import json
-import os
 
-load_dotenv(override=True) 
 Session = sessionmaker(bind = Engine)
 
 
@@ -51,9 +49,7 @@ Next, generate a detailed prompt to create a cartoon-style image that visually r
 
 
 class SubtpcExplGen : 
-    model = os.getenv("LANGUAGE_MODEL_ID")
-    client = genai.Client(api_key = os.getenv("GOOGLE_API_KEY"))
-    context_cache = { }
+    model = settings.get("LANGUAGE_MODEL_ID")
     img_generator = ImageGenerator()
 
     def __init__(self ,stud_clss ,subj ,chap ,state):
@@ -62,40 +58,56 @@ class SubtpcExplGen :
         self.chap = chap
         self.state = state
         
-        ##caching for faster
+        ##chapter index shared with the other consumers through the registry
         self.common_id = f"{self.stud_class}_{self.subj}_{self.chap}"
-        if self.common_id not in self.context_cache : 
-            self.context_cache[self.common_id] = SimTheory(
-                stud_clss = stud_clss,
-                subj = subj,
-                chap = chap,
-            )
-        
-        ##having identifier to it  
-        self.context = self.context_cache[self.common_id]
+        self.context = context_registry.theory(
+            stud_clss = stud_clss,
+            subj = subj,
+            chap = chap,
+        )
         
     def create(self ,question):
         sub_objs = self.__fetch_subtops()  ##fetch all the suptopic-description under this chap
-        select_subs ,q_type = self.__select_subs(sub_objs = sub_objs ,question = question) ##choose sub which is related to this  
-        print(select_subs ,q_type)
+        unstuct_resp = self.__generate(prmpt = self.__select_prompt(sub_objs = sub_objs ,question = question) ,caller = "SubtpcExplGen.select")
+        select_subs ,q_type = self.__selected(sub_objs = sub_objs ,unstuct_resp = unstuct_resp) ##choose sub which is related to this  
 
         avail_obj_list = self.__check_avail(select_subs = select_subs) ##fetching already available explanation 
         avail_nam_list = [obj.name for obj in avail_obj_list]
 
-        new_subexp_objs = []
-        db_selected_objs = []
+        ##knowledge base of every missing subtopic with one embedding call
+        missing_subs = [obj for obj in select_subs if obj.name not in avail_nam_list]
+        kb_list = self.context.search_many(queries = [self.__query(sub_obj = obj) for obj in missing_subs])
         
-        for obj in select_subs:
-            if obj.name not in avail_nam_list:    
+        new_subexp_objs = [self.__regional_exp(sub_obj = obj ,kb = kb) for obj ,kb in zip(missing_subs ,kb_list)]
+
+        return self.__result(avail_obj_list = avail_obj_list ,new_subexp_objs = new_subexp_objs) ,q_type
+
+    ##asyncio version of create ,the missing subtopics are explained concurrently
+    async def acreate(self ,question):
+        sub_objs = await asyncio.to_thread(self.__fetch_subtops)
+        unstuct_resp = await self.__agenerate(prmpt = self.__select_prompt(sub_objs = sub_objs ,question = question) ,caller = "SubtpcExplGen.select")
+        select_subs ,q_type = self.__selected(sub_objs = sub_objs ,unstuct_resp = unstuct_resp)
+
+        avail_obj_list = await asyncio.to_thread(self.__check_avail ,select_subs = select_subs)
+        avail_nam_list = [obj.name for obj in avail_obj_list]
+
+        missing_subs = [obj for obj in select_subs if obj.name not in avail_nam_list]
+        kb_list = await self.context.asearch_many(queries = [self.__query(sub_obj = obj) for obj in missing_subs])
+
+        new_subexp_objs = await asyncio.gather(*[
+            self.__aregional_exp(sub_obj = obj ,kb = kb) for obj ,kb in zip(missing_subs ,kb_list)
+        ])
+
+        result = await asyncio.to_thread(self.__result ,avail_obj_list = avail_obj_list ,new_subexp_objs = list(new_subexp_objs))
+        return result ,q_type
 
-                new_obj_temp = self.__regional_exp(sub_obj = obj)
-                if new_obj_temp :    
-                    new_subexp_objs.append(new_obj_temp)
+    ##stores the new explanations and builds the {subtopic : {img ,explanation}} response
+    def __result(self ,avail_obj_list ,new_subexp_objs):
+        new_subexp_objs = [obj for obj in new_subexp_objs if obj]
 
-                    ##if new_obj donot contain image it is not selected
-                    if new_obj_temp.img != None :
-                        db_selected_objs.append(new_obj_temp)
-                
+        ##if new_obj donot contain image it is not selected
+        db_selected_objs = [obj for obj in new_subexp_objs if obj.img != None]
+            
         session = Session()
         session.add_all(db_selected_objs)
         session.commit()
@@ -119,23 +131,16 @@ class SubtpcExplGen :
         session.commit()
         session.close()
 
-        return result ,q_type
-        
-    def __regional_exp(self ,sub_obj):
-        query = f"{sub_obj.name}:{sub_obj.describe}"
-        kb = self.context.search(query = query)
+        return result
         
+    def __query(self ,sub_obj):
+        return f"{sub_obj.name}:{sub_obj.describe}"
+
+    def __regional_exp(self ,sub_obj ,kb):
         if len(kb) == 0:
             return None
 
-        prmpt = subtopic_exp_prmpt.format(
-            subtopic_describ = query,
-            state = self.state,
-            knowledge = kb, 
-            clss = self.stud_class
-        )
-
-        unstruct_resp = self.__generate(prmpt = prmpt)
+        unstruct_resp = self.__generate(prmpt = self.__exp_prompt(sub_obj = sub_obj ,kb = kb) ,caller = "SubtpcExplGen.explain")
         resp = self.__extract_dict(unstruct_resp)
         
         print(resp)
@@ -145,6 +150,31 @@ class SubtpcExplGen :
             common_id = self.common_id + f"{self.state}_{sub_obj.name}"
         )
 
+        return self.__explainer(sub_obj = sub_obj ,resp = resp ,img_bucket_link = img_bucket_link)
+
+    async def __aregional_exp(self ,sub_obj ,kb):
+        if len(kb) == 0:
+            return None
+
+        unstruct_resp = await self.__agenerate(prmpt = self.__exp_prompt(sub_obj = sub_obj ,kb = kb) ,caller = "SubtpcExplGen.explain")
+        resp = self.__extract_dict(unstruct_resp)
+
+        img_bucket_link = await self.img_generator.agenerate(
+            prompt = resp["img_generation_prompt"],
+            common_id = self.common_id + f"{self.state}_{sub_obj.name}"
+        )
+
+        return await asyncio.to_thread(self.__explainer ,sub_obj = sub_obj ,resp = resp ,img_bucket_link = img_bucket_link)
+
+    def __exp_prompt(self ,sub_obj ,kb):
+        return subtopic_exp_prmpt.format(
+            subtopic_describ = self.__query(sub_obj = sub_obj),
+            state = self.state,
+            knowledge = kb, 
+            clss = self.stud_class
+        )
+
+    def __explainer(self ,sub_obj ,resp ,img_bucket_link):
         url ,expiration = self.__img_acces_url(img = img_bucket_link)
  
         obj = SubtopicExplainer(
@@ -161,12 +191,8 @@ class SubtpcExplGen :
     
     def __img_acces_url(self ,img):
         try:
-            key_path = os.path.abspath(os.getenv("CRED_JSON_PATH"))
-            credentials = service_account.Credentials.from_service_account_file(key_path)
-            storage_client = storage.Client(credentials = credentials )
-
-            bucket = storage_client.bucket(os.getenv("BUCKET_NAME"))
-            blob = bucket.blob(img)  # Use the actual path stored in DB
+            ##service account client ,built once per process
+            blob = google_clients.signing_bucket().blob(img)  # Use the actual path stored in DB
 
             # Generate a signed URL (valid for 1 hour)
             signed_url = blob.generate_signed_url(
@@ -201,19 +227,19 @@ class SubtpcExplGen :
 
         return sub_exp_objs
     
-    def __select_subs(self ,sub_objs ,question):
+    def __select_prompt(self ,sub_objs ,question):
         subtopic_describ = {}
         for obj in sub_objs : 
             subtopic_describ[obj.name] = obj.describe
         
         print("subtopic_describ :" ,subtopic_describ)
 
-        form_prmpt = subtopic_select_prmpt.format(
+        return subtopic_select_prmpt.format(
             subtopic_dict = subtopic_describ,
             question = question
         )
 
-        unstuct_resp = self.__generate(prmpt = form_prmpt)
+    def __selected(self ,sub_objs ,unstuct_resp):
         print("selection resp : " ,unstuct_resp)
         resp = self.__extract_dict(unstuct_resp)
         
@@ -223,14 +249,23 @@ class SubtpcExplGen :
             if obj.name in resp['chosen_subtopics']:
                 select_subs.append(obj)
         
+        print(select_subs ,resp['question_type'])
         return select_subs ,resp['question_type']
 
     
-    def __generate(self ,prmpt):
-        return self.client.models.generate_content(
+    def __generate(self ,prmpt ,caller):
+        return llm_gateway.generate(
             model=self.model,
             contents = prmpt,
-        ).text
+            caller = caller
+        )
+
+    async def __agenerate(self ,prmpt ,caller):
+        return await llm_gateway.agenerate(
+            model=self.model,
+            contents = prmpt,
+            caller = caller
+        )
 
 
     def __extract_list(self ,response):
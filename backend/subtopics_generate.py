@@ -1,14 +1,11 @@
-from dotenv import load_dotenv
-from google import genai
+from llm_gateway import llm_gateway
+from settings import settings
 import json
-import os 
 
-load_dotenv(override = True)
 
 class SubtopicGenerator: 
     def __init__(self):
-        self.model = os.getenv("LANGUAGE_MODEL_ID")
-        self.client = genai.Client(api_key = os.getenv("GOOGLE_API_KEY") )
+        self.model = settings.get("LANGUAGE_MODEL_ID")
     
     def generate(self ,chapter_text):
         pmpt = """Below is an instruction that describes a task, paired with an input that provides further context.
@@ -23,10 +20,12 @@ Make sure that you cover all the subtopics in the output and outputed subtopics
 ###Input : {}"""
 
         formated_prompt = pmpt.format(chapter_text)
-        response = self.client.models.generate_content(
+        response = llm_gateway.generate(
             model=self.model,
             contents = formated_prompt,
-        ).text
+            caller = "SubtopicGenerator.generate",
+            cache_ttl = 30 * 24 * 3600
+        )
         return self.__extract_list(response) 
       
     
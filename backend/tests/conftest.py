@@ -0,0 +1,9 @@
+import tempfile
+import sys
+import os
+
+##the backend modules are imported from the backend folder ,db_engine needs a database url at import time
+sys.path.insert(0 ,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATA_BASE_URL" ,f"sqlite:///{os.path.join(tempfile.mkdtemp() ,'test.db')}")
+os.environ.setdefault("DB_CONNECT_COUNT" ,"2")
+os.environ.setdefault("DB_TIMEOUT" ,"5")
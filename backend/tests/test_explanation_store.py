@@ -0,0 +1,67 @@
+from explanation_store import ExplanationStore
+from explanation_db import Base
+from db_engine import Engine
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+import uuid
+
+
+@pytest.fixture
+def store():
+    Base.metadata.create_all(Engine)
+    return ExplanationStore()
+
+
+@pytest.fixture
+def access(store):
+    access = f"doubt_expl:{uuid.uuid4().hex}"
+    store.open(access = access ,target = "light bends in water" ,what_to_exp = "I have the same doubt. Please help me.")
+    return access
+
+
+def test_a_new_store_sees_the_session(access):
+    ##another worker process has a store of its own
+    session = ExplanationStore().get(access)
+    assert session["target"] == "light bends in water"
+    assert session["targ_embed"] is None
+    assert session["score"] == 0
+
+
+def test_what_to_exp_is_localised(store ,access):
+    store.set_what_to_exp(access ,"எனக்கும் அதே சந்தேகம்")
+    assert store.what_to_exp(access) == "எனக்கும் அதே சந்தேகம்"
+
+
+def test_embedding_round_trips(store ,access):
+    store.set_embedding(access ,np.array([0.5 ,-1.0 ,2.0]))
+    assert store.get(access)["targ_embed"].tolist() == [0.5 ,-1.0 ,2.0]
+
+
+def test_turns_keep_their_order(store ,access):
+    store.add_turn(access ,lng = "en" ,expl = "first" ,duration = 3)
+    track = store.add_turn(access ,lng = "ta" ,expl = "second" ,duration = 5)
+    assert track == [
+        {"lng" : "en" ,"expl" : "first" ,"duration" : 3},
+        {"lng" : "ta" ,"expl" : "second" ,"duration" : 5},
+    ]
+
+
+def test_score_only_grows(store ,access):
+    assert store.raise_score(access ,40.0) == 40.0
+    assert store.raise_score(access ,20.0) == 40.0
+    assert store.get(access)["score"] == 40.0
+
+
+def test_only_one_close_ends_the_session(store ,access):
+    store.add_turn(access ,lng = "en" ,expl = "piece" ,duration = 1)
+    with ThreadPoolExecutor(max_workers = 4) as executor :
+        ended = list(executor.map(store.close ,[access] * 4))
+
+    assert ended.count(True) == 1
+    assert store.get(access) is None
+    assert store.add_turn(access ,lng = "en" ,expl = "late" ,duration = 1) == [{"lng" : "en" ,"expl" : "late" ,"duration" : 1}]
+
+
+def test_expired_sessions_are_gone(access):
+    assert ExplanationStore(ttl = 1e-9).get(access) is None
@@ -0,0 +1,40 @@
+from question_bank import normalise_question ,question_hash
+from solution_generator import question_numbers ,same_problem
+import pytest
+
+
+@pytest.mark.parametrize("first ,second" ,[
+    ("Find x: 2x = -4" ,"Find x: 2x = 4"),
+    ("Is 3 > 2?" ,"Is 3 < 2?"),
+    ("12 + 5 x 3" ,"12 - 5 x 3"),
+    ("Simplify (a + b)^2" ,"Simplify a + b^2"),
+    ("Evaluate 8 / 2" ,"Evaluate 8 * 2"),
+])
+def test_different_problems_hash_apart(first ,second):
+    assert question_hash(first) != question_hash(second)
+
+
+@pytest.mark.parametrize("first ,second" ,[
+    ("Find x: 2x = -4" ,"find  X: 2x = -4."),
+    ("What is  photosynthesis?" ,"what is photosynthesis"),
+    ("Solve 2.5 + 1.5\n" ,"solve 2.5 + 1.5 !"),
+])
+def test_formatting_does_not_change_the_hash(first ,second):
+    assert question_hash(first) == question_hash(second)
+
+
+def test_normalise_keeps_operators_and_signs():
+    assert normalise_question("Find x: 2x = -4?") == "find x: 2x = -4"
+
+
+def test_question_numbers_keep_signs_and_operators():
+    assert question_numbers("2x = -4") == ["2" ,"=" ,"-4"]
+    assert question_numbers("12 - 5 x 3") == ["12" ,"-" ,"5" ,"3"]
+    assert question_numbers("2x = -4") != question_numbers("2x = 4")
+
+
+def test_numeric_guard():
+    assert not same_problem("Find x: 2x = -4" ,"Find x: 2x = 4" ,"numeric")
+    assert not same_problem("Is 3 > 2" ,"Is 3 < 2" ,"numeric")
+    assert same_problem("Find x : 2x = -4" ,"find x: 2x = -4" ,"numeric")
+    assert same_problem("Find x: 2x = -4" ,"Find x: 2x = 4" ,"theory") ##theory answers are matched by meaning
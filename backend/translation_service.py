@@ -0,0 +1,143 @@
+from cache_db import TranslationMemory
+from memory_cache import LruCache
+from sqlalchemy.orm import sessionmaker
+from datetime import datetime
+from db_engine import Engine ,insert_missing
+from google_clients import google_clients
+from settings import settings
+import threading
+import asyncio
+import hashlib
+
+Session = sessionmaker(bind = Engine)
+
+
+class TranslationService :
+    """batched cloud translation with a persistent translation memory
+
+    translate_many deduplicates the strings of a response ,serves known ones from an in-memory lru and the
+    TranslationMemory table and sends only the remaining strings to Cloud Translate ,TRANSLATE_BATCH_SIZE per request.
+    atranslate_many is the same path for the asyncio routes (see asgi.py).
+    """
+
+    def __init__(self):
+        self.batch_size = int(settings.get("TRANSLATE_BATCH_SIZE" ,100)) ##api accepts at most 128 segments per call
+        self.memory = LruCache(max_entries = int(settings.get("TRANSLATION_CACHE_SIZE" ,4096)))
+        self.__counts = {"memory_hits" : 0 ,"db_hits" : 0 ,"translated" : 0 ,"api_calls" : 0}
+        self.__lock = threading.Lock()
+
+    def translate(self ,text ,target):
+        return self.translate_many(texts = [text] ,target = target)[0]
+
+    ##returns translations in the same order as texts
+    def translate_many(self ,texts ,target):
+        texts = [text.decode("utf-8") if isinstance(text ,bytes) else text for text in texts]
+        found ,pending = self.__from_memory(texts ,target)
+        if len(pending) > 0 :
+            pending = self.__from_db(pending ,found ,target)
+
+        ##cloud translate for the rest
+        for i in range(0 ,len(pending) ,self.batch_size):
+            batch = pending[i : i + self.batch_size]
+            self.__keep(batch ,self.__call(batch ,target) ,target ,found)
+
+        return [found.get(text ,text) for text in texts]
+
+    async def atranslate(self ,text ,target):
+        return (await self.atranslate_many(texts = [text] ,target = target))[0]
+
+    ##asyncio version of translate_many ,the api batches of one call are sent together
+    async def atranslate_many(self ,texts ,target):
+        texts = [text.decode("utf-8") if isinstance(text ,bytes) else text for text in texts]
+        found ,pending = self.__from_memory(texts ,target)
+        if len(pending) > 0 :
+            pending = await asyncio.to_thread(self.__from_db ,pending ,found ,target)
+
+        ##the v2 client is blocking ,every batch waits in a worker thread
+        batches = [pending[i : i + self.batch_size] for i in range(0 ,len(pending) ,self.batch_size)]
+        results = await asyncio.gather(*[asyncio.to_thread(self.__call ,batch ,target) for batch in batches])
+        for batch ,result in zip(batches ,results):
+            await asyncio.to_thread(self.__keep ,batch ,result ,target ,found)
+
+        return [found.get(text ,text) for text in texts]
+
+    def stats(self):
+        with self.__lock :
+            report = dict(self.__counts)
+        report["memory_entries"] = len(self.memory)
+        return report
+
+    ##memory tier ,non text values pass through untranslated
+    def __from_memory(self ,texts ,target):
+        unique = [text for text in dict.fromkeys(texts) if isinstance(text ,str) and text]
+        found = { }
+        pending = [ ]
+        for text in unique :
+            translation = self.memory.get((text ,target))
+            if translation is None :
+                pending.append(text)
+            else:
+                found[text] = translation
+        self.__count("memory_hits" ,len(unique) - len(pending))
+        return found ,pending
+
+    ##db tier ,fills found and returns what is still missing
+    def __from_db(self ,pending ,found ,target):
+        stored = self.__fetch(texts = pending ,target = target)
+        self.__count("db_hits" ,len(stored))
+        for text ,translation in stored.items():
+            found[text] = translation
+            self.memory.put((text ,target) ,translation)
+        return [text for text in pending if text not in stored]
+
+    def __call(self ,batch ,target):
+        result = google_clients.translate().translate(batch ,target_language = target)
+        self.__count("api_calls" ,1)
+        self.__count("translated" ,len(batch))
+        return result
+
+    ##api results go to both cache tiers
+    def __keep(self ,batch ,result ,target ,found):
+        translated = {text : dict1["translatedText"] for text ,dict1 in zip(batch ,result)}
+        self.__store(translated = translated ,target = target)
+        for text ,translation in translated.items():
+            found[text] = translation
+            self.memory.put((text ,target) ,translation)
+
+    def __fetch(self ,texts ,target):
+        hashes = {self.__hash(text) : text for text in texts}
+        session = Session()
+        try :
+            objs = session.query(TranslationMemory).filter(
+                TranslationMemory.target == target,
+                TranslationMemory.text_hash.in_(list(hashes.keys()))
+            ).all()
+        except Exception as e:
+            print("ERROR : TranslationService.fetch :-" ,e)
+            return { }
+        finally:
+            session.close()
+
+        return {hashes[obj.text_hash] : obj.translation for obj in objs}
+
+    ##rows stored by another worker meanwhile are skipped ,the rest of the batch is still saved
+    def __store(self ,translated ,target):
+        try :
+            insert_missing(TranslationMemory ,[
+                {
+                    "text_hash" : self.__hash(text),
+                    "target" : target,
+                    "text" : text,
+                    "translation" : translation,
+                    "created" : datetime.now()
+                } for text ,translation in translated.items()
+            ] ,keys = ["text_hash" ,"target"])
+        except Exception as e:
+            print("ERROR : TranslationService.store :-" ,e)
+
+    def __hash(self ,text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def __count(self ,name ,value):
+        with self.__lock :
+            self.__counts[name] += value
@@ -1,17 +1,17 @@
 from sqlalchemy import create_engine
-from sqlalchemy import Column,Time,Integer,ForeignKey,Text,DATETIME
+from sqlalchemy import Column,Time,Integer,ForeignKey,Text,DATETIME,Index
 from sqlalchemy.orm import declarative_base
-from pathlib import Path
-from dotenv import load_dotenv
-import os
 from db_engine import Engine
 
-load_dotenv(override = True)
 Base = declarative_base()
 
 ##video watch tracking for the students 
 class StudentScore(Base):
     __tablename__ = "StudentScore"
+    __table_args__ = (
+        ##one row per student ,score_store upserts on it
+        Index("uq_student_score" ,"student_class" ,"roll_num" ,"state" ,unique = True ,mysql_length = {"roll_num" : 64 ,"state" : 64}),
+    )
     id = Column(Integer, primary_key=True ,autoincrement=True)
     student_class = Column(Integer)
     state = Column(Text)
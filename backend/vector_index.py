@@ -0,0 +1,145 @@
+"""similarity indexes used by SemanticSearch
+
+ExactIndex keeps l2 normalised vectors so cosine similarity is a single matrix product and picks the top k with
+argpartition. HnswIndex is an approximate index for large chapters (or a future cross chapter corpus) ,it needs the
+optional hnswlib package (pip install hnswlib) and runs locally on cpu. build_index picks one from VECTOR_INDEX :-
+exact ,hnsw or auto (hnsw once a corpus has ANN_MIN_ROWS vectors and hnswlib is installed).
+"""
+from settings import settings
+import threading
+import numpy as np
+
+try :
+    import hnswlib
+except ImportError :
+    hnswlib = None
+
+DTYPE = np.float32
+
+
+def normalise(matrix):
+    matrix = np.asarray(matrix ,dtype = DTYPE)
+    if matrix.ndim == 1 :
+        matrix = matrix.reshape(1 ,-1)
+    norms = np.linalg.norm(matrix ,axis = 1 ,keepdims = True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class ExactIndex :
+
+    def __init__(self ,matrix):
+        matrix = np.asarray(matrix ,dtype = DTYPE)
+        self.vectors = normalise(matrix) if matrix.size > 0 else np.zeros((0 ,0) ,dtype = DTYPE)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.vectors.nbytes
+
+    def add(self ,vectors):
+        if np.asarray(vectors).size == 0 :
+            return
+        vectors = normalise(vectors)
+        self.vectors = vectors if len(self) == 0 else np.vstack([self.vectors ,vectors])
+
+    ##returns (row indices ,similarities) best first ,only rows with similarity >= min_similarity
+    def search(self ,query ,k ,min_similarity = None):
+        return self.search_many(queries = normalise(query) ,k = k ,min_similarity = min_similarity)[0]
+
+    ##scores all the queries against the index with one matrix product
+    def search_many(self ,queries ,k ,min_similarity = None):
+        queries = normalise(queries)
+        if len(self) == 0 :
+            return [(np.zeros(0 ,dtype = int) ,np.zeros(0 ,dtype = DTYPE)) for _ in range(len(queries))]
+
+        sim_matrix = queries @ self.vectors.T
+        results = [ ]
+        for sims in sim_matrix :
+            if k < len(sims):
+                top = np.argpartition(-sims ,k)[:k] ##top k in O(n) ,only those k are sorted
+            else:
+                top = np.arange(len(sims))
+            top = top[np.argsort(-sims[top])]
+
+            if min_similarity is not None :
+                top = top[sims[top] >= min_similarity]
+            results.append((top ,sims[top]))
+        return results
+
+
+class HnswIndex :
+
+    def __init__(self ,matrix ,ef_construction = 200 ,m = 16):
+        assert hnswlib is not None ,"hnswlib is not installed"
+        matrix = np.asarray(matrix ,dtype = DTYPE)
+        self.ef_construction = ef_construction
+        self.m = m
+        self.index = None
+        self.count = 0
+        self.__lock = threading.Lock()
+        if matrix.size > 0 :
+            self.add(matrix)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        if self.index is None :
+            return 0
+        return self.count * (4 * self.index.dim + 8 * self.m) ##vectors plus the level 0 links
+
+    def add(self ,vectors):
+        vectors = np.asarray(vectors ,dtype = DTYPE)
+        if vectors.size == 0 :
+            return
+        with self.__lock :
+            if self.index is None :
+                self.index = hnswlib.Index(space = "cosine" ,dim = vectors.shape[1])
+                self.index.init_index(max_elements = max(1024 ,2 * len(vectors)) ,ef_construction = self.ef_construction ,M = self.m)
+
+            if self.count + len(vectors) > self.index.get_max_elements():
+                self.index.resize_index(2 * (self.count + len(vectors)))
+
+            self.index.add_items(vectors ,np.arange(self.count ,self.count + len(vectors)))
+            self.count += len(vectors)
+
+    def search(self ,query ,k ,min_similarity = None):
+        return self.search_many(queries = np.asarray(query ,dtype = DTYPE).reshape(1 ,-1) ,k = k ,min_similarity = min_similarity)[0]
+
+    def search_many(self ,queries ,k ,min_similarity = None):
+        queries = np.asarray(queries ,dtype = DTYPE)
+        if self.count == 0 :
+            return [(np.zeros(0 ,dtype = int) ,np.zeros(0 ,dtype = DTYPE)) for _ in range(len(queries))]
+
+        k = min(k ,self.count)
+        with self.__lock :
+            self.index.set_ef(max(50 ,4 * k))
+            labels ,distances = self.index.knn_query(queries ,k = k)
+
+        results = [ ]
+        for row_labels ,row_distances in zip(labels ,distances):
+            top ,sims = row_labels.astype(int) ,(1.0 - row_distances).astype(DTYPE) ##cosine space returns 1 - similarity
+            if min_similarity is not None :
+                keep = sims >= min_similarity
+                top ,sims = top[keep] ,sims[keep]
+            results.append((top ,sims))
+        return results
+
+
+def build_index(matrix ,mode = None):
+    mode = mode or settings.get("VECTOR_INDEX" ,"exact")
+    rows = np.asarray(matrix).shape[0] if np.asarray(matrix).size > 0 else 0
+
+    if mode == "auto" :
+        mode = "hnsw" if rows >= int(settings.get("ANN_MIN_ROWS" ,20000)) else "exact"
+
+    if mode == "hnsw" :
+        if hnswlib is not None :
+            return HnswIndex(matrix)
+        print("WARNING : hnswlib is not installed ,falling back to exact search")
+
+    return ExactIndex(matrix)
@@ -0,0 +1,104 @@
+from sqlalchemy import inspect ,text ,LargeBinary ,String ,select ,delete
+from sqlalchemy.orm import sessionmaker
+from db_engine import Engine
+import numpy as np
+
+Session = sessionmaker(bind = Engine)
+
+##embeddings are stored as raw little endian float32 bytes
+DTYPE = np.dtype("<f4")
+
+
+def to_blob(vector):
+    return np.asarray(vector ,dtype = DTYPE).tobytes()
+
+
+##stacking the stored vectors of context rows into one (n ,dim) matrix
+def load_matrix(objs):
+    if len(objs) == 0 :
+        return np.zeros((0 ,0) ,dtype = DTYPE)
+
+    ##fast path ,all rows are binary :- one join and a zero copy view over it
+    if all(obj.vector_blob is not None for obj in objs):
+        return np.frombuffer(b"".join(obj.vector_blob for obj in objs) ,dtype = DTYPE).reshape(len(objs) ,-1)
+
+    ##rows not migrated yet still carry the json list
+    return np.array([
+        np.frombuffer(obj.vector_blob ,dtype = DTYPE) if obj.vector_blob is not None else obj.text_vector for obj in objs
+    ] ,dtype = DTYPE)
+
+
+def add_column(table ,name ,column_type):
+    columns = [column["name"] for column in inspect(Engine).get_columns(table)]
+    if name not in columns :
+        with Engine.begin() as conn :
+            conn.execute(text(
+                f"ALTER TABLE {Engine.dialect.identifier_preparer.quote(table)} ADD COLUMN {name} {column_type.compile(dialect = Engine.dialect)}"
+            ))
+
+
+##migration :- adds the vector_blob column if needed and converts json vectors batch by batch
+def migrate_json_vectors(model ,batch_size = 500 ,drop_json = False):
+    table = model.__tablename__
+    add_column(table ,"vector_blob" ,LargeBinary())
+
+    converted = 0
+    session = Session()
+    while True :
+        objs = session.query(model).filter(
+            model.vector_blob.is_(None),
+            model.text_vector.isnot(None)
+        ).limit(batch_size).all()
+
+        if len(objs) == 0 :
+            break
+
+        for obj in objs :
+            obj.vector_blob = to_blob(obj.text_vector)
+            if drop_json :
+                obj.text_vector = None
+        session.commit()
+        converted += len(objs)
+        print(f"{table} : converted {converted} vectors")
+
+    session.close()
+    return converted
+
+
+##migration :- fills chunk_hash ,removes duplicate chunks of a chapter (oldest row is kept) and creates the unique index
+def migrate_chunk_hashes(model ,batch_size = 500):
+    from context_db import chunk_hash
+
+    table = model.__tablename__
+    add_column(table ,"chunk_hash" ,String(64))
+
+    session = Session()
+    hashed = 0
+    while True :
+        objs = session.query(model).filter(model.chunk_hash.is_(None)).limit(batch_size).all()
+        if len(objs) == 0 :
+            break
+        for obj in objs :
+            obj.chunk_hash = chunk_hash(obj.chunk or "")
+        session.commit()
+        hashed += len(objs)
+        print(f"{table} : hashed {hashed} chunks")
+    session.close()
+
+    seen = set()
+    duplicates = [ ]
+    with Engine.connect() as conn :
+        for row_id ,relative_id ,hash_value in conn.execute(select(model.id ,model.relative_id ,model.chunk_hash).order_by(model.id)):
+            if (relative_id ,hash_value) in seen :
+                duplicates.append(row_id)
+            else:
+                seen.add((relative_id ,hash_value))
+
+    for i in range(0 ,len(duplicates) ,batch_size):
+        with Engine.begin() as conn :
+            conn.execute(delete(model).where(model.id.in_(duplicates[i : i + batch_size])))
+
+    for index in model.__table__.indexes :
+        index.create(Engine ,checkfirst = True)
+
+    return len(duplicates)
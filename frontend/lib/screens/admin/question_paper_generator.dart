@@ -853,10 +853,14 @@ class _QuestionPaperGeneratorState extends State<QuestionPaperGenerator> {
 
       final response = await request.send();
 
-      // Handle the response to extract the access key
-      if (response.statusCode == 200) {
+      // Generation runs as a background job, wait for its result
+      if (response.statusCode == 202) {
         final responseData = await response.stream.bytesToString();
-        final decodedData = jsonDecode(responseData);
+        final jobId = jsonDecode(responseData)['job_id'];
+        print('MCQ generation job: $jobId');
+
+        final decodedData = await _waitForJob(jobId, token);
+        if (!mounted) return;
         
         // Store the access key for future use
         accessToken = decodedData['access']; // Store the access key
@@ -918,6 +922,33 @@ class _QuestionPaperGeneratorState extends State<QuestionPaperGenerator> {
     }
   }
 
+  // Poll the job status until the generated questions are ready
+  Future<Map<String, dynamic>> _waitForJob(String jobId, String? token) async {
+    final statusUri = Uri.parse('https://dharsan-rural-edu-101392092221.asia-south1.run.app/admin/jobs/$jobId');
+
+    while (true) {
+      await Future.delayed(const Duration(seconds: 3));
+
+      final statusResponse = await http.get(
+        statusUri,
+        headers: {'Authorization': 'Bearer $token'},
+      );
+      if (statusResponse.statusCode != 200) {
+        throw Exception('Failed to fetch generation status. Status: ${statusResponse.statusCode}');
+      }
+
+      final job = jsonDecode(statusResponse.body);
+      print('MCQ generation job $jobId: ${job['status']} (${job['stage']})');
+
+      if (job['status'] == 'done') {
+        return job['result'] as Map<String, dynamic>;
+      }
+      if (job['status'] == 'failed') {
+        throw Exception('Question generation failed: ${job['error']}');
+      }
+    }
+  }
+
   void _generatePaper() async {
     if (selectedQuestions.isEmpty) return;
 
@@ -223,7 +223,8 @@ class _UploadNotesState extends State<UploadNotes> {
         print('Response status: ${response.statusCode}');
         print('Response data: ${response.data}');
 
-        if (response.statusCode == 200) {
+        // 202: the problems are extracted in the background (GET /teacher/numericprob/<job_id>)
+        if (response.statusCode == 200 || response.statusCode == 202) {
           ScaffoldMessenger.of(context).showSnackBar(
             SnackBar(
               content: Text(